@@ -4,7 +4,9 @@
 
 from .schedule import Schedule, customize, create_schedule, Partition
 from .scheme import Scheme, create_scheme, create_schedule_from_scheme
-from .build_module import lower, build
+from .build_module import lower, build, build_many
+from . import cache, profiler
+from .aot import load_module
 from .operation import *
 from .dsl import *
 from .intrin import *
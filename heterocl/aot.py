@@ -0,0 +1,351 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Ahead-of-time compiled kernels.
+
+``HCLModule.export_library(path)`` compiles a module built for the llvm
+target into a shared library, and writes a C header declaring the memref
+ABI of its top function next to it. ``load_module(path)`` loads such a
+library back as a callable.
+
+This file only depends on ctypes and numpy, so that precompiled kernels
+can be loaded in processes without the hcl_mlir bindings, for instance
+by shipping this file along with the libraries.
+"""
+
+import os
+import re
+import json
+import ctypes
+import subprocess
+import tempfile
+
+import numpy as np
+
+# 2: integers are passed in the smallest container of their width
+SIGNATURE_VERSION = 2
+_SIGNATURE_SYMBOL = "hcl_kernel_signature"
+_DTYPE_PATTERN = re.compile(r"^(int|uint|fixed|ufixed|float)(\d+)(?:_(\d+))?$")
+
+
+def _parse_dtype(dtype):
+    """Returns the kind, bitwidth and fractional bitwidth of a dtype string"""
+    match = _DTYPE_PATTERN.match(dtype)
+    if match is None:
+        raise ValueError(f"Unsupported data type: {dtype}")
+    kind, bits, fracs = match.groups()
+    return kind, int(bits), int(fracs or 0)
+
+
+def _abi_dtype(dtype):
+    """The numpy type of the buffers passed to the kernel for `dtype`.
+
+    As in the arrays of HeteroCL, integers and fixed-point numbers are
+    kept in the smallest 8, 16, 32 or 64-bit container, with the bits
+    above their width cleared.
+    """
+    kind, bits, _ = _parse_dtype(dtype)
+    if kind == "float":
+        return np.dtype(f"float{bits}")
+    if bits > 64:
+        raise ValueError(f"Unsupported data type: {dtype}")
+    size = 8
+    while size < bits:
+        size *= 2
+    signed = kind in {"int", "fixed"}
+    return np.dtype(f"{'int' if signed else 'uint'}{size}")
+
+
+def _encode(value, dtype):
+    """Convert values to the representation the kernel works on"""
+    kind, bits, fracs = _parse_dtype(dtype)
+    value = np.asarray(value)
+    if kind == "float":
+        return np.ascontiguousarray(value, dtype=_abi_dtype(dtype))
+    if kind in {"fixed", "ufixed"}:
+        value = np.fix(value * float(2**fracs))
+    signed = kind in {"int", "fixed"}
+    if value.dtype.kind == "f":
+        value = np.mod(value, float(2**bits))
+        if signed:
+            value = np.where(value >= 2 ** (bits - 1), value - 2**bits, value)
+        value = value.astype(np.int64)
+    value = value.astype(np.int64).view(np.uint64)
+    if bits < 64:
+        value = value & np.uint64((1 << bits) - 1)
+    return np.ascontiguousarray(value.astype(_abi_dtype(dtype)))
+
+
+def _decode(buffer, dtype):
+    """The inverse of _encode, as in Array.asnumpy()"""
+    kind, bits, fracs = _parse_dtype(dtype)
+    if kind == "float":
+        return buffer
+    if kind in {"int", "fixed"} and bits < buffer.itemsize * 8:
+        sign = np.int64(1 << (bits - 1))
+        buffer = (buffer.astype(np.int64) ^ sign) - sign
+    if kind in {"fixed", "ufixed"}:
+        return buffer / float(2**fracs)
+    return buffer
+
+
+def match_shape(expected, shape, sizes):
+    """Whether `shape` matches the `expected` shape of an argument.
+
+    The symbolic dimensions of `expected` are given by their names, and
+    the dynamic dimensions of unknown names by None. The sizes of the
+    symbolic dimensions are recorded in `sizes`, so that all the
+    arguments sharing a dimension are checked to have the same size.
+    """
+    if len(shape) != len(expected):
+        return False
+    for dim, size in zip(expected, shape):
+        if isinstance(dim, str):
+            if sizes.setdefault(dim, size) != size:
+                return False
+        elif dim is not None and dim != size:
+            return False
+    return True
+
+
+def make_memref_descriptor_type(rank):
+    """A ctypes structure with the layout of a ranked memref descriptor.
+
+    Unlike the descriptors of hcl_mlir.runtime, the pointers are plain
+    addresses, which are much cheaper to update.
+    """
+    return type(
+        f"MemRefDescriptor{rank}D",
+        (ctypes.Structure,),
+        {
+            "_fields_": [
+                ("allocated", ctypes.c_void_p),
+                ("aligned", ctypes.c_void_p),
+                ("offset", ctypes.c_int64),
+                ("sizes", ctypes.c_int64 * rank),
+                ("strides", ctypes.c_int64 * rank),
+            ]
+        },
+    )
+
+
+def fill_memref_descriptor(descriptor, array):
+    pointer = array.ctypes.data
+    descriptor.allocated = pointer
+    descriptor.aligned = pointer
+    descriptor.offset = 0
+    for i, (size, stride) in enumerate(zip(array.shape, array.strides)):
+        descriptor.sizes[i] = size
+        descriptor.strides[i] = stride // array.itemsize
+
+
+class AOTModule:
+    """A kernel loaded from a library written by HCLModule.export_library().
+
+    It is called like the module it was exported from: with the inputs
+    followed by the outputs of the top function, as numpy arrays (or
+    HeteroCL arrays). The arguments are passed by reference: the values
+    computed by the kernel are written back to them.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._lib = ctypes.CDLL(self.path)
+        get_signature = getattr(self._lib, _SIGNATURE_SYMBOL)
+        get_signature.restype = ctypes.c_char_p
+        self.signature = json.loads(get_signature().decode("utf-8"))
+        if self.signature["version"] != SIGNATURE_VERSION:
+            raise ValueError(
+                f"Unsupported kernel signature version {self.signature['version']}"
+            )
+        self.name = self.signature["name"]
+        self.args = self.signature["args"]
+        self._descriptor_types = [
+            make_memref_descriptor_type(len(arg["shape"])) for arg in self.args
+        ]
+        self._func = getattr(self._lib, "_mlir_ciface_" + self.signature["symbol"])
+        self._func.restype = None
+        self._func.argtypes = [ctypes.POINTER(t) for t in self._descriptor_types]
+
+    def __call__(self, *argv):
+        if len(argv) != len(self.args):
+            raise TypeError(
+                f"Incorrect number of arguments provided. Expected {len(self.args)}, got {len(argv)}."
+            )
+        buffers = []
+        descriptors = []
+        sizes = {}
+        for value, arg, descriptor_type in zip(argv, self.args, self._descriptor_types):
+            if hasattr(value, "unwrap"):
+                # HeteroCL arrays already hold the kernel representation
+                buffer = np.ascontiguousarray(
+                    value.unwrap(), dtype=_abi_dtype(arg["dtype"])
+                )
+            else:
+                if isinstance(value, (int, float)):
+                    value = np.array([value])
+                buffer = _encode(value, arg["dtype"])
+            if not match_shape(arg["shape"], buffer.shape, sizes):
+                raise ValueError(
+                    f"Shape mismatch for argument {arg['name']}: expected {tuple(arg['shape'])}, got {buffer.shape}"
+                )
+            descriptor = descriptor_type()
+            fill_memref_descriptor(descriptor, buffer)
+            buffers.append(buffer)
+            descriptors.append(descriptor)
+        self._func(*[ctypes.byref(descriptor) for descriptor in descriptors])
+        for value, arg, buffer in zip(argv, self.args, buffers):
+            if hasattr(value, "unwrap"):
+                if buffer is not value.unwrap():
+                    value.np_array = buffer
+            elif isinstance(value, np.ndarray) and value.flags.writeable:
+                np.copyto(value, _decode(buffer, arg["dtype"]), casting="unsafe")
+
+    def __repr__(self):
+        return f"AOTModule({self.path!r})"
+
+
+def load_module(path):
+    """Load a kernel exported with HCLModule.export_library()"""
+    return AOTModule(path)
+
+
+def _c_identifier(name):
+    name = re.sub(r"\W", "_", name)
+    return name if not name[0].isdigit() else "_" + name
+
+
+def _c_string(text):
+    chars = []
+    for byte in text.encode("utf-8"):
+        char = chr(byte)
+        if char in {'"', "\\"}:
+            chars.append("\\" + char)
+        elif 32 <= byte < 127:
+            chars.append(char)
+        else:
+            chars.append(f"\\{byte:03o}")
+    return '"' + "".join(chars) + '"'
+
+
+def _c_element_type(dtype):
+    kind, bits, _ = _parse_dtype(dtype)
+    if kind == "float":
+        return {16: "uint16_t /* half */", 32: "float", 64: "double"}[bits]
+    return f"{_abi_dtype(dtype).name}_t"
+
+
+def generate_header(signature, guard):
+    """C declarations of the top function and of its memref arguments"""
+    lines = [
+        f"#ifndef {guard}",
+        f"#define {guard}",
+        "",
+        "#include <stdint.h>",
+        "",
+        "#ifdef __cplusplus",
+        'extern "C" {',
+        "#endif",
+        "",
+        "/* Integers and fixed-point numbers are passed in the smallest 8, 16, 32",
+        " * or 64-bit container, fixed-point numbers being scaled by 2^fracs.",
+        " * Strides are in elements. */",
+    ]
+    params = []
+    for arg in signature["args"]:
+        name = _c_identifier(arg["name"])
+        rank = len(arg["shape"])
+        type_name = f"{signature['symbol']}_{name}_memref_t"
+        shape = "x".join(str(size) for size in arg["shape"])
+        lines += [
+            "",
+            f"/* {arg['name']}: {arg['dtype']}[{shape}] */",
+            "typedef struct {",
+            f"  {_c_element_type(arg['dtype'])} *allocated;",
+            f"  {_c_element_type(arg['dtype'])} *aligned;",
+            "  int64_t offset;",
+            f"  int64_t sizes[{rank}];",
+            f"  int64_t strides[{rank}];",
+            f"}} {type_name};",
+        ]
+        params.append(f"{type_name} *{name}")
+    lines += [
+        "",
+        f"void _mlir_ciface_{signature['symbol']}({', '.join(params)});",
+        "",
+        "/* JSON description of the arguments of the kernel */",
+        f"const char *{_SIGNATURE_SYMBOL}(void);",
+        "",
+        "#ifdef __cplusplus",
+        "}",
+        "#endif",
+        "",
+        f"#endif /* {guard} */",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def _run(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"Command {' '.join(cmd)} failed:\n{result.stderr}")
+    return result.stdout
+
+
+def export_library(path, llvm_module, signature, shared_libs):
+    """Compile a module lowered to the LLVM dialect into a shared library.
+
+    Returns the path of the generated C header.
+    """
+    for arg in signature["args"]:
+        _abi_dtype(arg["dtype"])
+    bindir = _run(["llvm-config", "--bindir"]).strip()
+    cc = os.environ.get("CC", "cc")
+    path = os.path.abspath(path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mlir_path = os.path.join(tmp_dir, "kernel.mlir")
+        ll_path = os.path.join(tmp_dir, "kernel.ll")
+        opt_path = os.path.join(tmp_dir, "kernel.opt.ll")
+        obj_path = os.path.join(tmp_dir, "kernel.o")
+        stub_path = os.path.join(tmp_dir, "signature.c")
+        with open(mlir_path, "w", encoding="utf-8") as f:
+            f.write(llvm_module)
+        _run(
+            [
+                os.path.join(bindir, "mlir-translate"),
+                "--mlir-to-llvmir",
+                # discardable attributes of the HeteroCL dialect
+                "--allow-unregistered-dialect",
+                mlir_path,
+                "-o",
+                ll_path,
+            ]
+        )
+        _run([os.path.join(bindir, "opt"), "-O3", "-S", ll_path, "-o", opt_path])
+        _run(
+            [
+                os.path.join(bindir, "llc"),
+                "-O3",
+                "-relocation-model=pic",
+                "-filetype=obj",
+                opt_path,
+                "-o",
+                obj_path,
+            ]
+        )
+        with open(stub_path, "w", encoding="utf-8") as f:
+            f.write(
+                f"const char *{_SIGNATURE_SYMBOL}(void) {{\n"
+                f"  return {_c_string(json.dumps(signature))};\n"
+                "}\n"
+            )
+        link_flags = []
+        for lib in shared_libs:
+            link_flags += [lib, "-Wl,-rpath," + os.path.dirname(lib)]
+        _run([cc, "-shared", "-fPIC", "-o", path, obj_path, stub_path] + link_flags)
+
+    header_path = os.path.splitext(path)[0] + ".h"
+    guard = _c_identifier(os.path.basename(header_path)).upper()
+    with open(header_path, "w", encoding="utf-8") as f:
+        f.write(generate_header(signature, guard))
+    return header_path
@@ -2,7 +2,17 @@
 # SPDX-License-Identifier: Apache-2.0
 # pylint: disable=too-many-instance-attributes
 
-import sympy as sp
+import copy
+import fractions
+import functools
+import math
+import numbers
+import operator
+
+try:
+    import sympy as sp
+except ImportError:  # only used to simplify non-affine expressions
+    sp = None
 from hcl_mlir.exceptions import (
     HCLError,
     APIError,
@@ -27,7 +37,7 @@ from .type_rules import (
     select_rule,
     intrin_rule,
 )
-from ..types import Int, UInt, Index, Float, Struct, dtype_to_str
+from ..types import Int, UInt, Index, Float, Fixed, UFixed, Struct, dtype_to_str
 
 
 def print_indent(string, level):
@@ -36,38 +46,117 @@ def print_indent(string, level):
     return string
 
 
+# constants created from Python literals, by value, type and location
+_constants = {}
+
+
 def immediate_to_constant(value, loc, dtype=None):
     if not isinstance(value, (int, float)):
         return value  # pass through
-    if dtype is not None:
+    if dtype is None:
+        if isinstance(value, bool):
+            dtype = Int(1)
+        elif isinstance(value, int):
+            dtype = Int(32 if value < 0xFFFFFFFF else value.bit_length())
+        else:
+            dtype = Float(64)
+    elif not isinstance(dtype, (Int, UInt, Float, Fixed, UFixed)):
         return ConstantOp(value, dtype, loc)
-    if isinstance(value, bool):
-        return ConstantOp(value, Int(1), loc)
-    if isinstance(value, int):
-        return ConstantOp(
-            value, Int(32 if value < 0xFFFFFFFF else value.bit_length()), loc
-        )
-    return ConstantOp(value, Float(64), loc)
+    # The builder creates a new MLIR constant for each use of a constant,
+    # so the same literal at the same line is a single node. The value
+    # is keyed by its repr to tell apart 0.0 and -0.0, or 1 and True.
+    key = (
+        type(value),
+        repr(value),
+        type(dtype),
+        dtype.bits,
+        getattr(dtype, "fracs", 0),
+        loc,
+    )
+    const = _constants.get(key)
+    if const is None:
+        const = ConstantOp(value, dtype, loc)
+        _constants[key] = const
+    return const
+
+
+def invalidate_types():
+    """Invalidate the inferred types cached on all the expressions, once
+    the type of an existing tensor or the operand of an expression changes"""
+    TypeInference.epoch += 1
+
+
+class UseIndex:
+    """The uses of the tensors in an operation, indexed by tensor name.
+
+    The operation is walked once, so that replacing a tensor only visits
+    its uses, and shared subtrees are visited once.
+    """
+
+    def __init__(self, op):
+        # tensor name -> the nodes holding the tensor in their `tensor`
+        self.uses = {}
+        # the functions whose return tensors are replaced by name
+        self.funcs = []
+        visited = set()
+        worklist = [op]
+        while worklist:
+            node = worklist.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            if isinstance(node, FuncOp):
+                self.funcs.append(node)
+            for attr, value in _attributes(node).items():
+                if attr == "tensor" and getattr(value, "name", None) is not None:
+                    self.uses.setdefault(value.name, []).append(node)
+                if isinstance(value, list):
+                    worklist.extend(value)
+                if isinstance(value, (Operation, Expr)) or hasattr(value, "__dict__"):
+                    worklist.append(value)
+
+    def get(self, tensor):
+        """The nodes using `tensor`"""
+        return self.uses.get(tensor.name, [])
+
+    def replace(self, old_tensor, new_tensor):
+        """Replace the uses of `old_tensor` with `new_tensor`"""
+        invalidate_types()
+        for func in self.funcs:
+            func.return_tensors = [
+                new_tensor if ret.name == old_tensor.name else ret
+                for ret in func.return_tensors
+            ]
+        uses = self.uses.pop(old_tensor.name, [])
+        for node in uses:
+            node.tensor = new_tensor
+        self.uses.setdefault(new_tensor.name, []).extend(uses)
 
 
 def replace_all_uses_with(op, old_tensor, new_tensor):
-    if isinstance(op, FuncOp):
-        new_rets = []
-        for ret in op.return_tensors:
-            if ret.name == old_tensor.name:
-                new_rets.append(new_tensor)
-            else:
-                new_rets.append(ret)
-        op.return_tensors = new_rets
+    UseIndex(op).replace(old_tensor, new_tensor)
 
-    for attr, value in op.__dict__.items():
-        if attr == "tensor" and value.name == old_tensor.name:
-            setattr(op, attr, new_tensor)
-        if isinstance(value, list):
-            for v in value:
-                replace_all_uses_with(v, old_tensor, new_tensor)
-        if hasattr(value, "__dict__"):
-            replace_all_uses_with(value, old_tensor, new_tensor)
+
+@functools.lru_cache(maxsize=None)
+def _slot_names(cls):
+    """The names of the attributes held in the slots of `cls`"""
+    names = set()
+    for base in cls.__mro__:
+        names.update(base.__dict__.get("__slots__", ()))
+    return frozenset(names - {"__dict__", "__weakref__"})
+
+
+def _attributes(op):
+    """The attributes of `op`, held in its slots or in its dict"""
+    attrs = {}
+    for slot in _slot_names(type(op)):
+        try:
+            attrs[slot] = object.__getattribute__(op, slot)
+        except AttributeError:
+            # not set
+            pass
+    attrs.update(getattr(op, "__dict__", {}))
+    return attrs
 
 
 # Unwrap sympy integer or float into python integer or float
@@ -79,13 +168,292 @@ def unwrap_sp(expr):
     return expr
 
 
+class _NotAffine(Exception):
+    """Raised when an expression is not an affine expression on integers"""
+
+
+class AffineExpr:
+    """An affine expression, the sum of atoms scaled by constant
+    coefficients and of a constant.
+
+    The atoms are the names of the iteration variables, and the floordiv,
+    mod and load expressions that cannot be simplified further, in their
+    simplified form. Affine expressions are compared by value.
+    """
+
+    __slots__ = ("terms", "const")
+
+    def __init__(self, terms, const=0):
+        self.terms = {atom: coeff for atom, coeff in terms.items() if coeff != 0}
+        self.const = const
+
+    def is_integral(self):
+        return isinstance(self.const, int) and all(
+            isinstance(coeff, int) for coeff in self.terms.values()
+        )
+
+    def _key(self):
+        return (frozenset(self.terms.items()), self.const)
+
+    def __eq__(self, other):
+        if not isinstance(other, AffineExpr):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        terms = []
+        # the iteration variables first
+        order = sorted(self.terms, key=lambda a: (isinstance(a, tuple), str(a)))
+        for atom in order:
+            coeff = self.terms[atom]
+            if isinstance(atom, tuple):
+                atom = f"{atom[0]}({', '.join(str(v) for v in atom[1:])})"
+            if coeff in (1, -1):
+                terms.append(atom if coeff == 1 else f"-{atom}")
+            else:
+                terms.append(f"{coeff}*{atom}")
+        if self.const != 0 or not terms:
+            terms.append(str(self.const))
+        return " + ".join(terms).replace("+ -", "- ")
+
+
+def _fold(terms, const):
+    """The constant, or the affine expression if any term is left"""
+    affine = AffineExpr(terms, const)
+    if not affine.terms:
+        return affine.const
+    return affine
+
+
+def _terms(value):
+    if isinstance(value, AffineExpr):
+        return value.terms, value.const
+    return {}, value
+
+
+def _affine_add(lhs, rhs, sign=1):
+    if not isinstance(lhs, AffineExpr) and not isinstance(rhs, AffineExpr):
+        return lhs + sign * rhs
+    lhs_terms, lhs_const = _terms(lhs)
+    rhs_terms, rhs_const = _terms(rhs)
+    terms = dict(lhs_terms)
+    for atom, coeff in rhs_terms.items():
+        terms[atom] = terms.get(atom, 0) + sign * coeff
+    return _fold(terms, lhs_const + sign * rhs_const)
+
+
+def _affine_mul(lhs, rhs):
+    if isinstance(lhs, AffineExpr):
+        lhs, rhs = rhs, lhs
+    if isinstance(lhs, AffineExpr):
+        raise _NotAffine()
+    if not isinstance(rhs, AffineExpr):
+        return lhs * rhs
+    return _fold(
+        {atom: coeff * lhs for atom, coeff in rhs.terms.items()}, rhs.const * lhs
+    )
+
+
+def _affine_div(lhs, rhs):
+    if isinstance(rhs, AffineExpr) or rhs == 0:
+        raise _NotAffine()
+    if isinstance(rhs, int):
+        # keep the quotients of integers exact
+        rhs = fractions.Fraction(1, rhs)
+        result = _affine_mul(lhs, rhs)
+        if isinstance(result, fractions.Fraction) and result.denominator == 1:
+            return int(result)
+        return result
+    return _affine_mul(lhs, 1 / rhs)
+
+
+def _affine_floordiv(lhs, rhs):
+    if isinstance(rhs, AffineExpr) or rhs == 0:
+        raise _NotAffine()
+    if not isinstance(lhs, AffineExpr):
+        return lhs // rhs
+    if not isinstance(rhs, int) or not lhs.is_integral():
+        raise _NotAffine()
+    # (rhs * q + r) // rhs = q + r // rhs, as the atoms are integers
+    quotient = {}
+    remainder = {}
+    for atom, coeff in lhs.terms.items():
+        if coeff % rhs == 0:
+            quotient[atom] = coeff // rhs
+        else:
+            remainder[atom] = coeff
+    if remainder:
+        rest = AffineExpr(remainder, lhs.const % rhs)
+        quotient[("floordiv", rest, rhs)] = 1
+    return _fold(quotient, lhs.const // rhs)
+
+
+def _affine_mod(lhs, rhs):
+    if isinstance(rhs, AffineExpr) or rhs == 0:
+        raise _NotAffine()
+    if not isinstance(lhs, AffineExpr):
+        return lhs % rhs
+    if not isinstance(rhs, int) or not lhs.is_integral():
+        raise _NotAffine()
+    # (rhs * q + r) % rhs = r % rhs, as the atoms are integers
+    remainder = {atom: coeff % rhs for atom, coeff in lhs.terms.items()}
+    rest = _fold(remainder, lhs.const % rhs)
+    if not isinstance(rest, AffineExpr):
+        return rest
+    return AffineExpr({("mod", rest, rhs): 1})
+
+
+def _constant(value):
+    if isinstance(value, AffineExpr):
+        raise _NotAffine()
+    return value
+
+
+def _integer(value):
+    if not isinstance(_constant(value), int):
+        raise _NotAffine()
+    return value
+
+
+_INTEGER_OPS = {
+    "LeftShiftOp": operator.lshift,
+    "RightShiftOp": operator.rshift,
+    "And": operator.and_,
+    "Or": operator.or_,
+    "XOr": operator.xor,
+}
+
+_CMP_OPS = {
+    "lt": operator.lt,
+    "le": operator.le,
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "ge": operator.ge,
+}
+
+_MATH_OPS = {
+    "MathExpOp": math.exp,
+    "MathLogOp": math.log,
+    "MathLog2Op": math.log2,
+    "MathLog10Op": math.log10,
+    "MathSqrtOp": math.sqrt,
+    "MathSinOp": math.sin,
+    "MathCosOp": math.cos,
+    "MathTanhOp": math.tanh,
+}
+
+
+def _load(expr, memo):
+    tensor = expr.tensor
+    index = tuple(_simplify(i, memo) for i in expr.index)
+    if tensor.fcompute is None:
+        return AffineExpr({("load", tensor.name, *index): 1})
+    # the compute body is evaluated once per tensor and index
+    key = ("fcompute", id(tensor), index)
+    if key not in memo:
+        memo[key] = (tensor, _simplify(tensor.fcompute(*expr.index), memo))
+    return memo[key][1]
+
+
+# pylint: disable=too-many-return-statements
+def _simplify_expr(expr, memo):
+    if isinstance(expr, ConstantOp):
+        return expr.value
+    if isinstance(expr, IterVar):
+        return AffineExpr({expr.name: 1})
+    if isinstance(expr, LoadOp):
+        return _load(expr, memo)
+    if isinstance(expr, CastOp):
+        return _simplify(expr.expr, memo)
+    if isinstance(expr, Neg):
+        return _affine_mul(_simplify(expr.expr, memo), -1)
+    if isinstance(expr, StructGetOp):
+        struct = expr.struct
+        e = struct.tensor.fcompute(*struct.index)[expr.field]
+        return _simplify(e, memo)
+    if isinstance(expr, SelectOp):
+        if _constant(_simplify(expr.cond, memo)):
+            return _simplify(expr.true_value, memo)
+        return _simplify(expr.false_value, memo)
+    if type(expr).__name__ in _MATH_OPS:
+        value = _constant(_simplify(expr.expr, memo))
+        try:
+            return _MATH_OPS[type(expr).__name__](value)
+        except (ValueError, OverflowError) as err:
+            raise _NotAffine() from err
+    if not isinstance(expr, (BinaryOp, MathPowOp)):
+        raise _NotAffine()
+    lhs = _simplify(expr.lhs, memo)
+    rhs = _simplify(expr.rhs, memo)
+    if isinstance(expr, Add):
+        return _affine_add(lhs, rhs)
+    if isinstance(expr, Sub):
+        return _affine_add(lhs, rhs, -1)
+    if isinstance(expr, Mul):
+        return _affine_mul(lhs, rhs)
+    if isinstance(expr, Div):
+        return _affine_div(lhs, rhs)
+    if isinstance(expr, FloorDiv):
+        return _affine_floordiv(lhs, rhs)
+    if isinstance(expr, Mod):
+        return _affine_mod(lhs, rhs)
+    if isinstance(expr, Cmp):
+        # the comparison is decided by the constant difference of the sides
+        diff = _constant(_affine_add(lhs, rhs, -1))
+        return int(_CMP_OPS[expr.name](diff, 0))
+    if isinstance(expr, LogicalAnd):
+        return _constant(lhs) and _constant(rhs)
+    if isinstance(expr, LogicalOr):
+        return _constant(lhs) or _constant(rhs)
+    if isinstance(expr, MathPowOp):
+        try:
+            return _constant(lhs) ** _constant(rhs)
+        except (ZeroDivisionError, OverflowError) as err:
+            raise _NotAffine() from err
+    if type(expr).__name__ in _INTEGER_OPS:
+        return _INTEGER_OPS[type(expr).__name__](_integer(lhs), _integer(rhs))
+    raise _NotAffine()
+
+
+def _simplify(expr, memo):
+    if isinstance(expr, bool):
+        return int(expr)
+    if isinstance(expr, (int, float)):
+        return expr
+    if id(expr) not in memo:
+        # keep the expression alive, so that its id is not reused
+        memo[id(expr)] = (expr, _simplify_expr(expr, memo))
+    return memo[id(expr)][1]
+
+
 def simplify(expr):
-    # pylint: disable=too-many-return-statements, too-many-branches
     """
     simplifies an expression by replacing all constants with their values
     and compute the result if possible
-    Only supports affine expressions on integers and floats
+
+    Affine expressions on the iteration variables are simplified natively,
+    into a constant or an AffineExpr. The other expressions are simplified
+    with sympy if it is installed, and returned unchanged otherwise.
     """
+    try:
+        return _simplify(expr, {})
+    except _NotAffine:
+        pass
+    if sp is None:
+        return expr
+    result = _sympy_simplify(expr)
+    if isinstance(result, sp.Basic) and result.is_number:
+        return int(result) if result.is_integer else float(result)
+    return result
+
+
+def _sympy_simplify(expr):
+    # pylint: disable=too-many-return-statements, too-many-branches
+    """Simplifies an expression with sympy"""
     if isinstance(expr, (int, float)):
         return expr
     if isinstance(expr, sp.core.numbers.Integer):
@@ -95,56 +463,56 @@ def simplify(expr):
     if isinstance(expr, IterVar):
         return sp.symbols(expr.name)
     if isinstance(expr, Add):
-        return sp.simplify(simplify(expr.lhs) + simplify(expr.rhs))
+        return sp.simplify(_sympy_simplify(expr.lhs) + _sympy_simplify(expr.rhs))
     if isinstance(expr, Sub):
-        return sp.simplify(simplify(expr.lhs) - simplify(expr.rhs))
+        return sp.simplify(_sympy_simplify(expr.lhs) - _sympy_simplify(expr.rhs))
     if isinstance(expr, Mul):
-        return sp.simplify(simplify(expr.lhs) * simplify(expr.rhs))
+        return sp.simplify(_sympy_simplify(expr.lhs) * _sympy_simplify(expr.rhs))
     if isinstance(expr, Div):
-        return sp.simplify(simplify(expr.lhs) / simplify(expr.rhs))
+        return sp.simplify(_sympy_simplify(expr.lhs) / _sympy_simplify(expr.rhs))
     if isinstance(expr, FloorDiv):
-        return sp.simplify(simplify(expr.lhs) // simplify(expr.rhs))
+        return sp.simplify(_sympy_simplify(expr.lhs) // _sympy_simplify(expr.rhs))
     if isinstance(expr, Mod):
-        return sp.simplify(simplify(expr.lhs) % simplify(expr.rhs))
+        return sp.simplify(_sympy_simplify(expr.lhs) % _sympy_simplify(expr.rhs))
     if isinstance(expr, LoadOp):
         tensor = expr.tensor
         if tensor.fcompute is None:
             return expr
         index = expr.index
-        return sp.simplify(simplify(tensor.fcompute(*index)))
+        return sp.simplify(_sympy_simplify(tensor.fcompute(*index)))
     if isinstance(expr, LeftShiftOp):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.simplify(lhs << rhs)
     if isinstance(expr, RightShiftOp):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.simplify(lhs >> rhs)
     if isinstance(expr, And):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.simplify(lhs & rhs)
     if isinstance(expr, Or):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.simplify(lhs | rhs)
     if isinstance(expr, XOr):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.simplify(lhs ^ rhs)
     if isinstance(expr, CastOp):
-        return simplify(expr.expr)
+        return _sympy_simplify(expr.expr)
     if isinstance(expr, LogicalAnd):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.simplify(lhs and rhs)
     if isinstance(expr, LogicalOr):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.simplify(lhs or rhs)
     if isinstance(expr, Cmp):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         op = expr.name
         if op == "lt":
             output = lhs < rhs
@@ -164,67 +532,88 @@ def simplify(expr):
             return sp.simplify(1)
         return sp.simplify(0)
     if isinstance(expr, Neg):
-        return sp.simplify(-unwrap_sp(simplify(expr.expr)))
+        return sp.simplify(-unwrap_sp(_sympy_simplify(expr.expr)))
     if isinstance(expr, StructGetOp):
         struct = expr.struct
         index = struct.index
         e = struct.tensor.fcompute(*index)[expr.field]
-        return sp.simplify(simplify(e))
+        return sp.simplify(_sympy_simplify(e))
     if isinstance(expr, SelectOp):
-        if simplify(expr.cond):
-            return sp.simplify(simplify(expr.true_value))
-        return sp.simplify(simplify(expr.false_value))
+        if _sympy_simplify(expr.cond):
+            return sp.simplify(_sympy_simplify(expr.true_value))
+        return sp.simplify(_sympy_simplify(expr.false_value))
     if isinstance(expr, MathExpOp):
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.exp(expr)
     if isinstance(expr, MathPowOp):
-        lhs = unwrap_sp(simplify(expr.lhs))
-        rhs = unwrap_sp(simplify(expr.rhs))
+        lhs = unwrap_sp(_sympy_simplify(expr.lhs))
+        rhs = unwrap_sp(_sympy_simplify(expr.rhs))
         return sp.Pow(lhs, rhs)
     if isinstance(expr, MathLogOp):
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.log(expr)
     if isinstance(expr, MathLog2Op):
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.log(expr, 2)
     if isinstance(expr, MathLog10Op):
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.log(expr, 10)
     if isinstance(expr, MathSqrtOp):
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.sqrt(expr)
     if isinstance(expr, MathSinOp):
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.sin(expr)
     if isinstance(expr, MathCosOp):
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.cos(expr)
     # if isinstance(expr, MathTanOp):
-    #     expr = unwrap_sp(simplify(expr.expr))
+    #     expr = unwrap_sp(_sympy_simplify(expr.expr))
     #     return sp.tan(expr)
     if isinstance(expr, MathTanhOp):  # pylint: disable=no-else-return
-        expr = unwrap_sp(simplify(expr.expr))
+        expr = unwrap_sp(_sympy_simplify(expr.expr))
         return sp.tanh(expr)
     else:
         raise HCLError(f"Unsupported expression type: {type(expr)}")
 
 
 class Location:
-    """Filename and linenumber"""
+    """Filename and linenumber
+
+    Locations are never mutated, so all the nodes created at the same
+    line share a single location.
+    """
+
+    __slots__ = ("filename", "lineno")
+    _interned = {}
 
-    def __init__(self, filename, lineno):
-        self.filename = filename
-        self.lineno = lineno
+    def __new__(cls, filename, lineno):
+        loc = cls._interned.get((filename, lineno))
+        if loc is None:
+            loc = super().__new__(cls)
+            loc.filename = filename
+            loc.lineno = lineno
+            cls._interned[(filename, lineno)] = loc
+        return loc
+
+    def __getnewargs__(self):
+        return (self.filename, self.lineno)
 
     def __str__(self):
         return f"{self.filename}:{self.lineno}"
 
+    def __deepcopy__(self, memo):
+        # copies of an AST share the locations
+        return self
+
 
 class Scope:
     """Scope class to manage operation insertion scopes."""
 
     def __init__(self):
         self.stack = []
+        # name -> SymbolicDim of the kernel being traced
+        self.dims = {}
 
     def push(self, new_scope: list):
         self.stack.append(new_scope)
@@ -243,6 +632,8 @@ class Scope:
 
     def reset(self):
         self.stack.clear()
+        self.dims.clear()
+        _constants.clear()
         # this list is for operations
         # that are not enclosed in a top-level function
         # in the case that there is a top-level function,
@@ -265,6 +656,10 @@ class Operation:
 
     """
 
+    # The attributes of the frequent nodes are held in slots, the others
+    # in a dict created on their first assignment
+    __slots__ = ("name", "loc", "ir_op", "result", "reusable", "__dict__")
+
     def __init__(self, name, loc):
         self.name = name
         self.loc = loc
@@ -291,11 +686,24 @@ class Expr:
 
     """
 
+    __slots__ = (
+        "name",
+        "loc",
+        "dtype",
+        "ir_op",
+        "result",
+        "reusable",
+        "inferred_type",
+        "inferred_epoch",
+        "__dict__",
+    )
+
     def __init__(self, name, loc):
         self.name = name
         self.loc = loc
         self.dtype = None
-        self.tinf_engine = TypeInference()
+        # the type cached by TypeInference, and the epoch it was inferred in
+        self.inferred_type = None
         # When an expression is built, its result will be set
         self.result = None
         # whether a new MLIR operation is built
@@ -489,9 +897,13 @@ class Expr:
 
     def __getattr__(self, key):
         """Access a field of a struct value"""
-        # bypass the attribute lookup to avoid infinite recursion
-        if key in self.__dict__:
-            return self.__dict__[key]
+        # special methods (e.g., __deepcopy__, __setstate__) are
+        # probed with getattr() by copy and pickle
+        if key.startswith("__"):
+            raise AttributeError(key)
+        # slots not set yet, e.g., the tensor of a LoadOp being copied
+        if key in _slot_names(type(self)):
+            return None
         if isinstance(self, LoadOp):
             # access a field from a struct tensor
             key_list = list(self.tensor.dtype.dtype_dict.keys())
@@ -517,6 +929,8 @@ class UnaryOp(Expr):
 
     """
 
+    __slots__ = ("expr",)
+
     def __init__(self, op, expr, loc):
         super().__init__(op, loc)
         expr = immediate_to_constant(expr, loc)
@@ -536,6 +950,8 @@ class BinaryOp(Expr):
 
     """
 
+    __slots__ = ("lhs", "rhs")
+
     def __init__(self, op, lhs, rhs, loc):
         super().__init__(op, loc)
         lhs = immediate_to_constant(lhs, loc)
@@ -579,6 +995,8 @@ class CastOp(Expr):
 
     """
 
+    __slots__ = ("expr",)
+
     def __init__(self, expr, dtype, loc):
         super().__init__(dtype_to_str(dtype), loc)
         expr = immediate_to_constant(expr, loc)
@@ -593,6 +1011,8 @@ class CastOp(Expr):
 class Add(BinaryOp):
     """Addition operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("+", lhs, rhs, loc)
 
@@ -601,6 +1021,8 @@ class Add(BinaryOp):
 class Sub(BinaryOp):
     """Subtraction operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("-", lhs, rhs, loc)
 
@@ -609,6 +1031,8 @@ class Sub(BinaryOp):
 class Mul(BinaryOp):
     """Multiplication operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("*", lhs, rhs, loc)
 
@@ -617,6 +1041,8 @@ class Mul(BinaryOp):
 class Div(BinaryOp):
     """Division operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("/", lhs, rhs, loc)
 
@@ -625,6 +1051,8 @@ class Div(BinaryOp):
 class Min(BinaryOp):
     """Min operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("min", lhs, rhs, loc)
 
@@ -636,6 +1064,8 @@ class Min(BinaryOp):
 class Max(BinaryOp):
     """Max operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("max", lhs, rhs, loc)
 
@@ -647,6 +1077,8 @@ class Max(BinaryOp):
 class FloorDiv(BinaryOp):
     """Floor division operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("//", lhs, rhs, loc)
 
@@ -655,6 +1087,8 @@ class FloorDiv(BinaryOp):
 class Mod(BinaryOp):
     """Modulo operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("%", lhs, rhs, loc)
 
@@ -663,6 +1097,8 @@ class Mod(BinaryOp):
 class LeftShiftOp(BinaryOp):
     """Left shift operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("<<", lhs, rhs, loc)
 
@@ -671,6 +1107,8 @@ class LeftShiftOp(BinaryOp):
 class RightShiftOp(BinaryOp):
     """Right shift operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__(">>", lhs, rhs, loc)
 
@@ -679,6 +1117,8 @@ class RightShiftOp(BinaryOp):
 class Cmp(BinaryOp):
     """Comparison operation."""
 
+    __slots__ = ()
+
     def __init__(self, op, lhs, rhs, loc):
         super().__init__(op, lhs, rhs, loc)
         self.dtype = UInt(1)
@@ -688,6 +1128,8 @@ class Cmp(BinaryOp):
 class And(BinaryOp):
     """Bitwise and operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("&", lhs, rhs, loc)
 
@@ -696,6 +1138,8 @@ class And(BinaryOp):
 class Or(BinaryOp):
     """Bitwise or operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("|", lhs, rhs, loc)
 
@@ -704,6 +1148,8 @@ class Or(BinaryOp):
 class XOr(BinaryOp):
     """Bitwise xor operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("^", lhs, rhs, loc)
 
@@ -712,6 +1158,8 @@ class XOr(BinaryOp):
 class Invert(UnaryOp):
     """Bitwise invert operation, e.g. 0b1011 -> 0b0100."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("~", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -720,6 +1168,8 @@ class Invert(UnaryOp):
 class Neg(UnaryOp):
     """Negate operation, i.e. -x for any expression x."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("neg", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -728,6 +1178,8 @@ class Neg(UnaryOp):
 class BitReverseOp(UnaryOp):
     """Bit reverse operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("bit_reverse", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -736,6 +1188,8 @@ class BitReverseOp(UnaryOp):
 class BitCastOp(UnaryOp):
     """Bit cast operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, dtype, loc):
         super().__init__("bit_cast", expr, loc)
         self.dtype = dtype
@@ -745,6 +1199,8 @@ class BitCastOp(UnaryOp):
 class MathExpOp(UnaryOp):
     """Mathematical exponential operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("exp", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -754,6 +1210,8 @@ class MathExpOp(UnaryOp):
 class MathPowOp(BinaryOp):
     """Mathematical power operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("pow", lhs, rhs, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -763,6 +1221,8 @@ class MathPowOp(BinaryOp):
 class MathLogOp(UnaryOp):
     """Mathematical log operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("log", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -772,6 +1232,8 @@ class MathLogOp(UnaryOp):
 class MathLog2Op(UnaryOp):
     """Mathematical log2 operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("log2", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -781,6 +1243,8 @@ class MathLog2Op(UnaryOp):
 class MathLog10Op(UnaryOp):
     """Mathematical log10 operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("log10", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -790,6 +1254,8 @@ class MathLog10Op(UnaryOp):
 class MathSqrtOp(UnaryOp):
     """Mathematical square root operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("sqrt", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -799,6 +1265,8 @@ class MathSqrtOp(UnaryOp):
 class MathSinOp(UnaryOp):
     """Mathematical sine operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("sin", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -808,6 +1276,8 @@ class MathSinOp(UnaryOp):
 class MathCosOp(UnaryOp):
     """Mathematical cosine operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("cos", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -817,6 +1287,8 @@ class MathCosOp(UnaryOp):
 class MathTanOp(UnaryOp):
     """Mathematical tangent operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("tan", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -826,6 +1298,8 @@ class MathTanOp(UnaryOp):
 class MathTanhOp(UnaryOp):
     """Mathematical hyperbolic tangent operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("tanh", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -835,6 +1309,8 @@ class MathTanhOp(UnaryOp):
 class LogicalAnd(BinaryOp):
     """Logical and operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("&&", lhs, rhs, loc)
 
@@ -843,6 +1319,8 @@ class LogicalAnd(BinaryOp):
 class LogicalOr(BinaryOp):
     """Logical or operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("||", lhs, rhs, loc)
 
@@ -851,6 +1329,8 @@ class LogicalOr(BinaryOp):
 class LogicalXOr(BinaryOp):
     """Logical xor operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("^^", lhs, rhs, loc)
 
@@ -874,6 +1354,8 @@ class PrintMemRefOp(Operation):
 class ConstantOp(Expr):
     """Constant scalar operation."""
 
+    __slots__ = ("value",)
+
     def __init__(self, value, dtype, loc):
         super().__init__(str(value), loc)
         self.value = value
@@ -887,11 +1369,13 @@ class ConstantTensorOp(Expr):
     """Constant tensor operation."""
 
     # TODO(Niansong): handle overflow
-    def __init__(self, values, name, shape, dtype, loc):
+    def __init__(self, values, name, shape, dtype, loc, external=False):
         super().__init__(name, loc)
         self.values = values
         self.dtype = dtype
         self.shape = shape
+        # the values are stored in a file instead of the module
+        self.external = external
         self.tensor = AllocOp(name, shape, dtype, loc)
         self.level = len(scope)
 
@@ -905,6 +1389,8 @@ class ConstantTensorOp(Expr):
 class LoadOp(Expr):
     """Load operation."""
 
+    __slots__ = ("tensor", "index")
+
     def __init__(self, tensor, index, loc):
         super().__init__("getitem", loc)
         self.tensor = tensor
@@ -927,6 +1413,8 @@ class LoadOp(Expr):
 class StoreOp(Operation):
     """Store operation."""
 
+    __slots__ = ("tensor", "index", "value", "level")
+
     def __init__(self, tensor, index, value, loc):
         super().__init__("setitem", loc)
         self.tensor = tensor
@@ -999,7 +1487,7 @@ class GetSliceOp(Expr):
             )
         bitwidth = self.end - self.start + 1
         bitwidth = simplify(bitwidth)
-        if bitwidth.is_constant():
+        if isinstance(bitwidth, numbers.Real):
             self.dtype = UInt(int(bitwidth))
         else:
             self.dtype = None
@@ -1389,6 +1877,38 @@ class ReduceVar(IterVar):
         return self.bound[1]
 
 
+class SymbolicDim(Expr):
+    """A dimension of a tensor only known at runtime.
+
+    The dimensions with the same name are the same object, and have the
+    same size, until the kernel is traced or hcl.init() is called: they
+    are held in the scope of the kernel being traced. A function taking
+    tensors with symbolic dimensions is lowered with dynamic memrefs,
+    and the sizes are read from the memref descriptors of its arguments.
+    """
+
+    def __init__(self, name, loc):
+        super().__init__(name, loc)
+        self.dtype = Index()
+        self.reusable = True
+
+    @classmethod
+    def get(cls, name, loc):
+        dim = scope.dims.get(name)
+        if dim is None:
+            dim = cls(name, loc)
+            scope.dims[name] = dim
+        return dim
+
+    def __repr__(self):
+        return self.name
+
+    def __deepcopy__(self, memo):
+        # copies of an AST share the dimensions of their arguments,
+        # whose sizes are read when building the function
+        return self
+
+
 class ReturnOp(Operation):
     def __init__(self, expr, loc):
         super().__init__("return", loc)
@@ -1902,6 +2422,14 @@ class AST:
         self.region = [top_func]
         self.top_func = top_func
 
+    def clone(self, memo=None):
+        """Deep copy the AST.
+
+        As in copy.deepcopy, `memo` maps the id of an object to the
+        object that the copy should refer to in its place.
+        """
+        return copy.deepcopy(self, memo)
+
     def __repr__(self):
         code_str = ""
         for op in self.region:
@@ -1910,11 +2438,30 @@ class AST:
 
 
 class TypeInference:
-    """A type inference engine for HeteroCL programs."""
+    """A type inference engine for HeteroCL programs.
+
+    The engine is stateless, all the expressions share one instance.
+    The type of an expression is cached on it, so that the types of the
+    shared subexpressions of a DAG are inferred once. The cached types
+    are valid while the epoch they were inferred in is the current one,
+    see invalidate_types().
+    """
+
+    epoch = 0
 
-    # pylint: disable=too-many-return-statements
     def infer(self, expr):
         """Infer the type of an expression"""
+        if not isinstance(expr, Expr):
+            return self._infer(expr)
+        if expr.inferred_type is not None and expr.inferred_epoch == self.epoch:
+            return expr.inferred_type
+        res_type = self._infer(expr)
+        expr.inferred_type = res_type
+        expr.inferred_epoch = self.epoch
+        return res_type
+
+    # pylint: disable=too-many-return-statements
+    def _infer(self, expr):
         if isinstance(expr, LoadOp):
             return self.infer_load(expr)
         if isinstance(expr, BinaryOp):
@@ -1923,7 +2470,7 @@ class TypeInference:
             return self.infer_select(expr)
         if isinstance(expr, ConstantOp):
             return self.infer_const(expr)
-        if isinstance(expr, IterVar):
+        if isinstance(expr, (IterVar, SymbolicDim)):
             return Index()
         if isinstance(
             expr, (CastOp, BitCastOp, GetBitOp, GetSliceOp, StructConstructOp)
@@ -2004,3 +2551,6 @@ class TypeInference:
 
     def infer_const(self, expr):
         return expr.dtype
+
+
+Expr.tinf_engine = TypeInference()
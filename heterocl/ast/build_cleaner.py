@@ -2,27 +2,80 @@
 # SPDX-License-Identifier: Apache-2.0
 # pylint: disable=too-many-public-methods
 
-from . import ast_visitor
+from . import ast, ast_visitor
+
+# The attributes holding the children that the cleaner walks into,
+# by the visit method of the nodes
+_CHILDREN = {
+    "visit_ast": ("region",),
+    "visit_compute": ("tensor", "aux_tensor", "body"),
+    "visit_reduce": ("scalar", "expr"),
+    "visit_cmp": ("lhs", "rhs"),
+    "visit_binary": ("lhs", "rhs"),
+    "visit_math_tanh": ("expr",),
+    "visit_bitcast": ("expr",),
+    "visit_store": ("value",),
+    "visit_cast": ("expr",),
+    "visit_if": ("cond", "body"),
+    "visit_for": ("body",),
+    "visit_while": ("cond", "body"),
+    "visit_select": ("cond", "true_value", "false_value"),
+    "visit_print": ("args",),
+    "visit_print_tensor": ("tensor",),
+    "visit_get_bit": ("expr", "index"),
+    "visit_get_slice": ("expr", "start", "end"),
+    "visit_set_bit": ("expr", "index", "value"),
+    "visit_set_slice": ("expr", "start", "end", "value"),
+    "visit_bit_reverse": ("expr",),
+    "visit_struct_construct": ("args",),
+    "visit_struct_get": ("struct",),
+    "visit_func": ("body", "return_tensors"),
+    "visit_call": ("args",),
+    "visit_neg": ("expr",),
+    "visit_loop_handle": ("op_hdl",),
+    "visit_reuse_at": ("target", "axis"),
+    "visit_partition": ("tensor",),
+    "visit_replace": ("target", "src"),
+    "visit_reshape": ("tensor",),
+    "visit_reform": ("target",),
+    "visit_buffer_at": ("target", "axis"),
+    "visit_inter_kernel_to": ("tensor", "stage"),
+    "visit_outline": ("stage_hdls",),
+    "visit_reorder": ("args",),
+    "visit_split": ("parent",),
+    "visit_tile": ("x_parent", "y_parent"),
+    "visit_pipeline": ("target",),
+    "visit_unroll": ("target",),
+    "visit_parallel": ("target",),
+    "visit_fuse": ("arg_list",),
+    "visit_compute_at": ("stage", "parent", "axis"),
+    "visit_systolic": ("target",),
+}
 
 
 class ASTCleaner(ast_visitor.ASTVisitor):
+    """Clear the build results of all the operations, so that the AST
+    can be built again."""
+
     def __init__(self) -> None:
         super().__init__("cleaner")
 
-    def visit_ast(self, _ast, *args, **kwargs):
-        for op in _ast.region:
-            self.visit(op, *args, **kwargs)
+    def children(self, op):
+        children = []
+        for attr in _CHILDREN.get(ast_visitor.visit_method(type(op)), ()):
+            value = getattr(op, attr)
+            if isinstance(value, (list, tuple)):
+                children.extend(value)
+            else:
+                children.append(value)
+        if isinstance(op, ast.IfOp) and op.else_branch_valid:
+            children.extend(op.else_body)
+        return children
 
     def visit_func(self, op, *args, **kwargs):
         op.ir_op = None
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
-        for ret in op.return_tensors:
-            self.visit(ret, *args, **kwargs)
 
     def visit_call(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
@@ -30,61 +83,37 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.result = None
 
     def visit_compute(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
-        self.visit(op.aux_tensor, *args, **kwargs)
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_for(self, op, *args, **kwargs):
         op.iter_var.parent_loop = None
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
-
-    def visit_while(self, op, *args, **kwargs):
-        self.visit(op.cond, *args, **kwargs)
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
 
     def visit_alloc(self, op, *args, **kwargs):
         op.result = None
         op.ir_op = None
 
     def visit_binary(self, op, *args, **kwargs):
-        self.visit(op.lhs, *args, **kwargs)
-        self.visit(op.rhs, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_math_tanh(self, op, *args, **kwargs):
         op.result = None
         op.ir_op = None
-        self.visit(op.expr, *args, **kwargs)
 
     def visit_neg(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_cmp(self, op, *args, **kwargs):
-        self.visit(op.lhs, *args, **kwargs)
-        self.visit(op.rhs, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_load(self, op, *args, **kwargs):
-        # for index in op.index:
-        #   self.visit(index, *args, **kwargs)
-        # self.visit(op.tensor, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_store(self, op, *args, **kwargs):
-        # for index in op.index:
-        #     self.visit(index, *args, **kwargs)
-        # self.visit(op.tensor, *args, **kwargs)
-        self.visit(op.value, *args, **kwargs)
         op.ir_op = None
 
     def visit_constant(self, op, *args, **kwargs):
@@ -92,76 +121,47 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.ir_op = None
 
     def visit_cast(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_if(self, op, *args, **kwargs):
-        self.visit(op.cond, *args, **kwargs)
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
-        if op.else_branch_valid:
-            for body_op in op.else_body:
-                self.visit(body_op, *args, **kwargs)
         op.ir_op = None
 
     def visit_reduce(self, op, *args, **kwargs):
-        self.visit(op.scalar, *args, **kwargs)
-        self.visit(op.expr, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_select(self, op, *args, **kwargs):
-        self.visit(op.cond, *args, **kwargs)
-        self.visit(op.true_value, *args, **kwargs)
-        self.visit(op.false_value, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_bitcast(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_print(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_print_tensor(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_get_bit(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.index, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_get_slice(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.start, *args, **kwargs)
-        self.visit(op.end, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_set_bit(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.index, *args, **kwargs)
-        self.visit(op.value, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_set_slice(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.start, *args, **kwargs)
-        self.visit(op.end, *args, **kwargs)
-        self.visit(op.value, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_bit_reverse(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_constant_tensor(self, op, *args, **kwargs):
         op.ir_op = None
@@ -169,14 +169,11 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.tensor.ir_op = None
         op.tensor.result = None
 
-    def visit_struct_constuct(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
+    def visit_struct_construct(self, op, *args, **kwargs):
         op.ir_op = None
         op.result = None
 
     def visit_struct_get(self, op, *args, **kwargs):
-        self.visit(op.struct, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
@@ -185,90 +182,60 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.result = None
 
     def visit_loop_handle(self, op, *args, **kwargs):
-        self.visit(op.op_hdl, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_partition(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
         op.ir_op = None
 
     def visit_replace(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
-        self.visit(op.src, *args, **kwargs)
         op.ir_op = None
 
     def visit_reshape(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
         op.ir_op = None
 
     def visit_reform(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_reuse_at(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
-        self.visit(op.axis, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_buffer_at(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
-        self.visit(op.axis, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_inter_kernel_to(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
-        self.visit(op.stage, *args, **kwargs)
         op.ir_op = None
 
     def visit_outline(self, op, *args, **kwargs):
-        for hdl in op.stage_hdls:
-            self.visit(hdl, *args, **kwargs)
         op.ir_op = None
 
     def visit_reorder(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
         op.ir_op = None
 
     def visit_split(self, op, *args, **kwargs):
-        self.visit(op.parent, *args, **kwargs)
         op.ir_op = None
         for loop in op.results:
             loop.result = None
 
     def visit_tile(self, op, *args, **kwargs):
-        self.visit(op.x_parent, *args, **kwargs)
-        self.visit(op.y_parent, *args, **kwargs)
         op.ir_op = None
         for loop in op.results:
             loop.result = None
 
     def visit_pipeline(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_unroll(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_parallel(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_fuse(self, op, *args, **kwargs):
-        for arg in op.arg_list:
-            self.visit(arg, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_compute_at(self, op, *args, **kwargs):
-        self.visit(op.stage, *args, **kwargs)
-        self.visit(op.parent, *args, **kwargs)
-        self.visit(op.axis, *args, **kwargs)
         op.ir_op = None
-
-    def visit_systolic(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
@@ -29,6 +29,7 @@ from hcl_mlir.ir import (
     UnitAttr,
     FlatSymbolRefAttr,
     AffineConstantExpr,
+    AffineSymbolExpr,
     AffineMap,
     AffineMapAttr,
     IntegerType,
@@ -52,6 +53,7 @@ from hcl_mlir.exceptions import (
 
 from . import ast
 from ..context import get_context, get_location
+from .. import cache as compile_cache
 from ..utils import hcl_dtype_to_mlir, get_extra_type_hints
 from .. import types as htypes
 from . import build_cleaner
@@ -216,6 +218,19 @@ def get_op_class(op, typ):
     raise APIError(f"Unsupported op in get_op_class: {op}")
 
 
+# ShapedType::kDynamicSize of LLVM 15.0.0, the version HeteroCL is
+# built with: its Python bindings only have ShapedType.is_dynamic_size(),
+# ShapedType.get_dynamic_size() comes with LLVM 16, where it changes
+DYNAMIC_SIZE = -1
+
+
+def memref_shape(shape):
+    """The shape of the memref of a tensor, its symbolic dimensions
+    being dynamic.
+    """
+    return [DYNAMIC_SIZE if isinstance(dim, ast.SymbolicDim) else dim for dim in shape]
+
+
 def is_all_field_int(dtype):
     """Check if a struct type has all integer fields
     When it has nested struct field, recursively check
@@ -256,6 +271,7 @@ class IRBuilder:
         self.cleaner = build_cleaner.ASTCleaner()
         self.tensor_dict = {}  # tensor name -> memref.allocOp
         self.BIT_OPS = False
+        self._locations = {}  # ast.Location -> MLIR Location
 
     def build(self):
         if self._ast is None:
@@ -270,6 +286,22 @@ class IRBuilder:
 
         self.top_func = self._ast.top_func.ir_op
 
+    def get_location(self, loc):
+        """Returns the MLIR location of the AST location `loc`.
+
+        The AST locations are shared by the nodes created at the same
+        line, so each one is converted once. Line 0 is an unknown
+        location, e.g., when the locations are not tracked.
+        """
+        mlir_loc = self._locations.get(loc)
+        if mlir_loc is None:
+            if loc.lineno == 0:
+                mlir_loc = Location.unknown()
+            else:
+                mlir_loc = Location.file(loc.filename, loc.lineno, 0)
+            self._locations[loc] = mlir_loc
+        return mlir_loc
+
     def build_visitor(self, op, ip):
         """Build dispatcher
 
@@ -284,6 +316,8 @@ class IRBuilder:
             self.build_compute(op, ip)
         elif isinstance(op, ast.IterVar):
             self.build_iter_var(op, ip)
+        elif isinstance(op, ast.SymbolicDim):
+            self.build_symbolic_dim(op, ip)
         elif isinstance(op, ast.ReduceOp):
             self.build_reduce(op, ip)
         elif isinstance(op, ast.AllocOp):
@@ -402,7 +436,7 @@ class IRBuilder:
             )
 
     def build_func_op(self, op: ast.FuncOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         # use global insetion point instead
         ip = InsertionPoint(self.module.body)
         input_types = []
@@ -411,7 +445,7 @@ class IRBuilder:
             if isinstance(arg, ast.AllocOp):
                 ele_type = hcl_dtype_to_mlir(arg.dtype, signless=True)
                 input_typehints.append(get_extra_type_hints(arg.dtype))
-                memref_type = MemRefType.get(arg.shape, ele_type)
+                memref_type = MemRefType.get(memref_shape(arg.shape), ele_type)
                 input_types.append(memref_type)
             else:
                 dtype = self.tinf_engine.infer(arg)
@@ -424,7 +458,7 @@ class IRBuilder:
             if isinstance(ret, ast.AllocOp):
                 ele_type = hcl_dtype_to_mlir(ret.dtype, signless=True)
                 output_typehints.append(get_extra_type_hints(ret.dtype))
-                memref_type = MemRefType.get(ret.shape, ele_type)
+                memref_type = MemRefType.get(memref_shape(ret.shape), ele_type)
                 output_types.append(memref_type)
             else:
                 dtype = self.tinf_engine.infer(ret)
@@ -447,6 +481,7 @@ class IRBuilder:
 
         # build body
         ip = InsertionPoint(func_op.entry_block)
+        bound_dims = self.bind_symbolic_dims(op, ip, loc)
         for body_op in op.body:
             self.build_visitor(body_op, ip)
         for ret in op.return_tensors:
@@ -470,9 +505,52 @@ class IRBuilder:
         # we need to make sure that the result is not reused
         for arg in op.args:
             arg.result = None
+        for dim, result in bound_dims:
+            dim.result = result
+
+    def bind_symbolic_dims(self, op: ast.FuncOp, ip, loc):
+        """Read the sizes of the symbolic dimensions from the memrefs of
+        the function arguments. Returns the dimensions bound, along with
+        their previous results, to be restored once the function is built.
+        """
+        bound_dims = []
+        for arg in op.args:
+            if not isinstance(arg, ast.AllocOp):
+                continue
+            for i, dim in enumerate(arg.shape):
+                if not isinstance(dim, ast.SymbolicDim):
+                    continue
+                if any(dim is bound for bound, _ in bound_dims):
+                    continue
+                bound_dims.append((dim, dim.result))
+                index = arith_d.ConstantOp(
+                    IndexType.get(),
+                    IntegerAttr.get(IndexType.get(), i),
+                    ip=ip,
+                    loc=loc,
+                )
+                dim_op = memref_d.DimOp(
+                    IndexType.get(), arg.result, index.result, ip=ip, loc=loc
+                )
+                dim.result = dim_op.result
+        for ret in op.return_tensors:
+            for dim in getattr(ret, "shape", ()):
+                if isinstance(dim, ast.SymbolicDim) and not any(
+                    dim is bound for bound, _ in bound_dims
+                ):
+                    raise APIError(
+                        f"Symbolic dimension {dim} of {ret.name} is not a dimension of an argument of {op.name}"
+                    )
+        return bound_dims
+
+    def build_symbolic_dim(self, op: ast.SymbolicDim, ip):
+        # the result is set when building the function taking the tensor
+        raise APIError(
+            f"Symbolic dimension {op} is not a dimension of an argument of the function"
+        )
 
     def build_call_op(self, op: ast.CallOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         func = FlatSymbolRefAttr.get(op.name)
         # build arguments
         args = []
@@ -483,7 +561,7 @@ class IRBuilder:
         for ret in op.rets:
             if isinstance(ret, ast.AllocOp):
                 ele_type = hcl_dtype_to_mlir(ret.dtype, signless=True)
-                memref_type = MemRefType.get(ret.shape, ele_type)
+                memref_type = MemRefType.get(memref_shape(ret.shape), ele_type)
                 return_types.append(memref_type)
             else:
                 dtype = self.tinf_engine.infer(ret)
@@ -537,15 +615,23 @@ class IRBuilder:
             lb, ub = ub + 1, lb + 1
             step = -step
 
-        if isinstance(lb, int) and isinstance(ub, int):  # build affine for loop
+        if isinstance(lb, int) and isinstance(ub, (int, ast.SymbolicDim)):
+            # build affine for loop
             lbCst = AffineConstantExpr.get(lb)
             lbMap = AffineMap.get(dim_count=0, symbol_count=0, exprs=[lbCst])
             lbMapAttr = AffineMapAttr.get(lbMap)
             lb_expr = None
-            ubCst = AffineConstantExpr.get(ub)
-            ubMap = AffineMap.get(dim_count=0, symbol_count=0, exprs=[ubCst])
+            if isinstance(ub, ast.SymbolicDim):
+                # the size read at the function entry is a valid symbol
+                self.build_visitor(ub, ip)
+                ubSym = AffineSymbolExpr.get(0)
+                ubMap = AffineMap.get(dim_count=0, symbol_count=1, exprs=[ubSym])
+                ub_expr = [ub.result]
+            else:
+                ubCst = AffineConstantExpr.get(ub)
+                ubMap = AffineMap.get(dim_count=0, symbol_count=0, exprs=[ubCst])
+                ub_expr = None
             ubMapAttr = AffineMapAttr.get(ubMap)
-            ub_expr = None
             step = IntegerAttr.get(IntegerType.get_signless(32), step)
             for_op = affine_d.AffineForOp(
                 lb_expr,
@@ -591,7 +677,7 @@ class IRBuilder:
         return for_op
 
     def build_compute(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         iv_names = [iv.name for iv in op.iter_vars]
         with get_context(), loc:
             # build output tensor
@@ -620,7 +706,7 @@ class IRBuilder:
                 self.build_visitor(body_op, ip)
 
     def build_for_op(self, op: ast.ForOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         with get_context(), loc:
             stage = "" if op.tag is None else op.tag
             loop = self.build_for_loop(
@@ -632,7 +718,7 @@ class IRBuilder:
                 self.build_visitor(body_op, ip)
 
     def build_while_op(self, op: ast.WhileOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         with get_context(), loc:
             # bulid empty while loop
             while_op = scf_d.WhileOp([], [], ip=ip, loc=loc)
@@ -652,10 +738,15 @@ class IRBuilder:
         op.ir_op = while_op
 
     def build_alloc_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         ele_type = hcl_dtype_to_mlir(op.dtype, signless=True)
-        memref_type = MemRefType.get(op.shape, ele_type)
-        alloc_op = memref_d.AllocOp(memref_type, [], [], ip=ip, loc=loc)
+        memref_type = MemRefType.get(memref_shape(op.shape), ele_type)
+        dynamic_sizes = []
+        for dim in op.shape:
+            if isinstance(dim, ast.SymbolicDim):
+                self.build_visitor(dim, ip)
+                dynamic_sizes.append(dim.result)
+        alloc_op = memref_d.AllocOp(memref_type, dynamic_sizes, [], ip=ip, loc=loc)
         alloc_op.attributes["name"] = StringAttr.get(op.name)
         op.result = alloc_op.result
         op.ir_op = alloc_op
@@ -665,7 +756,7 @@ class IRBuilder:
         self.tensor_dict[op.name] = alloc_op
 
     def build_binary_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
 
         # Step 1: build lhs and rhs
         self.build_visitor(op.lhs, ip)
@@ -714,7 +805,7 @@ class IRBuilder:
             op.ir_op = select
 
     def build_math_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         casted = ast.CastOp(op.expr, op.dtype, loc)
         self.build_visitor(casted, ip)
@@ -724,7 +815,7 @@ class IRBuilder:
         op.ir_op = math_op
 
     def build_neg_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         t = self.tinf_engine.infer(op.expr)
 
@@ -818,7 +909,7 @@ class IRBuilder:
                 "uge": 9,
             },
         }
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
 
         # Step 1: build lhs and rhs
         self.build_visitor(op.lhs, ip)
@@ -871,7 +962,7 @@ class IRBuilder:
             cmp_op.attributes["unsigned"] = UnitAttr.get()
 
     def build_load_op(self, op: ast.LoadOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         index_exprs = []
         flag = True
         load_op = None
@@ -956,7 +1047,7 @@ class IRBuilder:
         op.ir_op = store_op
 
     def build_constant_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         dtype = hcl_dtype_to_mlir(op.dtype)
         if isinstance(op.dtype, (htypes.Int, htypes.UInt)):
             if isinstance(op.dtype, htypes.Index):
@@ -1243,7 +1334,7 @@ class IRBuilder:
 
         # build loop nest
         loops = []
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         for axis in op.axis:
             lb, ub = axis.bound
             loop = self.build_for_loop(
@@ -1266,7 +1357,7 @@ class IRBuilder:
     def build_select_op(self, op: ast.SelectOp, ip):
         # Step 1: get condition, true, and false value
         # if any of them is an immediate, convert it to a constant
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         cond = ast.immediate_to_constant(op.cond, op.loc)
         self.build_visitor(cond, ip)
         true_value = ast.immediate_to_constant(op.true_value, op.loc)
@@ -1295,7 +1386,7 @@ class IRBuilder:
         op.result = select_op.result
 
     def build_bitcast_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         src_dtype = self.tinf_engine.infer(op.expr)
         dst_dtype = op.dtype
@@ -1310,7 +1401,7 @@ class IRBuilder:
         op.result = bitcast_op.result
 
     def build_print_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         # print op assumes all inputs are built
         for arg in op.args:
             self.build_visitor(arg, ip)
@@ -1345,13 +1436,13 @@ class IRBuilder:
         op.ir_op = print_op
 
     def build_print_tensor_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.tensor, ip)
         print_op = hcl_d.PrintMemRefOp(op.tensor.result, ip=ip, loc=loc)
         op.ir_op = print_op
 
     def build_get_bit_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         # check if expr is int type
         expr_dtype = self.tinf_engine.infer(op.expr)
@@ -1370,7 +1461,7 @@ class IRBuilder:
         op.result = getbit_op.result
 
     def build_get_slice_op(self, op: ast.GetSliceOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         # check if expr is int type
         expr_dtype = self.tinf_engine.infer(op.expr)
@@ -1391,7 +1482,7 @@ class IRBuilder:
         op.result = getbit_op.result
 
     def build_set_bit_op(self, op, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         self.build_visitor(op.value, ip)
         # check if expr is int type
@@ -1421,7 +1512,7 @@ class IRBuilder:
             self.build_visitor(store_op, ip)
 
     def build_set_slice_op(self, op: ast.SetSliceOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         self.build_visitor(op.value, ip)
         # check if expr is int type
@@ -1458,7 +1549,7 @@ class IRBuilder:
             self.build_visitor(store_op, ip)
 
     def build_bit_reverse_op(self, op: ast.BitReverseOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.expr, ip)
         # check if expr is int type
         expr_dtype = self.tinf_engine.infer(op.expr)
@@ -1469,10 +1560,15 @@ class IRBuilder:
         op.result = bitreverse_op.result
 
     def build_constant_tensor_op(self, op: ast.ConstantTensorOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         dtype = hcl_dtype_to_mlir(op.dtype, signless=True)
         shape = op.values.shape
-        if isinstance(op.dtype, (htypes.Int, htypes.UInt)):
+        if op.external:
+            # The values are stored in a file, which is mapped into
+            # memory at the address of the global when it is loaded
+            val = op.values
+            value_attr = None
+        elif isinstance(op.dtype, (htypes.Int, htypes.UInt)):
             # The following code has several steps to convert the numpy array to have
             # the correct data type in order to create an MLIR constant tensor.
             # Since MLIR-NumPy Python interface only supports byte-addressable data types,
@@ -1532,7 +1628,8 @@ class IRBuilder:
             val = op.values
             value_attr = DenseElementsAttr.get(val)
         sym_name = StringAttr.get(op.name)
-        sym_visibility = StringAttr.get("private")
+        # external globals are declarations, which must be public
+        sym_visibility = StringAttr.get("public" if op.external else "private")
         if isinstance(op.dtype, (htypes.Fixed, htypes.UFixed)):
             memref_type = MemRefType.get(op.shape, IntegerType.get_signless(64))
         else:
@@ -1549,6 +1646,10 @@ class IRBuilder:
             loc=loc,
         )
         const_tensor.attributes["constant"] = UnitAttr.get()
+        if op.external:
+            const_tensor.attributes["external_data"] = StringAttr.get(
+                compile_cache.store_constant(op.values)
+            )
         if isinstance(op.dtype, (htypes.UInt, htypes.UFixed)):
             const_tensor.attributes["unsigned"] = UnitAttr.get()
 
@@ -1567,7 +1668,7 @@ class IRBuilder:
         op.tensor.result = get_global.result
 
     def build_struct_construct_op(self, op: ast.StructConstructOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         # build fields
         field_results = []
         for idx, field in enumerate(op.args):
@@ -1583,7 +1684,7 @@ class IRBuilder:
         op.result = struct_op.result
 
     def build_struct_get_op(self, op: ast.StructGetOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.struct, ip)
         dtype = self.tinf_engine.infer(op)
         dtype = hcl_dtype_to_mlir(dtype, signless=True)
@@ -1596,13 +1697,13 @@ class IRBuilder:
         op.result = struct_get_op.result
 
     def build_op_handle(self, op: ast.OpHandle, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         hdl_op = hcl_d.CreateOpHandleOp(StringAttr.get(op.name), ip=ip, loc=loc)
         op.ir_op = hdl_op
         op.result = hdl_op.result
 
     def build_loop_handle(self, op: ast.LoopHandle, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.op_hdl, ip)
         hdl_op = hcl_d.CreateLoopHandleOp(
             op.op_hdl.result, StringAttr.get(op.name), ip=ip, loc=loc
@@ -1611,7 +1712,7 @@ class IRBuilder:
         op.result = hdl_op.result
 
     def build_partition_op(self, op: ast.PartitionOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         i32 = IntegerType.get_signless(32)
         ui32 = IntegerType.get_unsigned(32)
         partition_type = IntegerAttr.get(i32, op.kind)
@@ -1629,14 +1730,14 @@ class IRBuilder:
         op.ir_op = partition_op
 
     def build_replace_op(self, op: ast.ReplaceOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.target, ip)
         self.build_visitor(op.src, ip)
         replace_op = hcl_d.ReplaceOp(op.target.result, op.src.result, ip=ip, loc=loc)
         op.ir_op = replace_op
 
     def build_reshape_op(self, op: ast.ReshapeOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.tensor, ip)
         eletype = hcl_dtype_to_mlir(op.tensor.dtype)
         memref_type = MemRefType.get(op.shape, eletype, loc=loc)
@@ -1644,7 +1745,7 @@ class IRBuilder:
         op.ir_op = reshape_op
 
     def build_reform_op(self, op: ast.ReformOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.target, ip)
         if op.layout == "nhwc":
             attr = AffineMap.get_permutation([0, 2, 3, 1])
@@ -1656,7 +1757,7 @@ class IRBuilder:
         op.ir_op = reform_op
 
     def build_reuse_at_op(self, op: ast.ReuseAtOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.target, ip)
         self.build_visitor(op.axis, ip)
         f32 = F32Type.get()
@@ -1668,7 +1769,7 @@ class IRBuilder:
         op.result = reuse_at_op.result
 
     def build_buffer_at_op(self, op: ast.BufferAtOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.target, ip)
         self.build_visitor(op.axis, ip)
         f32 = F32Type.get()
@@ -1680,7 +1781,7 @@ class IRBuilder:
         op.result = buffer_at_op.result
 
     def build_inter_kernel_to_op(self, op: ast.InterKernelToOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.tensor, ip)
         self.build_visitor(op.stage, ip)
         i32 = IntegerType.get_signless(32)
@@ -1694,7 +1795,7 @@ class IRBuilder:
         op.ir_op = to_op
 
     def build_outline_op(self, op: ast.OutlineOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         for stage_hdl in op.stage_hdls:
             self.build_visitor(stage_hdl, ip)
         hdl_results = [hdl.result for hdl in op.stage_hdls]
@@ -1706,7 +1807,7 @@ class IRBuilder:
         op.ir_op = outline_op
 
     def build_reorder_op(self, op: ast.ReorderOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         for arg in op.args:
             self.build_visitor(arg, ip)
         arg_results = [arg.result for arg in op.args]
@@ -1714,7 +1815,7 @@ class IRBuilder:
         op.ir_op = reorder_op
 
     def build_split_op(self, op: ast.SplitOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.parent, ip)
         i32 = IntegerType.get_unsigned(32)
         factor = IntegerAttr.get(i32, op.factor)
@@ -1724,7 +1825,7 @@ class IRBuilder:
             result_loop_hdl.result = hdl_result
 
     def build_tile_op(self, op: ast.TileOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         i32 = IntegerType.get_unsigned(32)
         x_factor = IntegerAttr.get(i32, op.x_factor)
         y_factor = IntegerAttr.get(i32, op.y_factor)
@@ -1738,7 +1839,7 @@ class IRBuilder:
             result_loop_hdl.result = hdl_result
 
     def build_pipeline_op(self, op: ast.PipelineOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.target, ip)
         i32 = IntegerType.get_unsigned(32)
         ii = IntegerAttr.get(i32, op.ii)
@@ -1746,7 +1847,7 @@ class IRBuilder:
         op.ir_op = pipeline_op
 
     def build_unroll_op(self, op: ast.UnrollOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.target, ip)
         i32 = IntegerType.get_unsigned(32)
         factor = IntegerAttr.get(i32, op.factor)
@@ -1754,13 +1855,13 @@ class IRBuilder:
         op.ir_op = unroll_op
 
     def build_parallel_op(self, op: ast.ParallelOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.target, ip)
         parallel_op = hcl_d.ParallelOp(op.target.result, ip=ip, loc=loc)
         op.ir_op = parallel_op
 
     def build_fuse_op(self, op: ast.FuseOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         for arg in op.arg_list:
             self.build_visitor(arg, ip)
         arg_results = [arg.result for arg in op.arg_list]
@@ -1769,7 +1870,7 @@ class IRBuilder:
         op.result = fuse_op.result
 
     def build_compute_at_op(self, op: ast.ComputeAtOp, ip):
-        loc = Location.file(op.loc.filename, op.loc.lineno, 0)
+        loc = self.get_location(op.loc)
         self.build_visitor(op.stage, ip)
         self.build_visitor(op.parent, ip)
         self.build_visitor(op.axis, ip)
@@ -5,25 +5,44 @@
 import io
 import os
 import copy
+import functools
+import multiprocessing
+import multiprocessing.connection
+import threading
+import traceback
 
+import numpy as np
 import hcl_mlir
 from hcl_mlir.dialects import hcl as hcl_d
 from hcl_mlir.dialects import func as func_d
+from hcl_mlir.dialects import memref as memref_d
+from hcl_mlir.dialects import arith as arith_d
+from hcl_mlir.dialects import scf as scf_d
 from hcl_mlir.execution_engine import ExecutionEngine
-from hcl_mlir.exceptions import APIError, PassWarning
+from hcl_mlir.exceptions import APIError, HCLError, PassWarning
 from hcl_mlir.ir import (
     Module,
+    ArrayAttr,
+    InsertionPoint,
+    IntegerAttr,
+    IntegerType,
     StringAttr,
     UnitAttr,
 )
 from hcl_mlir.passmanager import PassManager as mlir_pass_manager
 
+from . import cache as compile_cache
+from . import profiler
+from . import aot
 from .devices import Platform
 from .context import get_context, get_location, set_context, exit_context
 from .module import HCLModule, HCLSuperModule
 from .runtime import copy_build_files
-from .schedule import Schedule
+from .schedule import Schedule, create_schedule
+from .operation import placeholder
+from . import config
 from .utils import hcl_dtype_to_mlir
+from .types import Fixed, Int, UFixed, UInt, dtype_to_str
 from .passes.pass_manager import PassManager as ast_pass_manager
 from .passes.nest_if import NestElseIf
 from .passes.promote_func import PromoteFunc
@@ -33,10 +52,11 @@ from .ast import ast
 
 
 def _mlir_lower_pipeline(module):
-    hcl_d.loop_transformation(module)
+    with profiler.phase("mlir.loop_transformation", module):
+        hcl_d.loop_transformation(module)
     pipeline = "func.func(affine-loop-normalize, cse, affine-simplify-structures)"
     try:
-        with get_context():
+        with get_context(), profiler.phase("mlir.lower_pipeline", module):
             mlir_pass_manager.parse(pipeline).run(module)
         return module
     except Exception as e:
@@ -65,7 +85,9 @@ def lower(
     # Build MLIR IR
     set_context()
     agnostic_ir_builder = IRBuilder(device_agnostic_ast)
-    agnostic_ir_builder.build()
+    with profiler.phase("ir_builder") as phase:
+        agnostic_ir_builder.build()
+        phase.ir = agnostic_ir_builder.module
     agnostic_module = agnostic_ir_builder.module
     schedule._module = _mlir_lower_pipeline(agnostic_module)
     schedule._top_func = agnostic_ir_builder.top_func
@@ -75,8 +97,46 @@ def lower(
     return schedule.module
 
 
-def build(schedule, target=None, stmt=None, top=None):
-    """Build the executable according to the schedule and target."""
+def build(
+    schedule,
+    target=None,
+    stmt=None,
+    top=None,
+    profile=None,
+    num_threads=None,
+    vectorize=None,
+):
+    """Build the executable according to the schedule and target.
+
+    On the llvm target, the loops marked with .parallel() run on
+    `num_threads` threads, by default as many as there are CPUs. It can
+    be changed later through the `num_threads` of the returned module.
+    See `build_llvm` for which loops are actually parallelized.
+    `vectorize` turns on the vectorization of the innermost unit-stride
+    loops, see `build_llvm`.
+
+    `profile` records the time, memory usage and IR size of every
+    lowering and build phase. It is either a boolean or the path of a
+    file to dump the JSON report to, and defaults to the ``HCL_PROFILE``
+    environment variable. The report is attached to the returned module
+    as `profile` and is also returned by `hcl.profiler.last_report()`.
+    """
+    do_profile, report_path = profiler.parse_option(profile)
+    if not do_profile or profiler.is_active():
+        return _build(schedule, target, stmt, top, num_threads, vectorize)
+    profiler.start()
+    try:
+        result = _build(schedule, target, stmt, top, num_threads, vectorize)
+    finally:
+        report = profiler.stop()
+    if report_path is not None:
+        profiler.dump(report, report_path)
+    if isinstance(result, HCLModule):
+        result.profile = report
+    return result
+
+
+def _build(schedule, target, stmt, top, num_threads, vectorize):
     # pylint: disable=too-many-try-statements
     try:
         if not schedule.is_lowered():
@@ -98,8 +158,9 @@ def build(schedule, target=None, stmt=None, top=None):
                     # modules.append(build_llvm(func_mod, target, stmt))
             return HCLSuperModule(modules)
         if target is not None:
-            return build_fpga_kernel(schedule, target, stmt)
-        return build_llvm(schedule)
+            with profiler.phase("codegen"):
+                return build_fpga_kernel(schedule, target, stmt)
+        return build_llvm(schedule, num_threads=num_threads, vectorize=vectorize)
     except Exception as e:
         raise e
 
@@ -171,8 +232,9 @@ def separate_host_xcel(schedule, device_agnostic_ast):
     host_func.level = 0
     host_func.return_tensors = top_func.return_tensors
 
+    uses = ast.UseIndex(host_func)
     for old, new in zip(return_tensors, new_rets):
-        ast.replace_all_uses_with(host_func, old, new)
+        uses.replace(old, new)
 
     # create device function prototype
     device_func_proto = ast.FuncOp(
@@ -222,6 +284,10 @@ def build_fpga_kernel(schedule, target=None, stmt=None):
         module = schedule.module
     else:
         module = schedule
+    if _get_external_constants(module):
+        raise APIError(
+            "Constant tensors stored in files are only supported by the llvm target"
+        )
     if target == "vhls":
         buf = io.StringIO()
         hcl_d.emit_vhls(module, buf)
@@ -308,73 +374,620 @@ def build_fpga_kernel(schedule, target=None, stmt=None):
     return hcl_module
 
 
-def build_llvm(schedule, top_func_name="top"):
-    def attach_llvm_attrs(module):
-        # find top func op
-        func = None
-        for op in module.body.operations:
-            if isinstance(op, func_d.FuncOp) and op.name.value == top_func_name:
-                func = op
-                break
-        if func is None:
-            raise APIError("No top-level function found in the built MLIR module")
-        func.attributes["llvm.emit_c_interface"] = UnitAttr.get()
-        func.attributes[top_func_name] = UnitAttr.get()
-        func.attributes["sym_name"] = StringAttr.get("top")
+_LLVM_OPT_LEVEL = 3
 
-    with get_context() as ctx, get_location():
+
+# set by hcl_d.loop_transformation on the loops marked with .parallel()
+_PARALLEL_ATTR = "parallel"
+# (stage, loop) names of the vectorized and parallelized loops, kept on
+# the lowered module so that cached modules carry them too
+_VECTORIZED_LOOPS_ATTR = "hcl.vectorized_loops"
+_PARALLEL_LOOPS_ATTR = "hcl.parallel_loops"
+_DEFAULT_VECTOR_WIDTH = 8
+
+
+@functools.lru_cache(maxsize=None)
+def _get_shared_libs(num_threads=1):
+    """The runtime libraries the kernels are linked with, looked up once
+    per process as llvm-config is slow to start"""
+    if os.system("which llvm-config >> /dev/null") != 0:
+        raise APIError(
+            "llvm-config is not found in PATH, llvm is not installed or not in PATH."
+        )
+    lib_path = os.popen("llvm-config --libdir").read().strip()
+    libs = [
+        os.path.join(lib_path, "libmlir_runner_utils.so"),
+        os.path.join(lib_path, "libmlir_c_runner_utils.so"),
+    ]
+    if num_threads > 1:
+        libs.append(os.path.join(lib_path, "libmlir_async_runtime.so"))
+    return tuple(libs)
+
+
+def _walk_ops(op):
+    """Yields the operations nested in `op` along with their ancestors"""
+    stack = [(op.operation, ())]
+    while stack:
+        op, parents = stack.pop()
+        yield op, parents
+        for region in op.regions:
+            for block in region.blocks:
+                for child in block.operations:
+                    stack.append((child.operation, parents + (op,)))
+
+
+def _has_parallel_loops(module):
+    return any(_PARALLEL_ATTR in op.attributes for op, _ in _walk_ops(module))
+
+
+def _loop_name(loop, parents):
+    """Returns the (stage, loop) names of an affine.for loop"""
+    stage = ""
+    for parent in parents + (loop,):
+        if "op_name" in parent.attributes:
+            stage = StringAttr(parent.attributes["op_name"]).value
+    return (stage, StringAttr(loop.attributes["loop_name"]).value)
+
+
+def _set_loop_names(module, attr_name, loops):
+    module.operation.attributes[attr_name] = ArrayAttr.get(
+        [
+            ArrayAttr.get([StringAttr.get(stage), StringAttr.get(loop)])
+            for stage, loop in loops
+        ]
+    )
+
+
+def _pop_loop_names(module, attr_name):
+    loops = []
+    attrs = module.operation.attributes
+    if attr_name in attrs:
+        for names in ArrayAttr(attrs[attr_name]):
+            stage, loop = [StringAttr(name).value for name in ArrayAttr(names)]
+            loops.append((stage, loop))
+        del attrs[attr_name]
+    return loops
+
+
+def _keep_scalar(module, loops):
+    """Keeps the vectorizer off the innermost loops whose (stage, loop)
+    names are not in `loops`, by adding an empty scf.if to their body:
+    the vectorizer skips the loops holding non-affine regions. Returns
+    the added operations, to be erased once the vectorizer has run.
+    """
+    bodies = []
+    for op, parents in _walk_ops(module):
+        if op.name != "affine.for" or "loop_name" not in op.attributes:
+            continue
+        body = op.regions[0].blocks[0]
+        if any(child.operation.name == "affine.for" for child in body.operations):
+            continue
+        if _loop_name(op, parents) not in loops:
+            bodies.append(body)
+    i1 = IntegerType.get_signless(1)
+    markers = []
+    for body in bodies:
+        ip = InsertionPoint.at_block_begin(body)
+        true = arith_d.ConstantOp(i1, IntegerAttr.get(i1, 1), ip=ip)
+        if_op = scf_d.IfOp(true.result, hasElse=False, results_=[], ip=ip)
+        scf_d.YieldOp([], ip=InsertionPoint(if_op.then_block))
+        # the users go first
+        markers += [if_op.operation, true.operation]
+    return markers
+
+
+def _vectorize(module, vector_width):
+    """Vectorize the innermost unit-stride loops of the module.
+
+    `vector_width` is either the width of the vectors of all the
+    loops, or ((stage, loop), width) pairs giving the loops to
+    vectorize, see Stage.vectorize(). Returns the (stage, loop) names
+    of the vectorized loops. The loops that cannot be vectorized are
+    kept as they are.
+    """
+    if isinstance(vector_width, tuple):
+        vectorized_loops = []
+        for width in sorted(set(width for _, width in vector_width)):
+            markers = _keep_scalar(
+                module, [loop for loop, w in vector_width if w == width]
+            )
+            for loop in _vectorize(module, width):
+                if loop not in vectorized_loops:
+                    vectorized_loops.append(loop)
+            for op in markers:
+                op.erase()
+        return vectorized_loops
+    pipeline = (
+        "func.func(affine-super-vectorize{"
+        f"virtual-vector-size={vector_width} test-fastest-varying=0"
+        "})"
+    )
+    with get_context(), profiler.phase("llvm.vectorize", module):
+        mlir_pass_manager.parse(pipeline).run(module)
+    vectorized_loops = []
+    for op, parents in _walk_ops(module):
+        if op.name not in {"vector.transfer_read", "vector.transfer_write"}:
+            continue
+        loop = parents[-1]
+        if loop.name != "affine.for" or "loop_name" not in loop.attributes:
+            continue
+        name = _loop_name(loop, parents[:-1])
+        if name not in vectorized_loops:
+            vectorized_loops.append(name)
+    return vectorized_loops
+
+
+def _parallelize(module):
+    """Parallelize the outermost dependence-free loop of each loop nest.
+
+    affine-parallelize cannot be restricted to the loops marked with
+    .parallel(), so the loops of the nests without a marked loop may
+    run in parallel too, and a marked loop carrying a dependence or
+    nested in a parallel loop stays sequential. Both cases are warned
+    about. Returns the (stage, loop) names of the parallelized loops.
+    """
+    loops = []
+    for op, parents in _walk_ops(module):
+        if op.name == "affine.for" and "loop_name" in op.attributes:
+            loops.append((_loop_name(op, parents), _PARALLEL_ATTR in op.attributes))
+        else:
+            loops.append(None)
+    pipeline = "func.func(affine-parallelize{max-nested=1})"
+    with get_context(), profiler.phase("llvm.parallelize", module):
+        mlir_pass_manager.parse(pipeline).run(module)
+    # affine-parallelize replaces each loop with one affine.parallel op
+    # holding the same body, so the walk visits the ops in the same order
+    op_names = [op.name for op, _ in _walk_ops(module)]
+    if len(op_names) != len(loops):
+        return []
+    parallel_loops = []
+    for loop, op_name in zip(loops, op_names):
+        if loop is None:
+            continue
+        (stage, loop_name), marked = loop
+        if op_name == "affine.parallel":
+            parallel_loops.append((stage, loop_name))
+            if not marked:
+                PassWarning(
+                    f"Loop {loop_name} of stage {stage} runs in parallel"
+                    " although it is not marked with .parallel()"
+                ).warn()
+        elif marked:
+            PassWarning(
+                f"Loop {loop_name} of stage {stage} is marked with .parallel()"
+                " but carries a dependence or is nested in a parallel loop,"
+                " it runs sequentially"
+            ).warn()
+    return parallel_loops
+
+
+def _lower_to_llvm(module, ctx, num_threads=1, vector_width=None):
+    for pass_name in (
+        # memref dce should precede lower_composite_type
+        "memref_dce",
+        "lower_composite_type",
+        "lower_fixed_to_int",
+        "lower_print_ops",
+        # lower_anywidth_int is not run: the arguments of the top
+        # function keep their width instead of being widened to i64,
+        # as arrays hold them in the containers LLVM stores them in,
+        # zero-extended as LLVM loads expect (see tensor.storage_dtype)
+        "move_return_to_input",
+        "lower_bit_ops",
+        "legalize_cast",
+        "remove_stride_map",
+    ):
+        with profiler.phase(f"llvm.{pass_name}", module):
+            getattr(hcl_d, pass_name)(module)
+    if vector_width is not None:
+        _set_loop_names(
+            module, _VECTORIZED_LOOPS_ATTR, _vectorize(module, vector_width)
+        )
+    if num_threads > 1:
+        _set_loop_names(module, _PARALLEL_LOOPS_ATTR, _parallelize(module))
+    pipeline = "lower-affine,func.func(buffer-loop-hoisting)"
+    if vector_width is not None:
+        pipeline += ",convert-vector-to-scf,convert-vector-to-llvm"
+    if num_threads > 1:
+        # The affine.parallel loops become scf.parallel loops, whose
+        # iterations are then split into `num_threads` blocks running
+        # on the MLIR async runtime.
+        pipeline = (
+            pipeline
+            + f",async-parallel-for{{num-workers={num_threads}}}"
+            + ",async-to-async-runtime,async-runtime-ref-counting"
+            + ",async-runtime-ref-counting-opt,convert-async-to-llvm"
+        )
+    try:
+        with get_context(), profiler.phase("llvm.lower_affine_pipeline", module):
+            mlir_pass_manager.parse(pipeline).run(module)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        if vector_width is not None:
+            # handled by falling back to scalar code
+            raise e
+        PassWarning(str(e)).warn()
+        print(module)
+
+    with profiler.phase("llvm.lower_hcl_to_llvm", module):
+        success = hcl_d.lower_hcl_to_llvm(module, ctx)
+    if vector_width is not None:
+        if success is False:
+            raise HCLError("Failed to lower the vectorized module to LLVM")
+        with get_context():
+            mlir_pass_manager.parse("reconcile-unrealized-casts").run(module)
+
+
+def _attach_llvm_attrs(module, top_func_name):
+    # find top func op
+    func = None
+    for op in module.body.operations:
+        if isinstance(op, func_d.FuncOp) and op.name.value == top_func_name:
+            func = op
+            break
+    if func is None:
+        raise APIError("No top-level function found in the built MLIR module")
+    func.attributes["llvm.emit_c_interface"] = UnitAttr.get()
+    func.attributes[top_func_name] = UnitAttr.get()
+    func.attributes["sym_name"] = StringAttr.get("top")
+
+
+def _lower_llvm_module(
+    schedule, top_func_name, ctx, num_threads=None, vector_width=None
+):
+    """Returns the text of the module before lowering, the module
+    lowered to the LLVM dialect, and the number of threads it uses.
+    """
+    with profiler.phase("llvm.parse") as phase:
         if isinstance(schedule, Schedule):
-            attach_llvm_attrs(schedule.module)
+            _attach_llvm_attrs(schedule.module, top_func_name)
             module = Module.parse(str(schedule.module), ctx)
         else:
             module = Module.parse(str(schedule), ctx)
-            attach_llvm_attrs(module)
-
-        host_src = Module.parse(str(module))
-
-        # memref dce should precede lower_composite_type
-        hcl_d.memref_dce(module)
-        hcl_d.lower_composite_type(module)
-        hcl_d.lower_fixed_to_int(module)
-        hcl_d.lower_print_ops(module)
-        hcl_d.lower_anywidth_int(module)
-        # Note: lower_any_width_int should precede
-        # move_return_to_input, because it uses input/output
-        # type hints.
-        hcl_d.move_return_to_input(module)
-        hcl_d.lower_bit_ops(module)
-        # print(module)
-        hcl_d.legalize_cast(module)
-        hcl_d.remove_stride_map(module)
-        pipeline = "lower-affine,func.func(buffer-loop-hoisting)"
+            _attach_llvm_attrs(module, top_func_name)
+        phase.ir = module
+
+    if not _has_parallel_loops(module):
+        num_threads = 1
+    elif num_threads is None:
+        num_threads = os.cpu_count() or 1
+
+    module_text = str(module)
+    lowered_text = None
+    cache_key = None
+    if compile_cache.is_enabled():
+        cache_key = compile_cache.make_key(
+            module_text,
+            _LLVM_OPT_LEVEL,
+            _get_shared_libs(num_threads),
+            options=(
+                f"num_threads={num_threads}",
+                f"vectorize={vector_width}",
+                f"abi={aot.SIGNATURE_VERSION}",
+            ),
+        )
+        lowered_text = compile_cache.lookup(cache_key)
+    if lowered_text is not None:
+        with profiler.phase("llvm.cache_hit") as phase:
+            module = Module.parse(lowered_text, ctx)
+            phase.ir = module
+    else:
         try:
-            with get_context():
-                mlir_pass_manager.parse(pipeline).run(module)
+            _lower_to_llvm(module, ctx, num_threads, vector_width)
         except Exception as e:  # pylint: disable=broad-exception-caught
-            PassWarning(str(e)).warn()
-            print(module)
+            if vector_width is None:
+                raise e
+            PassWarning(
+                f"Vectorization failed, falling back to scalar code: {e}"
+            ).warn()
+            module = Module.parse(module_text, ctx)
+            _lower_to_llvm(module, ctx, num_threads)
+        if cache_key is not None:
+            compile_cache.store(cache_key, str(module))
+    return module_text, module, num_threads
+
+
+def _get_external_constants(module):
+    """Returns the paths of the files holding the values of the constant
+    tensors of the module, by name of their global
+    """
+    constants = {}
+    for op in module.body.operations:
+        if isinstance(op, memref_d.GlobalOp) and "external_data" in op.attributes:
+            path = StringAttr(op.attributes["external_data"]).value
+            constants[op.sym_name.value] = path
+    return constants
 
-        hcl_d.lower_hcl_to_llvm(module, ctx)
 
-        # Add shared library
-        if os.system("which llvm-config >> /dev/null") != 0:
+def _create_llvm_module(
+    host_text, module, top_func_name, num_threads=1, vector_width=None, signature=None
+):
+    host_src = Module.parse(host_text)
+    vectorized_loops = _pop_loop_names(module, _VECTORIZED_LOOPS_ATTR)
+    parallel_loops = _pop_loop_names(module, _PARALLEL_LOOPS_ATTR)
+    llvm_text = str(module)
+    shared_libs = list(_get_shared_libs(num_threads))
+    with profiler.phase("llvm.jit"):
+        execution_engine = ExecutionEngine(
+            module, opt_level=_LLVM_OPT_LEVEL, shared_libs=shared_libs
+        )
+    # bind the globals of the external constants to their mapped files
+    constants = {}
+    for name, path in _get_external_constants(host_src).items():
+        constants[name] = np.memmap(path, dtype=np.uint8, mode="r")
+        execution_engine.raw_register_runtime(name, constants[name].ctypes.data)
+    hcl_module = HCLModule(
+        top_func_name,
+        execution_engine,
+        "llvm",
+        host_src=host_src,
+        return_num=0,
+        signature=signature,
+    )
+    state = hcl_module._llvm
+    state.num_threads = num_threads
+    state.vectorized_loops = vectorized_loops
+    state.parallel_loops = parallel_loops
+    state.text = llvm_text
+    state.shared_libs = shared_libs
+    state.constants = constants
+    # the module before lowering keeps the attributes of the top function
+    state.rebuild = lambda n: build_llvm(host_text, top_func_name, n, vector_width)
+    return hcl_module
+
+
+def _get_vector_width(schedule, vectorize):
+    if vectorize is None and isinstance(schedule, Schedule):
+        # the loops given to Stage.vectorize(), with their widths
+        vectorize = tuple(sorted(schedule._vector_widths.items())) or None
+    if isinstance(vectorize, tuple):
+        return vectorize
+    if vectorize is True:
+        return _DEFAULT_VECTOR_WIDTH
+    if not vectorize or vectorize == 1:
+        return None
+    return int(vectorize)
+
+
+def _get_signature(schedule, top_func_name):
+    """Describes the arguments of the top function, in calling order.
+    Raises an APIError for the arguments the CPU kernel cannot take.
+    """
+    top_func = schedule.ast.top_func
+    args = []
+    for tensor in list(top_func.args) + list(top_func.return_tensors):
+        dtype = tensor.dtype
+        if isinstance(dtype, (Int, UInt, Fixed, UFixed)) and dtype.bits > 64:
+            # the arrays hold them in 64-bit words, which the lowering
+            # of the kernel does not use for its arguments
             raise APIError(
-                "llvm-config is not found in PATH, llvm is not installed or not in PATH."
+                f"Cannot pass {tensor.name} of {dtype} to a CPU kernel, "
+                "integers wider than 64 bits are only supported inside kernels"
             )
+        args.append(
+            {
+                "name": tensor.name,
+                # symbolic dimensions are given by their names
+                "shape": [
+                    dim.name if isinstance(dim, ast.SymbolicDim) else dim
+                    for dim in tensor.shape
+                ],
+                "dtype": dtype_to_str(tensor.dtype),
+            }
+        )
+    return {
+        "version": aot.SIGNATURE_VERSION,
+        "name": top_func_name,
+        # _attach_llvm_attrs renames the top function
+        "symbol": "top",
+        "args": args,
+    }
+
+
+def build_llvm(schedule, top_func_name="top", num_threads=None, vectorize=None):
+    """Build the schedule for the CPU.
+
+    When loops are marked with .parallel(), the outermost
+    dependence-free loop of each loop nest runs on `num_threads`
+    threads, by default as many as there are CPUs. This may include
+    loops that are not marked, a warning is given for each of them.
+    The names of the parallelized loops are kept in `parallel_loops`
+    of the returned module.
+
+    `vectorize` is the number of elements of the vectors the innermost
+    unit-stride loops are vectorized with (True for the default width).
+    By default, only the loops given to Stage.vectorize() are
+    vectorized, each with its own width. The names of the vectorized
+    loops are kept in `vectorized_loops` of the returned module.
+    """
+    vector_width = _get_vector_width(schedule, vectorize)
+    signature = None
+    if isinstance(schedule, Schedule):
+        signature = _get_signature(schedule, top_func_name)
+    with get_context() as ctx, get_location():
+        host_text, module, num_threads = _lower_llvm_module(
+            schedule, top_func_name, ctx, num_threads, vector_width
+        )
+        hcl_module = _create_llvm_module(
+            host_text, module, top_func_name, num_threads, vector_width, signature
+        )
+    if isinstance(schedule, Schedule):
+        hcl_module._llvm.chunk_ast = schedule.ast
+        hcl_module._llvm.build_chunk = _chunk_builder(
+            schedule, top_func_name, num_threads, vector_width
+        )
+    return hcl_module
 
-        lib_path = os.popen("llvm-config --libdir").read().strip()
-        shared_libs = [
-            os.path.join(lib_path, "libmlir_runner_utils.so"),
-            os.path.join(lib_path, "libmlir_c_runner_utils.so"),
-        ]
-        opt_level = 3
-        if shared_libs is not None:
-            execution_engine = ExecutionEngine(
-                module, opt_level=opt_level, shared_libs=shared_libs
+
+def _chunk_builder(schedule, top_func_name, num_threads, vector_width):
+    """Returns a function building the kernel of the schedule for
+    inputs of other numbers of rows, given by a dict of the names of
+    the inputs to their number of rows. The kernel function is traced
+    again, which HCLModule.run_chunked() only does for schedules without
+    primitives, as they would not be applied.
+    """
+    top_func = schedule.ast.top_func
+    func = top_func.python_callable
+    args = [(t.name, tuple(t.shape), t.dtype) for t in top_func.args]
+    init_dtype = config.init_dtype
+
+    def build_chunk(rows):
+        if func is None:
+            raise APIError(
+                "Only the kernels created from a function can run on chunks of rows"
             )
-        else:
-            execution_engine = ExecutionEngine(module, opt_level=opt_level)
-        hcl_module = HCLModule(
-            top_func_name, execution_engine, "llvm", host_src=host_src, return_num=0
+        current_dtype = config.init_dtype
+        config.init_dtype = init_dtype
+        try:
+            inputs = [
+                placeholder((rows.get(name, shape[0]),) + shape[1:], name, dtype)
+                for name, shape, dtype in args
+            ]
+            chunk_schedule = create_schedule(inputs, func, schedule.name)
+            chunk_ast = chunk_schedule.ast
+            chunk_module = build_llvm(
+                chunk_schedule, top_func_name, num_threads, vector_width
+            )
+        finally:
+            config.init_dtype = current_dtype
+        return chunk_module, chunk_ast
+
+    return build_chunk
+
+
+def _build_many_output(schedule, target):
+    """Builds the schedule in a worker process, and returns what is sent
+    back to the calling process"""
+    if not schedule.is_lowered():
+        lower(schedule)
+    elif get_context() is not None:
+        # the thread pool of the inherited MLIR context is not forked
+        get_context().enable_multithreading(False)
+    if target is not None:
+        return build_fpga_kernel(schedule, target)
+    # execution engines cannot be sent across processes,
+    # the JIT compilation happens in the calling process
+    vector_width = _get_vector_width(schedule, None)
+    with get_context() as ctx, get_location():
+        host_text, module, num_threads = _lower_llvm_module(
+            schedule, "top", ctx, vector_width=vector_width
         )
-        return hcl_module
+        options = {
+            "num_threads": num_threads,
+            "vector_width": vector_width,
+            "signature": _get_signature(schedule, "top"),
+        }
+        return (host_text, str(module), options)
+
+
+def _build_many_job(conn, schedule, target):
+    """Runs in a worker process, sends the build result back through
+    `conn`, with the counters of the compilation cache it updated"""
+    counters = compile_cache.counters()
+    try:
+        output = _build_many_output(schedule, target)
+        deltas = [n - m for n, m in zip(compile_cache.counters(), counters)]
+        conn.send((True, output, deltas))
+    except Exception:  # pylint: disable=broad-exception-caught
+        deltas = [n - m for n, m in zip(compile_cache.counters(), counters)]
+        conn.send((False, traceback.format_exc(), deltas))
+    finally:
+        conn.close()
+
+
+def build_many(schedules, target=None, workers=None, return_exceptions=False):
+    """Build independent schedules in parallel.
+
+    Each schedule is lowered and built in its own worker process,
+    at most `workers` (default: the number of CPUs) at a time, and
+    the results are returned in the order of `schedules`. The workers
+    are forked, so the given schedules are not lowered in the calling
+    process, and can still be scheduled and built; for the LLVM backend, the lowered modules are sent back
+    and JIT-compiled in the calling process. The hits, misses and
+    evictions of the compilation cache in the workers are added to
+    the counters of the calling process.
+
+    Forking a process that runs other threads is not safe, so the
+    schedules are built one after the other in the calling process
+    when other threads are running, when `workers` is 1, or when the
+    platform cannot fork. Copies of the schedules are then built, so
+    that they are not lowered either.
+
+    A failed build does not affect the other ones. With
+    `return_exceptions`, the exception of a failed build takes its
+    place in the returned list; otherwise the first failure is raised
+    once all the builds have finished.
+    """
+    schedules = list(schedules)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = [None] * len(schedules)
+    errors = [None] * len(schedules)
+
+    if (
+        workers <= 1
+        or threading.active_count() > 1
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        for i, schedule in enumerate(schedules):
+            try:
+                if isinstance(schedule, Schedule) and not schedule.is_lowered():
+                    # as in the workers, the given schedule is not lowered
+                    schedule = schedule.clone()
+                results[i] = build(schedule, target)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                errors[i] = e
+    else:
+        mp_ctx = multiprocessing.get_context("fork")
+        pending = list(enumerate(schedules))
+        running = {}  # connection -> (index, process)
+        outputs = {}
+        while pending or running:
+            while pending and len(running) < workers:
+                i, schedule = pending.pop(0)
+                recv_conn, send_conn = mp_ctx.Pipe(duplex=False)
+                proc = mp_ctx.Process(
+                    target=_build_many_job, args=(send_conn, schedule, target)
+                )
+                proc.start()
+                send_conn.close()
+                running[recv_conn] = (i, proc)
+            for conn in multiprocessing.connection.wait(list(running)):
+                i, proc = running.pop(conn)
+                try:
+                    success, output, counters = conn.recv()
+                    compile_cache.add_counters(*counters)
+                except EOFError:
+                    proc.join()
+                    success = False
+                    output = f"worker exited with code {proc.exitcode}"
+                conn.close()
+                proc.join()
+                if success:
+                    outputs[i] = output
+                else:
+                    errors[i] = HCLError(f"Failed to build schedule {i}:\n{output}")
+
+        if target is None and outputs:
+            set_context()
+            with get_context() as ctx, get_location():
+                for i, (host_text, module_text, options) in outputs.items():
+                    try:
+                        module = Module.parse(module_text, ctx)
+                        results[i] = _create_llvm_module(
+                            host_text, module, "top", **options
+                        )
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        errors[i] = e
+            exit_context()
+        else:
+            for i, output in outputs.items():
+                results[i] = output
+
+    for i, error in enumerate(errors):
+        if error is None:
+            continue
+        if return_exceptions:
+            results[i] = error
+        else:
+            raise error
+    return results
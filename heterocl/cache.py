@@ -0,0 +1,282 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""On-disk compilation cache for the LLVM backend.
+
+Entries are content-addressed: the key is a hash of the MLIR module handed
+to ``build_llvm``, the JIT optimization level, the shared libraries linked
+into the execution engine, and the version of the hcl_mlir bindings. The
+value is the module after the whole ``hcl_d`` lowering chain, so a hit only
+needs to parse the LLVM dialect module and hand it to the execution engine.
+
+The cache is disabled by default. It is turned on either by calling
+``hcl.cache.enable()`` or by setting the ``HCL_CACHE_DIR`` environment
+variable. ``HCL_CACHE_SIZE`` bounds the size of the cache in bytes; the
+least recently used entries are evicted first.
+
+The values of the constant tensors kept out of the modules (see
+``hcl.init``) are stored in the same way, under their hash, in the
+``constants`` directory of the cache, or in a temporary directory
+removed at exit when the cache is disabled. In the cache, they count
+towards ``HCL_CACHE_SIZE`` and are evicted along with the modules,
+except the ones used by the current process; an evicted constant is
+stored again by the next build using it.
+"""
+
+import atexit
+import os
+import hashlib
+import shutil
+import tempfile
+
+import numpy as np
+import hcl_mlir
+from hcl_mlir.exceptions import APIWarning
+
+DEFAULT_MAX_SIZE = 1 << 30
+_SUFFIX = ".mlir"
+_CONSTANT_SUFFIX = ".bin"
+
+
+class _CacheState:
+    path = None
+    max_size = DEFAULT_MAX_SIZE
+    hits = 0
+    misses = 0
+    evictions = 0
+    toolchain = None
+    # directory of the constants while the cache is disabled
+    constants_path = None
+    # constants used by the modules of this process, which are not evicted
+    pinned = set()
+
+
+def _default_path():
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "heterocl")
+
+
+def _init_from_env():
+    path = os.environ.get("HCL_CACHE_DIR")
+    if path:
+        _CacheState.path = os.path.abspath(os.path.expanduser(path))
+    size = os.environ.get("HCL_CACHE_SIZE")
+    if size:
+        # a malformed value must not make importing heterocl fail
+        try:
+            _CacheState.max_size = int(size)
+        except ValueError:
+            APIWarning(
+                f"Ignoring HCL_CACHE_SIZE={size!r}, which is not a number of bytes"
+            ).warn()
+
+
+def enable(path=None, max_size=None):
+    """Turn on the compilation cache.
+
+    ``path`` defaults to ``$XDG_CACHE_HOME/heterocl`` and ``max_size``
+    (in bytes) to 1 GiB.
+    """
+    if path is None:
+        path = _default_path()
+    _CacheState.path = os.path.abspath(os.path.expanduser(path))
+    if max_size is not None:
+        _CacheState.max_size = int(max_size)
+    os.makedirs(_CacheState.path, exist_ok=True)
+
+
+def disable():
+    _CacheState.path = None
+
+
+def is_enabled():
+    return _CacheState.path is not None
+
+
+def _toolchain_version():
+    if _CacheState.toolchain is None:
+        version = getattr(hcl_mlir, "__version__", "unknown")
+        # Rebuilding the bindings in place does not bump the version,
+        # so also key on where they live and when they were installed.
+        pkg_dir = os.path.dirname(os.path.abspath(hcl_mlir.__file__))
+        _CacheState.toolchain = f"{version}:{pkg_dir}:{os.path.getmtime(pkg_dir)}"
+    return _CacheState.toolchain
+
+
+def make_key(module_text, opt_level, shared_libs, options=()):
+    """`options` are the other build options that affect the lowering."""
+    hasher = hashlib.sha256()
+    parts = (_toolchain_version(), str(opt_level), *shared_libs, *options, module_text)
+    for part in parts:
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(_CacheState.path, key + _SUFFIX)
+
+
+def _scan(path, suffix):
+    """Returns (mtime, size, path) of the files of `path` ending with `suffix`."""
+    entries = []
+    if not os.path.isdir(path):
+        return entries
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.name.endswith(suffix):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # removed by a concurrent process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def _entries():
+    """Returns (mtime, size, path) of all the cache entries, modules and
+    constants, oldest first."""
+    if _CacheState.path is None:
+        return []
+    entries = _scan(_CacheState.path, _SUFFIX) + _scan(
+        _constants_path(), _CONSTANT_SUFFIX
+    )
+    entries.sort()
+    return entries
+
+
+def lookup(key):
+    """Returns the lowered module text stored under `key`, or None."""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        _CacheState.misses += 1
+        return None
+    # bump the entry to the most recently used position
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    _CacheState.hits += 1
+    return text
+
+
+def store(key, text):
+    os.makedirs(_CacheState.path, exist_ok=True)
+    # write to a temporary file first so that concurrent builds
+    # never observe a partially written entry
+    fd, tmp_path = tempfile.mkstemp(dir=_CacheState.path, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, _entry_path(key))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _evict()
+
+
+def _evict():
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= _CacheState.max_size:
+            break
+        if path in _CacheState.pinned:
+            continue
+        try:
+            os.remove(path)
+            _CacheState.evictions += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _constants_path():
+    if _CacheState.path is not None:
+        return os.path.join(_CacheState.path, "constants")
+    if _CacheState.constants_path is None:
+        _CacheState.constants_path = tempfile.mkdtemp(prefix="hcl_constants_")
+        # the mapped files stay readable once removed
+        atexit.register(shutil.rmtree, _CacheState.constants_path, True)
+    return _CacheState.constants_path
+
+
+def store_constant(values):
+    """Stores the bytes of the numpy array `values` in a file named by
+    their hash, and returns the path of the file.
+    """
+    data = np.ascontiguousarray(values).reshape(-1).view(np.uint8)
+    path = os.path.join(
+        _constants_path(), hashlib.sha256(data).hexdigest() + _CONSTANT_SUFFIX
+    )
+    _CacheState.pinned.add(path)
+    if os.path.exists(path):
+        # bump the entry to the most recently used position
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            # evicted by a concurrent process
+            pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if _CacheState.path is not None:
+        _evict()
+    return path
+
+
+def info():
+    """Returns the configuration, contents and hit/miss counters of the cache."""
+    entries = _entries()
+    return {
+        "enabled": is_enabled(),
+        "path": _CacheState.path,
+        "max_size": _CacheState.max_size,
+        "entries": len(entries),
+        "size": sum(size for _, size, _ in entries),
+        "hits": _CacheState.hits,
+        "misses": _CacheState.misses,
+        "evictions": _CacheState.evictions,
+    }
+
+
+def counters():
+    """Returns the hit, miss and eviction counters."""
+    return (_CacheState.hits, _CacheState.misses, _CacheState.evictions)
+
+
+def add_counters(hits, misses, evictions):
+    """Adds the counters of the lookups made by another process."""
+    _CacheState.hits += hits
+    _CacheState.misses += misses
+    _CacheState.evictions += evictions
+
+
+def clear():
+    """Removes all the cache entries and resets the counters."""
+    for _, _, path in _entries():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    _CacheState.hits = 0
+    _CacheState.misses = 0
+    _CacheState.evictions = 0
+
+
+_init_from_env()
@@ -5,3 +5,8 @@ from . import types
 
 init_dtype = types.Int(32)
 raise_assert_exception = True
+trace_cache = False
+# size in bytes from which constant tensors are kept out of the modules
+external_constants = None
+# whether the AST records the source locations of the operations
+track_locations = True
@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 # pylint: disable=dangerous-default-value
 
+from .ast.ast_visitor import walk
+
 
 class DFGNode:
     def __init__(self, tensor):
@@ -85,12 +87,15 @@ class DataflowGraph:
             self._dfs(node, visited, func)
 
     def _dfs(self, node, visited, func=None):
-        if node.name in visited:
-            return
-        visited.add(node.name)
-        for child in node.children:
-            func(node, child)
-            self._dfs(child, visited, func)
+        def pre(child, parent):
+            if parent is not None:
+                func(parent, child)
+            if child.name in visited:
+                return False
+            visited.add(child.name)
+            return True
+
+        walk(node, lambda node: node.children, pre)
 
     def dump(self):
         print("Dataflow graph:")
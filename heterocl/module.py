@@ -2,30 +2,633 @@
 # SPDX-License-Identifier: Apache-2.0
 # pylint: disable=no-name-in-module
 
+import asyncio
 import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Process
 import numpy as np
 
 from hcl_mlir.dialects import func as func_d
-from hcl_mlir.ir import MemRefType
+from hcl_mlir.ir import MemRefType, ShapedType
 from hcl_mlir.exceptions import APIError, APIWarning, HCLNotImplementedError
 
 from .context import get_context, get_location
 from .devices import Platform
 from .report import report_stats
-from .runtime import execute_fpga_backend, execute_llvm_backend
+from . import aot
+from .runtime import (
+    execute_fpga_backend,
+    execute_llvm_backend,
+    as_kernel_buffer,
+    PackedLLVMCall,
+    release_pages,
+)
+from .passes.halo import HaloAnalysis
+from .tensor import Array, as_ndarray, storage_dtype
+from .types import Fixed, Float, Struct, UFixed, dtype_to_hcl
 from .utils import hcl_dtype_to_mlir
 from .operation import asarray
 
 
+# bytes of the chunks of rows run_chunked() works on, by default
+_CHUNK_BYTES = 64 << 20
+
+
+def _wrap_storage(np_array, dtype):
+    """Wraps values already in the container of `dtype`, without checks"""
+    array = Array.__new__(Array)
+    array.dtype = dtype
+    array.np_array = np_array
+    return array
+
+
+def _dtype_from_str(dtype):
+    if dtype.startswith("float"):
+        # dtype_to_hcl maps all the float types to Float(32)
+        return Float(int(dtype[5:]))
+    return dtype_to_hcl(dtype)
+
+
+class _CallPlan:
+    """Element types and shapes of the arguments of the top function,
+    extracted once from the host module so that the arguments of a call
+    can be checked without going through MLIR.
+
+    Scalar arguments have a None entry. The dynamic dimensions of the
+    shapes are given by the names of their symbolic dimensions, when the
+    signature is known, or by None. The plan is shared by the threads
+    calling the module: it is only read after construction, except for
+    the cache of element types, which is filled under a lock.
+    """
+
+    def __init__(self, host_src, signature=None):
+        # (element type, shape) of the inputs followed by the results
+        self.args = None
+        self.num_inputs = 0
+        # (type, bits, fracs) of a HeteroCL type -> its MLIR element type
+        self._element_types = {}
+        self._lock = threading.Lock()
+        with get_context(), get_location():
+            for op in host_src.body.operations:
+                if isinstance(op, func_d.FuncOp) and op.sym_name.value == "top":
+                    types = [arg.type for arg in op.arguments] + list(op.type.results)
+                    self.args = []
+                    for arg_type in types:
+                        if not MemRefType.isinstance(arg_type):
+                            self.args.append(None)
+                            continue
+                        memref_type = MemRefType(arg_type)
+                        shape = tuple(
+                            None if ShapedType.is_dynamic_size(dim) else dim
+                            for dim in memref_type.shape
+                        )
+                        self.args.append((str(memref_type.element_type), shape))
+                    self.num_inputs = len(op.arguments)
+                    break
+        if signature is not None:
+            # the types of the arguments are known in advance: calls
+            # with the expected types never go through MLIR
+            for arg in signature["args"]:
+                self.element_type(_dtype_from_str(arg["dtype"]))
+            if self.args is not None and len(self.args) == len(signature["args"]):
+                for i, arg in enumerate(signature["args"]):
+                    if self.args[i] is not None:
+                        self.args[i] = (self.args[i][0], tuple(arg["shape"]))
+        # whether some arguments have dynamic dimensions
+        self.dynamic = self.args is not None and any(
+            not isinstance(dim, int)
+            for arg in self.args
+            if arg is not None
+            for dim in arg[1]
+        )
+
+    def match_shapes(self, shapes):
+        """Whether the shapes of the arguments match those of the top
+        function, the arguments sharing a dimension having the same size.
+        """
+        # the sizes of the symbolic dimensions, bound in order
+        sizes = {}
+        return all(
+            arg is None or aot.match_shape(arg[1], shape, sizes)
+            for arg, shape in zip(self.args, shapes)
+        )
+
+    def element_type(self, dtype):
+        if isinstance(dtype, Struct):
+            with self._lock, get_context():
+                return str(hcl_dtype_to_mlir(dtype, signless=True))
+        key = (type(dtype), dtype.bits, dtype.fracs)
+        element_type = self._element_types.get(key)
+        if element_type is None:
+            with self._lock, get_context():
+                element_type = str(hcl_dtype_to_mlir(dtype, signless=True))
+                self._element_types[key] = element_type
+        return element_type
+
+    def matches(self, argv):
+        """Whether the arguments can be passed to the kernel as they are"""
+        if self.args is None or len(argv) != len(self.args):
+            return False
+        for i, (arg, arg_type) in enumerate(zip(argv, self.args)):
+            if arg_type is None:
+                return False
+            element_type, shape = arg_type
+            if not isinstance(arg, Array) or isinstance(arg.dtype, Struct):
+                return False
+            np_array = arg.np_array
+            if np_array.shape != shape and not self.dynamic:
+                return False
+            if not (np_array.flags.c_contiguous and np_array.flags.aligned):
+                return False
+            if i >= self.num_inputs and not np_array.flags.writeable:
+                return False
+            if self.element_type(arg.dtype) != element_type:
+                return False
+            if np_array.dtype != storage_dtype(arg.dtype):
+                return False
+        if self.dynamic:
+            return self.match_shapes([arg.np_array.shape for arg in argv])
+        return True
+
+    def check_batch(self, argv):
+        """Checks arguments stacked along a leading batch axis,
+        and returns the batch size.
+        """
+        if len(argv) != len(self.args):
+            raise APIError(
+                f"Incorrect number of arguments provided. Expected {len(self.args)}, got {len(argv)}."
+            )
+        batch_size = None
+        sizes = {}
+        for i, (arg, arg_type) in enumerate(zip(argv, self.args)):
+            if arg_type is None:
+                raise APIError("Batched calls do not support scalar arguments")
+            element_type, shape = arg_type
+            if isinstance(arg.dtype, Struct):
+                raise APIError("Batched calls do not support struct arguments")
+            if self.element_type(arg.dtype) != element_type:
+                raise APIError(
+                    f"Type mismatch for argument {i}: expected {element_type}, got {arg.dtype}"
+                )
+            np_array = arg.np_array
+            if np_array.ndim != len(shape) + 1 or not aot.match_shape(
+                shape, np_array.shape[1:], sizes
+            ):
+                raise APIError(
+                    f"Shape mismatch for argument {i}: expected (batch, *{shape}), got {np_array.shape}"
+                )
+            if i >= self.num_inputs and not np_array.flags.writeable:
+                raise APIError(f"The output {i} is read-only")
+            if batch_size is None:
+                batch_size = np_array.shape[0]
+            elif np_array.shape[0] != batch_size:
+                raise APIError(
+                    f"Batch size mismatch for argument {i}: expected {batch_size}, got {np_array.shape[0]}"
+                )
+        return batch_size
+
+
+class _Executor:
+    pool = None
+    lock = threading.Lock()
+
+
+def _get_executor():
+    """The thread pool running the calls submitted to the modules"""
+    with _Executor.lock:
+        if _Executor.pool is None:
+            _Executor.pool = ThreadPoolExecutor(thread_name_prefix="hcl_module")
+        return _Executor.pool
+
+
+class _LLVMState:
+    """The state of a module built for the llvm target"""
+
+    def __init__(self, signature=None):
+        # module lowered to the LLVM dialect, the libraries it links to
+        # and the signature of its top function
+        self.text = None
+        self.shared_libs = None
+        self.signature = signature
+        # files mapped at the addresses of the external constants
+        self.constants = {}
+        # (stage, loop) names of the loops vectorized by build_llvm
+        self.vectorized_loops = []
+        # (stage, loop) names of the loops run in parallel
+        self.parallel_loops = []
+        self.num_threads = 1
+        # rebuilds the module for a given number of threads
+        self.rebuild = None
+        # AST of the kernel and function building it for other numbers
+        # of rows, and the modules built by run_chunked()
+        self.chunk_ast = None
+        self.build_chunk = None
+        self.chunk_modules = {}
+
+
 class HCLModule:
-    def __init__(self, name, src, target, host_src=None, context=None, return_num=0):
+    """A compiled kernel.
+
+    Modules built for the llvm target can be called concurrently, from
+    several threads or with submit() and acall(). The compiled engine is
+    only read by the calls, each thread uses its own memref descriptors,
+    and the kernel runs through a ctypes foreign function, which releases
+    the GIL: calls from a thread pool run in parallel. Concurrent calls
+    must be given distinct output arrays, and `bytes_copied` then
+    reports one of the calls. Setting `num_threads` while the module is
+    being called is not supported.
+    """
+
+    def __init__(
+        self,
+        name,
+        src,
+        target,
+        host_src=None,
+        context=None,
+        return_num=0,
+        signature=None,
+    ):
         self.name = name
         self.src = src  # device src
         self.host_src = host_src
         self.target = copy.copy(target)
         self.context = context
         self.return_num = return_num
+        self.profile = None
+        self._llvm = _LLVMState(signature)
+        self._call_plan = None
+        # the packed calls own their memref descriptors, so each thread
+        # calling the module gets its own
+        self._packed_calls = threading.local()
+        # bytes copied by the last call to stage or pad the arguments
+        self.bytes_copied = 0
+        if target == "llvm" and host_src is not None:
+            self._call_plan = _CallPlan(host_src, signature)
+
+    @property
+    def num_threads(self):
+        """The number of threads running the parallel loops (llvm only)"""
+        return self._llvm.num_threads
+
+    @num_threads.setter
+    def num_threads(self, num_threads):
+        if self._llvm.rebuild is None:
+            raise APIError("The number of threads can only be set on llvm modules")
+        if num_threads < 1:
+            raise APIError(f"Invalid number of threads: {num_threads}")
+        module = self._llvm.rebuild(num_threads)
+        self.src = module.src
+        self._packed_calls = threading.local()
+        self._llvm.num_threads = module.num_threads
+        self._llvm.parallel_loops = module.parallel_loops
+        self._llvm.text = module._llvm.text
+        self._llvm.shared_libs = module._llvm.shared_libs
+        self._llvm.constants = module._llvm.constants
+
+    @property
+    def vectorized_loops(self):
+        """The (stage, loop) names of the loops vectorized by build_llvm"""
+        return self._llvm.vectorized_loops
+
+    @property
+    def parallel_loops(self):
+        """The (stage, loop) names of the loops run in parallel (llvm only)"""
+        return self._llvm.parallel_loops
+
+    def export_library(self, path):
+        """Compile the module ahead of time into the shared library `path`.
+
+        A C header declaring the top function is written next to it,
+        with the same name and a .h extension. The library can be loaded
+        back with hcl.load_module(), without JIT compilation.
+        """
+        if self._llvm.text is None:
+            raise APIError("export_library() only supports the llvm target")
+        if self._llvm.signature is None:
+            raise APIError(
+                "The signature of the top function is unknown, "
+                "build the module from a schedule"
+            )
+        if self._llvm.constants:
+            raise APIError(
+                "Modules with constant tensors stored in files cannot be exported"
+            )
+        return aot.export_library(
+            path, self._llvm.text, self._llvm.signature, self._llvm.shared_libs
+        )
+
+    def run_batch(self, *argv):
+        """Run the kernel on each item of a batch of arguments.
+
+        Each argument is stacked along a new leading axis, and is either
+        a HeteroCL array or an array hcl.asarray() accepts, which is
+        converted to the type of the argument of the top function. The
+        arguments are passed in the same order as to __call__, and are
+        passed by reference too: the kernel writes its outputs into them.
+
+        The items are run in a loop that reuses the same memref
+        descriptors, which is much cheaper than calling the module on
+        each item.
+        """
+        if self._call_plan is None or self._call_plan.args is None:
+            raise APIError("run_batch() only supports llvm modules")
+        arrays, views = zip(*[self._as_array(i, arg) for i, arg in enumerate(argv)])
+        batch_size = self._call_plan.check_batch(arrays)
+        bytes_copied = 0
+        buffers = []
+        for array in arrays:
+            buffer, is_copy = as_kernel_buffer(
+                array.np_array, storage_dtype(array.dtype)
+            )
+            if is_copy:
+                bytes_copied += 2 * buffer.nbytes
+            buffers.append(buffer)
+        self._get_packed_call().call_batch(buffers, batch_size)
+        for view, array, buffer in zip(views, arrays, buffers):
+            if buffer is not array.np_array:
+                np.copyto(array.np_array, buffer, casting="unsafe")
+            if view is not None:
+                bytes_copied += array.np_array.nbytes
+                if view.flags.writeable:
+                    np.copyto(view, array.asnumpy(), casting="unsafe")
+        self.bytes_copied = bytes_copied
+
+    def run_chunked(self, *argv, rows=None):
+        """Run the kernel on chunks of rows of its arguments, to work on
+        memory-mapped arrays larger than the memory.
+
+        The arguments are passed as to __call__, and are typically
+        np.memmap arrays. The outputs are computed `rows` rows at a
+        time, by default as many as fit in 64 MiB of buffers, by a
+        kernel built for chunks of that size. Each chunk of the inputs
+        is copied into buffers reused across the chunks, with the rows
+        after it that the chunk of the outputs reads, and the rows of
+        the outputs are written back once computed. The pages of the
+        memory-mapped arrays are released once processed, so that the
+        memory used stays bounded by the size of the chunks.
+
+        Only the kernels whose stages compute each row of their
+        tensors from rows of the other tensors at constant offsets
+        (see HaloAnalysis) can run on chunks, and inputs that are not
+        indexed by rows are passed whole. The kernel of the chunks is
+        traced again from the kernel function, so the kernels whose
+        schedule has primitives applied to it cannot run on chunks.
+        """
+        if self._llvm.build_chunk is None or self._llvm.signature is None:
+            raise APIError(
+                "run_chunked() only supports llvm modules built from a schedule"
+            )
+        primitives = [
+            str(op).strip()
+            for op in self._llvm.chunk_ast.top_func.body
+            if getattr(op, "is_customize_op", False)
+        ]
+        if primitives:
+            raise APIError(
+                "run_chunked() does not support schedules with primitives, "
+                f"found {primitives[0]}"
+            )
+        signature = self._llvm.signature["args"]
+        if len(argv) != len(signature):
+            raise APIError(
+                f"Incorrect number of arguments provided. Expected {len(signature)}, got {len(argv)}."
+            )
+        analysis = HaloAnalysis()
+        analysis.apply(self._llvm.chunk_ast)
+        num_inputs = len(self._llvm.chunk_ast.top_func.args)
+        names = [arg["name"] for arg in signature]
+        dtypes = [_dtype_from_str(arg["dtype"]) for arg in signature]
+        views = []
+        # the arguments given as HeteroCL arrays hold values in their
+        # containers, which are copied as they are
+        raw = set()
+        for i, arg in enumerate(argv):
+            if isinstance(arg, Array):
+                raw.add(i)
+                view = arg.np_array
+            else:
+                if isinstance(arg, (int, float)):
+                    arg = np.array([arg])
+                view = as_ndarray(arg)
+            if tuple(view.shape) != tuple(signature[i]["shape"]):
+                raise APIError(
+                    f"Shape mismatch between argument {i} {view.shape} and the kernel argument {tuple(signature[i]['shape'])}"
+                )
+            if i >= num_inputs and not view.flags.writeable:
+                raise APIError(f"The output {i} is read-only")
+            views.append(view)
+        outputs = range(num_inputs, len(argv))
+        chunked = [i for i in range(len(argv)) if names[i] not in analysis.resident]
+        for i in outputs:
+            for name, (first, last) in analysis.footprint(names[i]).items():
+                if first < 0 or views[i].shape[0] - 1 + last >= analysis.extents[name]:
+                    raise APIError(
+                        f"The output {names[i]} reads rows of {name} out of its bounds"
+                    )
+
+        min_rows = min(views[i].shape[0] for i in outputs)
+        max_rows = max(views[i].shape[0] for i in outputs)
+        if rows is None:
+            row_bytes = sum(
+                storage_dtype(dtypes[i]).itemsize * int(np.prod(views[i].shape[1:]))
+                for i in chunked
+            )
+            rows = max(1, _CHUNK_BYTES // max(1, row_bytes))
+        if rows < 1:
+            raise APIError(f"Invalid number of rows: {rows}")
+        rows = min(rows, max_rows)
+        delta = rows - min_rows
+        extents = {name: n + delta for name, n in analysis.extents.items()}
+        if min(extents.values()) < 1:
+            raise APIError(f"Chunks of {rows} rows are too small for this kernel")
+        chunk_module = self._get_chunk_module(analysis, extents, delta)
+
+        bytes_copied = 0
+        buffers = []
+        for i, view in enumerate(views):
+            if i in raw and i not in chunked:
+                buffers.append(argv[i])
+            elif i not in chunked:
+                # read whole
+                array = Array(view, dtypes[i])
+                if array.np_array is not view:
+                    bytes_copied += array.np_array.nbytes
+                buffers.append(array)
+            else:
+                shape = (extents[names[i]],) + view.shape[1:]
+                buffer = np.zeros(shape, dtype=storage_dtype(dtypes[i]))
+                buffers.append(_wrap_storage(buffer, dtypes[i]))
+        released = [0] * len(argv)
+        for base in range(0, max_rows, rows):
+            for i in chunked:
+                if i >= num_inputs:
+                    continue
+                # the rows of the chunk, and those after it it reads
+                halo = analysis.halos.get(names[i], (0, 0))[1]
+                end = min(base + rows + halo, views[i].shape[0])
+                values = views[i][base:end]
+                if i not in raw:
+                    values = Array(values, dtypes[i]).np_array
+                buffers[i].np_array[: end - base] = values
+                bytes_copied += values.nbytes
+            chunk_module(*buffers)
+            for i in chunked:
+                end = min(base + rows, views[i].shape[0])
+                if i >= num_inputs and end > base:
+                    values = buffers[i].np_array[: end - base]
+                    if i not in raw:
+                        values = self._decode_rows(values, dtypes[i], views[i].dtype)
+                    np.copyto(views[i][base:end], values, casting="unsafe")
+                    bytes_copied += values.nbytes
+                # the next chunks do not access the rows before them
+                release_pages(views[i], released[i], end)
+                released[i] = max(released[i], end)
+        self.bytes_copied = bytes_copied
+
+    def _get_chunk_module(self, analysis, extents, delta):
+        """Returns the module of the kernel for the tensors of `extents`
+        rows, building it if needed
+        """
+        if delta == 0:
+            return self
+        if delta in self._llvm.chunk_modules:
+            return self._llvm.chunk_modules[delta]
+        inputs = {
+            tensor.name: extents[tensor.name]
+            for tensor in self._llvm.chunk_ast.top_func.args
+            if tensor.name in extents
+        }
+        chunk_module, chunk_ast = self._llvm.build_chunk(inputs)
+        chunk_analysis = HaloAnalysis()
+        chunk_analysis.apply(chunk_ast)
+        if chunk_analysis.extents != extents or chunk_analysis.halos != analysis.halos:
+            raise APIError(
+                "The kernel does not compute the same rows on chunks of rows, "
+                "it may depend on the shapes of its inputs"
+            )
+        self._llvm.chunk_modules[delta] = chunk_module
+        return chunk_module
+
+    @staticmethod
+    def _decode_rows(values, dtype, np_dtype):
+        """Returns the values of `dtype` held in their container by the
+        rows `values`, for an array of the numpy type `np_dtype`
+        """
+        if np_dtype == values.dtype and not (
+            isinstance(dtype, (Fixed, UFixed)) and dtype.fracs != 0
+        ):
+            return values
+        return _wrap_storage(values, dtype).asnumpy()
+
+    def map(self, inputs_batch, outputs_batch):
+        """Run the kernel on each item of a batch, see run_batch()"""
+        return self.run_batch(*inputs_batch, *outputs_batch)
+
+    def submit(self, *argv, executor=None):
+        """Call the module in a thread pool, and return a
+        concurrent.futures.Future resolved once the kernel has run.
+
+        The module is run by `executor`, or by a thread pool shared by
+        all the modules. As with __call__, the outputs are written into
+        the given arrays, which must not be used before the future is
+        done.
+        """
+        if executor is None:
+            executor = _get_executor()
+        return executor.submit(self, *argv)
+
+    async def acall(self, *argv, executor=None):
+        """Coroutine calling the module in a thread pool, see submit()"""
+        return await asyncio.wrap_future(self.submit(*argv, executor=executor))
+
+    def _as_array(self, i, arg):
+        """Converts the argument `i` to a HeteroCL array of the type of
+        the top function. Returns the array, and the view of `arg` when
+        the array does not share its memory, None otherwise.
+        """
+        if isinstance(arg, Array):
+            return arg, None
+        if self._llvm.signature is None:
+            raise APIError(
+                "The types of the arguments are unknown, "
+                "pass HeteroCL arrays instead of numpy arrays"
+            )
+        view = as_ndarray(arg)
+        array = asarray(view, _dtype_from_str(self._llvm.signature["args"][i]["dtype"]))
+        return array, None if array.np_array is view else view
+
+    @staticmethod
+    def _copy_back(views):
+        """Copies the values of converted arguments back to the writeable
+        arrays they were converted from, and returns the bytes copied.
+        """
+        bytes_copied = 0
+        for view, array in views:
+            if view.flags.writeable:
+                np.copyto(view, array.asnumpy(), casting="unsafe")
+                bytes_copied += view.nbytes
+        return bytes_copied
+
+    def _get_packed_call(self):
+        packed_call = getattr(self._packed_calls, "call", None)
+        if packed_call is None:
+            shapes = [shape for _, shape in self._call_plan.args]
+            packed_call = PackedLLVMCall(self.src, self.name, shapes)
+            self._packed_calls.call = packed_call
+        return packed_call
+
+    def _call_packed(self, argv):
+        """Fast path of __call__ for arguments matching the call plan"""
+        self._get_packed_call()([arg.np_array for arg in argv])
+
+    def _pad_arguments(self, argv, original_results):
+        """Checks the types of the arguments and pads those smaller than
+        the arguments of the top function. Returns the number of bytes
+        copied.
+
+        Kernels with symbolic dimensions run on arguments of any size,
+        which are never padded.
+        """
+        plan = self._call_plan
+        # check if enough args are provided
+        if len(argv) != len(plan.args):
+            raise APIError(
+                f"Incorrect number of arguments provided. Expected {len(plan.args)}, got {len(argv)}."
+            )
+        bytes_copied = 0
+        for i, arg_type in enumerate(plan.args):
+            if arg_type is None:
+                continue
+            element_type, shape = arg_type
+            is_input = i < plan.num_inputs
+            arg = argv[i]
+            if not is_input and not arg.np_array.flags.writeable:
+                raise APIError(f"The output {i} is read-only")
+            arg_element_type = plan.element_type(arg.dtype)
+            assert (
+                element_type == arg_element_type
+            ), f"{'Input' if is_input else 'Output'} types: {element_type} {arg_element_type}"
+            if shape == arg.np_array.shape or plan.dynamic:
+                continue
+            if is_input:
+                message = f"Shape mismatch between input {shape} and kernel argument {arg.np_array.shape}!"
+            else:
+                message = f"Shape mismatch between output {shape} and kernel result {arg.np_array.shape}!"
+                original_results.append([arg, arg.np_array.shape])
+            APIWarning(message).warn()
+            pad_shape = []
+            for dst, src in zip(shape, arg.np_array.shape):
+                pad_shape.append((0, dst - src))
+            arg.np_array = np.pad(arg.np_array, pad_shape)
+            bytes_copied += arg.np_array.nbytes
+        if plan.dynamic and not plan.match_shapes([arg.np_array.shape for arg in argv]):
+            expected = [arg_type and arg_type[1] for arg_type in plan.args]
+            raise APIError(
+                f"Shape mismatch between the arguments {[arg.np_array.shape for arg in argv]} and the kernel arguments {expected}"
+            )
+        return bytes_copied
 
     def run_hls(self, shell=False):
         execute_fpga_backend(self.target, shell)
@@ -46,76 +649,35 @@ class HCLModule:
         elif target == "llvm":
             # convert python immediate to heterocl tensor
             argv = list(argv)
+            # the converted arguments not sharing the memory of the
+            # given ones, to which their values are copied back
+            views = []
             for i, arg in enumerate(argv):
                 if isinstance(arg, (int, float)):
                     np_array = np.array([arg], dtype=type(arg))
                     argv[i] = asarray(np_array)
+                elif not isinstance(arg, Array):
+                    # numpy, memory-mapped, buffer or DLPack arrays
+                    argv[i], view = self._as_array(i, arg)
+                    if view is not None:
+                        views.append((view, argv[i]))
+            bytes_copied = sum(array.np_array.nbytes for _, array in views)
+            if self._call_plan is not None and self._call_plan.matches(argv):
+                self._call_packed(argv)
+                self.bytes_copied = bytes_copied + self._copy_back(views)
+                return
             original_results = []
-            with get_context(), get_location():
-                for op in self.host_src.body.operations:
-                    if isinstance(op, func_d.FuncOp) and op.sym_name.value == "top":
-                        # check if enough args are provided
-                        correct_arg_num = len(op.arguments) + len(op.type.results)
-                        if len(argv) != correct_arg_num:
-                            raise APIError(
-                                f"Incorrect number of arguments provided. Expected {correct_arg_num}, got {len(argv)}."
-                            )
-                        # test inputs
-                        for i, arg in enumerate(op.arguments):
-                            if not MemRefType.isinstance(arg.type):
-                                continue
-                            memref_type = MemRefType(arg.type)
-                            assert str(memref_type.element_type) == str(
-                                hcl_dtype_to_mlir(argv[i].dtype, signless=True)
-                            ), f"Input types: {memref_type.element_type} {hcl_dtype_to_mlir(argv[i].dtype, signless=True)}"
-                            if tuple(memref_type.shape) != argv[i].np_array.shape:
-                                APIWarning(
-                                    f"Shape mismatch between input {tuple(memref_type.shape)} and kernel argument {argv[i].np_array.shape}!"
-                                ).warn()
-                                pad_shape = []
-                                for dst, src in zip(
-                                    memref_type.shape, argv[i].np_array.shape
-                                ):
-                                    pad_shape.append((0, dst - src))
-                                argv[i].np_array = np.pad(argv[i].np_array, pad_shape)
-                        # test outputs
-                        for i, res_type in enumerate(op.type.results):
-                            if not MemRefType.isinstance(res_type):
-                                continue
-                            memref_type = MemRefType(res_type)
-                            assert str(memref_type.element_type) == str(
-                                hcl_dtype_to_mlir(
-                                    argv[len(op.arguments) + i].dtype, signless=True
-                                )
-                            ), f"Output types: {memref_type.element_type} {hcl_dtype_to_mlir(argv[len(op.arguments) + i].dtype, signless=True)}"
-                            if (
-                                tuple(memref_type.shape)
-                                != argv[len(op.arguments) + i].np_array.shape
-                            ):
-                                APIWarning(
-                                    f"Shape mismatch between output {tuple(memref_type.shape)} and kernel result {argv[len(op.arguments) + i].np_array.shape}!"
-                                ).warn()
-                                pad_shape = []
-                                for dst, src in zip(
-                                    memref_type.shape,
-                                    argv[len(op.arguments) + i].np_array.shape,
-                                ):
-                                    pad_shape.append((0, dst - src))
-                                original_results.append(
-                                    [
-                                        argv[len(op.arguments) + i],
-                                        argv[len(op.arguments) + i].np_array.shape,
-                                    ]
-                                )
-                                argv[len(op.arguments) + i].np_array = np.pad(
-                                    argv[len(op.arguments) + i].np_array, pad_shape
-                                )
-            execute_llvm_backend(self.src, self.name, self.return_num, *argv)
+            if self._call_plan is not None and self._call_plan.args is not None:
+                bytes_copied += self._pad_arguments(argv, original_results)
+            bytes_copied += execute_llvm_backend(
+                self.src, self.name, self.return_num, *argv
+            )
             for res, shape in original_results:
                 slicing = []
                 for s in shape:
                     slicing.append(slice(0, s))
                 res.np_array = res.np_array[tuple(slicing)]
+            self.bytes_copied = bytes_copied + self._copy_back(views)
         else:
             raise HCLNotImplementedError(f"Backend {target} is not implemented")
 
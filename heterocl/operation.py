@@ -24,14 +24,45 @@ from .utils import (
 from .ast import ast
 
 
-def init(init_dtype=Int(32), raise_assert_exception=True):
-    """Initialize a HeteroCL environment with configurations."""
+def init(
+    init_dtype=Int(32),
+    raise_assert_exception=True,
+    trace_cache=False,
+    external_constants=None,
+    track_locations=True,
+):
+    """Initialize a HeteroCL environment with configurations.
+
+    When `trace_cache` is set, create_schedule() reuses the AST traced
+    from an earlier call with the same kernel function and inputs
+    instead of executing the kernel function again.
+
+    The values of the constant tensors of at least `external_constants`
+    bytes are stored in files instead of the modules, which keeps large
+    weights out of the MLIR text. Modules built for the llvm target map
+    these files into memory when they are loaded.
+
+    Without `track_locations`, the operations are traced without
+    looking up the lines of the source they come from, which speeds up
+    the tracing of large programs. Their locations are then unknown in
+    the generated IR and in the error messages.
+    """
     config.init_dtype = init_dtype
     config.raise_assert_exception = raise_assert_exception
+    config.trace_cache = trace_cache
+    config.external_constants = external_constants
+    config.track_locations = track_locations
+    ast.scope.dims.clear()
 
 
 def placeholder(shape, name=None, dtype=None):
-    """Construct a HeteroCL placeholder for inputs/outputs."""
+    """Construct a HeteroCL placeholder for inputs/outputs.
+
+    A dimension given as a string, e.g. ("N", 32), is symbolic: its size
+    is given by the arrays the built module is called with, so the same
+    module runs on inputs of any size. The dimensions with the same name
+    have the same size, within the placeholders of one kernel.
+    """
     name = UniqueName.get(name, "tensor")
 
     if (
@@ -47,15 +78,27 @@ def placeholder(shape, name=None, dtype=None):
         shape = (1,)
     dtype = config.init_dtype if dtype is None else dtype
     filename, lineno = get_src_loc(frame=1)
-    alloc = ast.AllocOp(name, shape, dtype, ast.Location(filename, lineno))
+    loc = ast.Location(filename, lineno)
+    shape = tuple(
+        ast.SymbolicDim.get(dim, loc) if isinstance(dim, str) else dim for dim in shape
+    )
+    alloc = ast.AllocOp(name, shape, dtype, loc)
     return alloc
 
 
-def asarray(np_array, dtype=None):
+def asarray(np_array, dtype=None, copy=None):  # pylint: disable=redefined-outer-name
+    """Create a HeteroCL array from a numpy array, a memory-mapped array,
+    an object supporting the buffer protocol or a DLPack tensor.
+
+    The array shares the memory of `np_array` when it already holds the
+    values of `dtype`, for instance int8 values for hcl.Int(8). Set
+    `copy` to True to always copy them, or to False to raise an error
+    instead of copying.
+    """
     if isinstance(dtype, str):
         dtype = dtype_to_hcl(dtype)
     dtype = config.init_dtype if dtype is None else dtype
-    return Array(np_array, dtype)
+    return Array(np_array, dtype, copy)
 
 
 def scalar(init_val, name=None, dtype=None):
@@ -110,7 +153,10 @@ def const_tensor(values, name=None, dtype=None):
     values = np.array(values)
     shape = values.shape
     values = make_const_tensor(values, dtype)
-    cst_op = ast.ConstantTensorOp(values, name, shape, dtype, loc)
+    external = config.external_constants is not None and values.nbytes >= max(
+        config.external_constants, 1
+    )
+    cst_op = ast.ConstantTensorOp(values, name, shape, dtype, loc, external)
     region = ast.scope.get()
     region.append(cst_op)
     return cst_op.tensor
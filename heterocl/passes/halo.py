@@ -0,0 +1,289 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..ast import ast
+from ..ast.ast_visitor import walk
+from .pass_manager import Pass
+from hcl_mlir.exceptions import *
+
+# primitives that do not change what the stages compute
+_SCHEDULE_OPS = (
+    ast.PartitionOp,
+    ast.ReformOp,
+    ast.ReuseAtOp,
+    ast.BufferAtOp,
+    ast.OutlineOp,
+    ast.ReorderOp,
+    ast.SplitOp,
+    ast.TileOp,
+    ast.PipelineOp,
+    ast.UnrollOp,
+    ast.ParallelOp,
+    ast.FuseOp,
+    ast.ComputeAtOp,
+)
+
+# operands of the expressions and statements that may appear in stages
+_OPERANDS = (
+    (ast.CastOp, ("expr",)),
+    (ast.UnaryOp, ("expr",)),
+    (ast.TernaryOp, ("cond", "lhs", "rhs")),
+    (ast.BinaryOp, ("lhs", "rhs")),
+    (ast.GetBitOp, ("expr", "index")),
+    (ast.SetBitOp, ("expr", "index", "value")),
+    (ast.GetSliceOp, ("expr", "start", "end")),
+    (ast.SetSliceOp, ("expr", "start", "end", "value")),
+    (ast.SelectOp, ("cond", "true_value", "false_value")),
+    (ast.StructConstructOp, ("args",)),
+    (ast.StructGetOp, ("struct",)),
+    (ast.ReduceOp, ("expr", "init", "body")),
+    (ast.IfOp, ("cond", "body", "else_body")),
+    (ast.ElseIfOp, ("cond", "body")),
+    (ast.ElseOp, ("body",)),
+    (ast.ForOp, ("low", "high", "step", "body")),
+    (ast.WhileOp, ("cond", "body")),
+    (ast.ComputeOp, ("body",)),
+    (ast.ReturnOp, ("expr",)),
+    (ast.PrintOp, ("args",)),
+)
+
+# nodes without operands
+_LEAVES = (
+    type(None),
+    int,
+    float,
+    list,
+    tuple,
+    ast.ConstantOp,
+    ast.AllocOp,
+    ast.SymbolicDim,
+)
+
+
+class HaloAnalysis(Pass):
+    """Find the rows of the tensors that each row of the outputs of the
+    top function depends on, to run the function on chunks of rows.
+
+    The rows are the first dimension of the tensors. Every stage of the
+    top function must be a compute whose first axis is the row of the
+    tensor it produces, and which loads the other tensors at rows at a
+    constant offset from this axis: B[i, j] = A[i + 1, j] + A[i + 2, j]
+    reads the rows i + 1 to i + 2 of A. The axis must not appear
+    anywhere else, so that the stage computes the same values on any
+    chunk of rows. Inputs not indexed by the axis, such as weights, are
+    read whole.
+
+    After apply():
+    - `extents` maps the names of the tensors split into rows to their
+      number of rows;
+    - `resident` is the set of names of the inputs read whole;
+    - `halos` maps the names of the inputs split into rows to the
+      (first, last) offsets of the rows that a row of the outputs
+      reads, through all the stages.
+
+    APIError is raised for the functions that cannot run on chunks.
+    """
+
+    def __init__(self):
+        super().__init__("halo_analysis")
+        self.extents = {}
+        self.resident = set()
+        self.halos = {}
+        # id of the tensors split into rows -> tensor
+        self._tensors = {}
+        # id of the inputs -> whether they are read by rows
+        self._inputs = {}
+        # name of a computed tensor -> {name of a tensor: [first, last]}
+        self._reads = {}
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        top_func = _ast.top_func
+        for tensor in top_func.args:
+            if any(not isinstance(dim, int) for dim in tensor.shape):
+                raise APIError(
+                    f"The shape of {tensor.name} is symbolic: "
+                    "run the kernel on arrays of any size instead"
+                )
+            self._inputs[id(tensor)] = None
+            self._tensors[id(tensor)] = tensor
+        for op in top_func.body:
+            if isinstance(op, ast.ComputeOp) and op.kind == "compute":
+                self._tensors[id(op.tensor)] = op.tensor
+        for op in top_func.body:
+            if isinstance(op, ast.ComputeOp):
+                self.visit_stage(op)
+            elif not isinstance(
+                op, _SCHEDULE_OPS + (ast.AllocOp, ast.ConstantTensorOp)
+            ):
+                raise APIError(
+                    f"Unsupported operation at the top level of the kernel: {type(op).__name__}"
+                )
+        for tensor in top_func.args:
+            if self._inputs[id(tensor)] is False:
+                self.resident.add(tensor.name)
+                del self._tensors[id(tensor)]
+        if not top_func.return_tensors:
+            raise APIError("The kernel does not return any tensor")
+        for tensor in top_func.return_tensors:
+            if tensor.name not in self._reads:
+                raise APIError(f"The output {tensor.name} is not computed by a stage")
+            for name, (first, last) in self.footprint(tensor.name).items():
+                first_, last_ = self.halos.get(name, (first, last))
+                self.halos[name] = (min(first, first_), max(last, last_))
+        self.extents = {
+            tensor.name: tensor.shape[0] for tensor in self._tensors.values()
+        }
+        return _ast
+
+    def footprint(self, name):
+        """The (first, last) offsets of the rows of the inputs that a row
+        of the tensor `name` reads.
+        """
+        # name of a tensor -> its footprint, once its sources are done
+        footprints = {}
+        walking = set()
+
+        def pre(name, _parent):
+            if name in footprints:
+                return False
+            if name in walking:
+                raise APIError(
+                    f"{name} is computed from its own rows, which cannot run on chunks of rows"
+                )
+            walking.add(name)
+            return True
+
+        def post(name, _parent):
+            walking.discard(name)
+            if name not in self._reads:
+                # an input
+                footprints[name] = {name: (0, 0)}
+                return
+            rows = {}
+            for source, (first, last) in self._reads[name].items():
+                for input_name, (lo, hi) in footprints[source].items():
+                    lo, hi = lo + first, hi + last
+                    if input_name in rows:
+                        lo = min(lo, rows[input_name][0])
+                        hi = max(hi, rows[input_name][1])
+                    rows[input_name] = (lo, hi)
+            footprints[name] = rows
+
+        walk(name, lambda name: list(self._reads.get(name, ())), pre, post)
+        return footprints[name]
+
+    def visit_stage(self, op):
+        if op.kind != "compute":
+            raise APIError(
+                f"Stage {op.name} updates a tensor, which cannot run on chunks of rows"
+            )
+        self._reads[op.tensor.name] = {}
+        self.visit(op.body, op.iter_vars[0], op)
+
+    def visit(self, node, row, stage):
+        """Checks the expressions and statements of `stage` from `node`,
+        and records the rows they access.
+        """
+
+        def pre(node, _parent):
+            if isinstance(node, (ast.LoadOp, ast.StoreOp)):
+                self.visit_access(node, row, stage)
+            elif isinstance(node, ast.IterVar):
+                if node is row:
+                    raise APIError(
+                        f"Stage {stage.name} uses its axis {row.name} outside of "
+                        "the rows it accesses, which cannot run on chunks of rows"
+                    )
+            elif isinstance(node, ast.CallOp):
+                for arg in node.args:
+                    if isinstance(arg, ast.AllocOp) and id(arg) in self._tensors:
+                        raise APIError(
+                            f"Stage {stage.name} passes {arg.name} to the function "
+                            f"{node.name}, which cannot run on chunks of rows"
+                        )
+            elif not isinstance(node, _LEAVES) and _operands(node) is None:
+                raise APIError(
+                    f"Unsupported operation in stage {stage.name}: {type(node).__name__}"
+                )
+
+        walk(node, self.children, pre)
+
+    def children(self, node):
+        """The operands of `node` that are checked, after pre()"""
+        if isinstance(node, (list, tuple)):
+            return node
+        if isinstance(node, (ast.LoadOp, ast.StoreOp)):
+            operands = [node.value] if isinstance(node, ast.StoreOp) else []
+            tensor = node.tensor
+            if id(tensor) not in self._tensors or self._inputs.get(id(tensor)) is False:
+                # local tensors, constant tensors and the inputs read
+                # whole: the row must not appear in the index
+                return operands + list(node.index)
+            return operands + list(node.index[1:])
+        if isinstance(node, ast.CallOp):
+            return node.args
+        operands = _operands(node)
+        if operands is None:
+            return ()
+        return [getattr(node, operand) for operand in operands]
+
+    def visit_access(self, op, row, stage):
+        """Records the rows of the tensor that `op` accesses, its
+        operands are checked by visit().
+        """
+        tensor = op.tensor
+        if id(tensor) not in self._tensors:
+            return
+        offset = _row_offset(op.index[0], row)
+        if isinstance(op, ast.StoreOp):
+            if tensor is not stage.tensor or offset != 0:
+                raise APIError(
+                    f"Stage {stage.name} stores into {tensor.name} "
+                    "outside of its row, which cannot run on chunks of rows"
+                )
+            return
+        if id(tensor) in self._inputs:
+            by_rows = offset is not None
+            if self._inputs[id(tensor)] not in {None, by_rows}:
+                raise APIError(
+                    f"The input {tensor.name} is read both by rows and whole"
+                )
+            self._inputs[id(tensor)] = by_rows
+            if not by_rows:
+                return
+        elif offset is None:
+            raise APIError(
+                f"Stage {stage.name} reads {tensor.name} at rows that are "
+                f"not at a constant offset from {row.name}"
+            )
+        reads = self._reads[stage.tensor.name]
+        first, last = reads.get(tensor.name, (offset, offset))
+        reads[tensor.name] = (min(first, offset), max(last, offset))
+
+
+def _operands(node):
+    """The names of the operands of `node`, None if it is not supported"""
+    for op_class, operands in _OPERANDS:
+        if isinstance(node, op_class):
+            return operands
+    return None
+
+
+def _row_offset(index, row):
+    """The offset of `index` from the axis `row`, or None if it is not
+    the axis plus a constant.
+    """
+    if index is row:
+        return 0
+    if isinstance(index, (ast.Add, ast.Sub)):
+        lhs, rhs = index.lhs, index.rhs
+        if isinstance(index, ast.Add) and isinstance(lhs, ast.ConstantOp):
+            lhs, rhs = rhs, lhs
+        if not isinstance(rhs, ast.ConstantOp) or not isinstance(rhs.value, int):
+            return None
+        offset = _row_offset(lhs, row)
+        if offset is None:
+            return None
+        return offset + rhs.value if isinstance(index, ast.Add) else offset - rhs.value
+    return None
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from ..ast import ast
+from ..ast.ast_visitor import op_body, walk
 from .pass_manager import Pass
 from hcl_mlir.exceptions import *
 
@@ -17,15 +18,17 @@ class NestElseIf(Pass):
         super().__init__("nest_else_if")
 
     def visit(self, op):
+        # the scopes are converted after their nested scopes
+        walk(op, self.children, post=self.leave)
+
+    def children(self, op):
         if isinstance(op, ast.StoreOp):
-            if op.value is not None:
-                self.visit(op.value)
-        if hasattr(op, "body") and op.body is not None:
-            for body_op in op.body:
-                self.visit(body_op)
-            self.nest_elif(op)
-        else:
-            return
+            # the stored value is a scope if it is a reduction
+            return (op.value,) if op_body(op.value) else ()
+        return op_body(op)
+
+    def leave(self, op, parent):
+        self.nest_elif(op)
 
     def apply(self, _ast):
         """Pass entry point"""
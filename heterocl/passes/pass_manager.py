@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from ..ast import ast
+from ..ast.ast_visitor import op_body, walk
+from .. import profiler
 from hcl_mlir.exceptions import *
 from hcl_mlir.ir import *
 
@@ -29,10 +31,12 @@ class Pass(object):
         op : intermediate.Operation
             the operation to be updated
         """
-        if hasattr(op, "body") and op.body is not None:
-            for body_op in op.body:
-                body_op.level = op.level + 1
-                self.update_level(body_op)
+
+        def pre(body_op, parent):
+            if parent is not None:
+                body_op.level = parent.level + 1
+
+        walk(op, op_body, pre)
 
 
 class PassManager(object):
@@ -48,5 +52,7 @@ class PassManager(object):
     def run(self, _ast):
         for pass_class in self.pipeline:
             pass_obj = pass_class()
-            _ast = pass_obj.apply(_ast)
+            with profiler.phase("ast." + pass_obj.name) as phase:
+                _ast = pass_obj.apply(_ast)
+                phase.ir = _ast
         return _ast
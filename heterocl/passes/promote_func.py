@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from ..ast import ast
+from ..ast.ast_visitor import op_body, walk
 from .pass_manager import Pass
 from hcl_mlir.exceptions import *
 
@@ -18,15 +19,18 @@ class PromoteFunc(Pass):
     def apply(self, _ast):
         """Pass entry point"""
         self._ast = _ast
-        self.visit(_ast.region)
+        self.visit(_ast)
         return _ast
 
-    def visit(self, region):
-        for op in region:
+    def visit(self, _ast):
+        def children(op):
+            return _ast.region if op is _ast else op_body(op)
+
+        def pre(op, parent):
             if isinstance(op, ast.FuncOp):
-                self.promote_func(op, region)
-            if hasattr(op, "body") and op.body is not None:
-                self.visit(op.body)
+                self.promote_func(op, children(parent))
+
+        walk(_ast, children, pre)
 
     def promote_func(self, op, region):
         if op in self._ast.region:
@@ -0,0 +1,164 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Per-phase profiling of the compilation flow.
+
+``hcl.build(s, profile=True)``, or the ``HCL_PROFILE`` environment
+variable, records the wall time, the memory usage of the process and the
+number of operations in the IR produced by every phase of lowering and
+building: the AST passes, the IR builder, the MLIR pass pipelines, each
+``hcl_d`` lowering pass, the module print/parse round trips and the JIT
+compilation. ``profile`` (or ``HCL_PROFILE``) may also be a file path,
+in which case the report is dumped there as JSON.
+"""
+
+import os
+import sys
+import json
+import time
+
+import psutil
+from hcl_mlir.exceptions import APIError
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from .ast import ast
+
+
+class _State:
+    active = None
+    last_report = None
+
+
+def _peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count_ops(ir):
+    """Number of operations in an AST or an MLIR module"""
+    if ir is None:
+        return None
+    count = 0
+    if isinstance(ir, ast.AST):
+        stack = list(ir.region)
+        while stack:
+            op = stack.pop()
+            count += 1
+            for attr in ("body", "else_body"):
+                body = getattr(op, attr, None)
+                if isinstance(body, list):
+                    stack.extend(body)
+        return count
+    stack = [ir.operation]
+    while stack:
+        op = stack.pop()
+        count += 1
+        for region in op.regions:
+            for block in region.blocks:
+                for child in block.operations:
+                    stack.append(child.operation)
+    return count
+
+
+class Phase:
+    """Context manager measuring one phase.
+
+    The IR produced by the phase is either given to the constructor,
+    when the phase transforms it in place, or assigned to `ir` inside
+    the `with` block.
+    """
+
+    def __init__(self, profiler, name, ir=None):
+        self.profiler = profiler
+        self.name = name
+        self.ir = ir
+        self.start = None
+        self.rss = None
+
+    def __enter__(self):
+        if self.profiler is not None:
+            self.rss = self.profiler.process.memory_info().rss
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.profiler is None:
+            return
+        elapsed = time.perf_counter() - self.start
+        rss = self.profiler.process.memory_info().rss
+        self.profiler.phases.append(
+            {
+                "name": self.name,
+                "time": elapsed,
+                "rss": rss,
+                "rss_delta": rss - self.rss,
+                "peak_rss": _peak_rss(),
+                "ops": count_ops(self.ir) if exc_type is None else None,
+            }
+        )
+
+
+class Profiler:
+    def __init__(self):
+        self.process = psutil.Process()
+        self.phases = []
+        self.start = time.perf_counter()
+
+    def report(self):
+        return {
+            "total_time": time.perf_counter() - self.start,
+            "peak_rss": _peak_rss(),
+            "phases": list(self.phases),
+        }
+
+
+def phase(name, ir=None):
+    """Profile a phase of the compilation flow if profiling is on"""
+    return Phase(_State.active, name, ir)
+
+
+def parse_option(profile):
+    """Returns whether to profile, and where to dump the report"""
+    if profile is None:
+        profile = os.environ.get("HCL_PROFILE", "")
+        if profile.lower() in {"", "0", "false", "off"}:
+            return False, None
+        if profile.lower() in {"1", "true", "on"}:
+            return True, None
+    if isinstance(profile, str):
+        return True, profile
+    return bool(profile), None
+
+
+def start():
+    if _State.active is not None:
+        raise APIError("A profiling session is already running")
+    _State.active = Profiler()
+    return _State.active
+
+
+def stop():
+    profiler = _State.active
+    _State.active = None
+    _State.last_report = profiler.report()
+    return _State.last_report
+
+
+def is_active():
+    return _State.active is not None
+
+
+def last_report():
+    """Returns the report of the last profiled build"""
+    return _State.last_report
+
+
+def dump(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -6,11 +6,14 @@ import os
 import re
 import subprocess
 import ctypes
+import mmap
 import time
 import numpy as np
 
 from hcl_mlir import runtime as rt
 from .report import parse_xml
+from .aot import make_memref_descriptor_type
+from .tensor import storage_dtype
 
 
 def run_process(cmd, pattern=None):
@@ -111,32 +114,172 @@ def execute_fpga_backend(target, shell=True):
         raise RuntimeError("Not implemented")
 
 
+class PackedLLVMCall:
+    """Invokes a function of an execution engine on contiguous arrays
+    of fixed shapes.
+
+    The function is looked up once, and the memref descriptors and the
+    packed argument list are created once and reused: only the data
+    pointers of the descriptors are updated on each call. The kernel
+    works on the memory of the given arrays.
+
+    The dimensions of the shapes that are not integers are dynamic: the
+    sizes and strides of these descriptors are set on each call too.
+    """
+
+    def __init__(self, execution_engine, name, shapes):
+        self.func = execution_engine.lookup(name)
+        self.descriptors = []
+        self.packed_args = (ctypes.c_void_p * len(shapes))()
+        # indices of the descriptors with dynamic dimensions
+        self.dynamic = []
+        # keep the pointers to the descriptors alive
+        self._pointers = []
+        for i, shape in enumerate(shapes):
+            descriptor = make_memref_descriptor_type(len(shape))()
+            if all(isinstance(dim, int) for dim in shape):
+                stride = 1
+                for dim in reversed(range(len(shape))):
+                    descriptor.sizes[dim] = shape[dim]
+                    descriptor.strides[dim] = stride
+                    stride *= shape[dim]
+            else:
+                self.dynamic.append(i)
+            pointer = ctypes.pointer(descriptor)
+            self.descriptors.append(descriptor)
+            self._pointers.append(pointer)
+            self.packed_args[i] = ctypes.addressof(pointer)
+
+    def __call__(self, arrays):
+        for descriptor, array in zip(self.descriptors, arrays):
+            address = array.ctypes.data
+            descriptor.allocated = address
+            descriptor.aligned = address
+        for i in self.dynamic:
+            array = arrays[i]
+            self._set_layout(
+                self.descriptors[i], array.shape, array.strides, array.itemsize
+            )
+        self.func(self.packed_args)
+
+    @staticmethod
+    def _set_layout(descriptor, shape, strides, itemsize):
+        for dim, (size, stride) in enumerate(zip(shape, strides)):
+            descriptor.sizes[dim] = size
+            descriptor.strides[dim] = stride // itemsize
+
+    def call_batch(self, arrays, batch_size):
+        """Calls the function on each item of arrays stacked along
+        a leading axis.
+        """
+        func = self.func
+        packed_args = self.packed_args
+        for i in self.dynamic:
+            array = arrays[i]
+            self._set_layout(
+                self.descriptors[i], array.shape[1:], array.strides[1:], array.itemsize
+            )
+        fields = [
+            (descriptor, array.ctypes.data, array.strides[0])
+            for descriptor, array in zip(self.descriptors, arrays)
+        ]
+        for i in range(batch_size):
+            for descriptor, base, stride in fields:
+                address = base + i * stride
+                descriptor.allocated = address
+                descriptor.aligned = address
+            func(packed_args)
+
+
+def as_kernel_buffer(array, dtype=None):
+    """Returns a buffer the kernel can work on, and whether it is a copy.
+
+    The kernel is compiled for the identity layout, so it can work on
+    the memory of C-contiguous and aligned arrays directly, provided
+    they hold the container type `dtype` of the elements.
+    """
+    if dtype is not None and array.dtype != dtype:
+        return np.ascontiguousarray(array.astype(dtype)), True
+    if array.flags.c_contiguous and array.flags.aligned:
+        return array, False
+    # copies made by numpy are contiguous and aligned
+    return np.ascontiguousarray(array), True
+
+
+def _mapped_file(array):
+    """Returns the memory-mapped array `array` is a view of, if it is
+    backed by a file that the pages can be reread from.
+    """
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return array if array.mode in {"r", "r+", "w+"} else None
+        array = array.base if isinstance(array, np.ndarray) else None
+    return None
+
+
+def release_pages(array, start, stop):
+    """Drops from memory the pages of the rows [start, stop) of the
+    memory-mapped array `array`, once they have been processed.
+
+    The pages of a file mapping are only evicted under memory pressure,
+    so reading a large file would otherwise grow the resident memory up
+    to the size of the file. The pages are reread from the file if they
+    are accessed again. Arrays that are not mapped from a file are left
+    untouched.
+    """
+    if not hasattr(mmap, "MADV_DONTNEED") or _mapped_file(array) is None:
+        return
+    if not array.flags.c_contiguous or start >= stop:
+        return
+    row_bytes = array.nbytes // array.shape[0] if array.shape[0] else 0
+    first = array.ctypes.data + start * row_bytes
+    last = array.ctypes.data + stop * row_bytes
+    # only release the pages that are entirely in the rows
+    first = -(-first // mmap.PAGESIZE) * mmap.PAGESIZE
+    last = last // mmap.PAGESIZE * mmap.PAGESIZE
+    if first >= last:
+        return
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.madvise(
+        ctypes.c_void_p(first), ctypes.c_size_t(last - first), mmap.MADV_DONTNEED
+    )
+
+
 def execute_llvm_backend(execution_engine, name, return_num, *argv):
     """
     - execution_engine: mlir.ExecutionEngine object, created in hcl.build
     - name: str, device top-level function name
-    - return_num: int, the number of return values
+    - return_num: int, the number of return values, 0 if all the
+      arguments are outputs
     - argv: list-like object, a list of input and output variables
+
+    The kernel writes its outputs directly into the arrays of the
+    arguments. Only arrays whose layout is incompatible are staged into
+    temporary buffers, which are copied back after the call. Returns the
+    number of bytes copied.
     """
     if not isinstance(argv, list):
         argv = list(argv)
     # Unwrap hcl Array to get numpy arrays
     argv_np = [arg.unwrap() for arg in argv]
-    # Extract output arrays
-    return_args = argv_np[-return_num:]
-    # Convert output variables from numpy arrays to memref pointers
-    return_pointers = []
-    for arg in return_args:
-        memref = rt.get_ranked_memref_descriptor(arg)
-        return_pointers.append(ctypes.pointer(ctypes.pointer(memref)))
-    # Convert input variables from numpy arrays to memref pointers
-    arg_pointers = []
-    for arg in argv_np[0:-return_num]:
-        memref = rt.get_ranked_memref_descriptor(arg)
-        arg_pointers.append(ctypes.pointer(ctypes.pointer(memref)))
-    # Invoke device top-level function
-    execution_engine.invoke(name, *return_pointers, *arg_pointers)
-    # Copy output arrays back
-    for i, return_p in enumerate(return_pointers):
-        out_array = rt.ranked_memref_to_numpy(return_p[0])
-        np.copyto(argv[-(len(return_args) - i)].np_array, out_array)
+    num_inputs = len(argv_np) - return_num if return_num > 0 else 0
+    bytes_copied = 0
+    buffers = []
+    staged = []
+    pointers = []
+    for arg, np_arg in zip(argv, argv_np):
+        buffer, is_copy = as_kernel_buffer(np_arg, storage_dtype(arg.dtype))
+        if is_copy:
+            bytes_copied += buffer.nbytes
+        buffers.append(buffer)
+        staged.append(is_copy)
+        memref = rt.get_ranked_memref_descriptor(buffer)
+        pointers.append(ctypes.pointer(ctypes.pointer(memref)))
+    # Invoke device top-level function, outputs first
+    execution_engine.invoke(name, *pointers[num_inputs:], *pointers[:num_inputs])
+    # Copy the staged outputs back
+    for i in range(num_inputs, len(argv_np)):
+        if staged[i]:
+            np.copyto(argv_np[i], buffers[i], casting="unsafe")
+            bytes_copied += buffers[i].nbytes
+    return bytes_copied
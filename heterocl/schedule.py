@@ -2,7 +2,9 @@
 # SPDX-License-Identifier: Apache-2.0
 # pylint: disable=unused-argument
 
+import copy
 import functools
+from collections import OrderedDict
 
 from hcl_mlir.exceptions import (
     HCLValueError,
@@ -12,11 +14,13 @@ from hcl_mlir.exceptions import (
     HCLDeprecationWarning,
 )
 
+from . import config
 from .devices import Device, DevMemoryPair
 from .dfg import DataflowGraph
 from .context import UniqueName
 from .utils import get_src_loc
 from .ast import ast
+from .ast.ast_visitor import op_body, walk
 
 
 def _build_ast(inputs, func=None, name=""):
@@ -68,6 +72,9 @@ def _build_schedule(_ast, inputs, func, name):
     create_dfg_pass.apply()
 
     s._dfg = create_dfg_pass.dfg
+    s._stage_mapping = list(Stage._mapping)
+    for _, stage in s._stage_mapping:
+        stage._schedule = s
     return s
 
 
@@ -77,9 +84,82 @@ def _reset_builder():
     UniqueName.reset()
 
 
+class _TraceCache:
+    """Traced ASTs of kernel functions, used by customize()
+    when config.trace_cache is set.
+
+    The key is the kernel function with its bytecode, the name, shape
+    and dtype of every input, the default dtype, the size of the
+    external constants and whether locations are tracked. The entry is an untouched copy of the AST
+    produced by tracing. A hit returns a clone of that AST that refers
+    to the caller's placeholders, so the kernel function must only
+    depend on its inputs and on values that were fixed when it was
+    defined.
+    """
+
+    capacity = 64
+    entries = OrderedDict()
+
+    @classmethod
+    def get_key(cls, inputs, func):
+        if func is None or getattr(func, "__code__", None) is None:
+            return None
+        signature = tuple(
+            (t.name, tuple(repr(dim) for dim in t.shape), repr(t.dtype)) for t in inputs
+        )
+        return (
+            func,
+            func.__code__.co_code,
+            signature,
+            repr(config.init_dtype),
+            config.external_constants,
+            config.track_locations,
+        )
+
+    @classmethod
+    def lookup(cls, key, inputs):
+        entry = cls.entries.get(key)
+        if entry is None:
+            return None
+        cls.entries.move_to_end(key)
+        cached_inputs, cached_ast = entry
+        memo = {id(cached): t for cached, t in zip(cached_inputs, inputs)}
+        # the symbolic dimensions of the inputs are not copied, but the
+        # caller's inputs may have been created with other ones
+        for cached, t in zip(cached_inputs, inputs):
+            for cached_dim, dim in zip(cached.shape, t.shape):
+                if isinstance(cached_dim, ast.SymbolicDim):
+                    memo[id(cached_dim)] = dim
+        return cached_ast.clone(memo)
+
+    @classmethod
+    def insert(cls, key, inputs, _ast):
+        # the AST of the returned schedule is mutated by the
+        # primitives applied to it, so cache a copy of it
+        memo = {}
+        cached_ast = _ast.clone(memo)
+        cached_inputs = [memo.get(id(t), t) for t in inputs]
+        cls.entries[key] = (cached_inputs, cached_ast)
+        if len(cls.entries) > cls.capacity:
+            cls.entries.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        cls.entries.clear()
+
+
 def customize(inputs, func=None, name=""):
     try:
-        _ast = _build_ast(inputs, func, name)
+        if not isinstance(inputs, list):
+            inputs = [inputs]
+        key = _TraceCache.get_key(inputs, func) if config.trace_cache else None
+        _ast = _TraceCache.lookup(key, inputs) if key is not None else None
+        if _ast is None:
+            _ast = _build_ast(inputs, func, name)
+            if key is not None:
+                _TraceCache.insert(key, inputs, _ast)
+        else:
+            _CreateStagesFromAST(_ast).apply()
         s = _build_schedule(_ast, inputs, func, name)
         return s
     except Exception as e:
@@ -128,6 +208,16 @@ class Schedule:
         # Dataflow Graph
         self._dfg = None
 
+        # (Tensor, Stage) and (Stage, Stage) tuples of this schedule,
+        # see Stage._mapping
+        self._stage_mapping = []
+        # id of an object of the schedule this one is cloned from
+        # -> the corresponding object of this schedule
+        self._clone_memo = {}
+        # (stage, loop) names -> vector width of the loops given to
+        # Stage.vectorize()
+        self._vector_widths = {}
+
         # Used by Stages to refer to the current schedule
         Schedule._CurrentSchedule = self
         Schedule._TopFunction = func
@@ -177,8 +267,52 @@ class Schedule:
     def __getitem__(self, target):
         """Return a Stage"""
         if isinstance(target, Stage):
-            return target
-        return Stage.lookup(target.name)
+            return self._resolve(target)
+        return self._lookup_stage(target.name)
+
+    def _lookup_stage(self, name):
+        for op, stage in self._stage_mapping:
+            if op.name == name:
+                return stage
+        return Stage.lookup(name)
+
+    def _resolve(self, obj):
+        """Map a tensor, stage or operation of the schedule this one
+        is cloned from to its counterpart in this schedule.
+        """
+        return self._clone_memo.get(id(obj), obj)
+
+    def clone(self, name=None):
+        """Create an independent copy of the schedule.
+
+        The copy has its own AST, stages and dataflow graph, so that
+        primitives applied to one of the schedules do not affect the
+        other. Both schedules share the placeholders of the top function.
+        Tensors, stages and handles of this schedule can be passed to
+        the primitives of the copy.
+        """
+        if self.is_lowered():
+            raise APIError(".clone() must be called before lowering")
+        # keep the current schedule unchanged
+        current = Schedule._CurrentSchedule
+        s = Schedule(
+            self.name if name is None else name,
+            self._ast.top_func.args,
+            self._ast.top_func.python_callable,
+        )
+        Schedule._CurrentSchedule = current
+        # the copied stages refer to the new schedule
+        memo = {id(arg): arg for arg in self._ast.top_func.args}
+        memo[id(self)] = s
+        _ast, dfg, stage_mapping = copy.deepcopy(
+            (self._ast, self._dfg, self._stage_mapping), memo
+        )
+        s._ast = _ast
+        s._dfg = dfg
+        s._stage_mapping = stage_mapping
+        s._clone_memo = memo
+        s._vector_widths = dict(self._vector_widths)
+        return s
 
     def partition(self, target, partition_type=Partition.Complete, dim=0, factor=0):
         """Partition a Tensor into smaller Tensors or even registers"""
@@ -201,6 +335,7 @@ class Schedule:
             partition_type = 2
         else:
             raise HCLValueError("Not supported partition type")
+        target = self._resolve(target)
         partition_op = ast.PartitionOp(target, partition_type, dim, factor, loc)
         self.ast.top_func.body.append(partition_op)
 
@@ -211,7 +346,7 @@ class Schedule:
 
         filename, lineno = get_src_loc()
         loc = ast.Location(filename, lineno)
-        replace_op = ast.ReplaceOp(src, dst, loc)
+        replace_op = ast.ReplaceOp(self._resolve(src), self._resolve(dst), loc)
         self.ast.top_func.body.append(replace_op)
 
     def reshape(self, target, shape):
@@ -226,7 +361,7 @@ class Schedule:
             )
         filename, lineno = get_src_loc()
         loc = ast.Location(filename, lineno)
-        reshape_op = ast.ReshapeOp(target, shape, loc)
+        reshape_op = ast.ReshapeOp(self._resolve(target), shape, loc)
         self.ast.top_func.body.append(reshape_op)
 
     def reform(self, target, layout):
@@ -235,7 +370,7 @@ class Schedule:
             raise APIError(".reform() must be called before lowering")
         filename, lineno = get_src_loc()
         loc = ast.Location(filename, lineno)
-        reform_op = ast.ReformOp(target, layout, loc)
+        reform_op = ast.ReformOp(self._resolve(target), layout, loc)
         self.ast.top_func.body.append(reform_op)
 
     def reuse_at(self, target, parent, axis, name=None):
@@ -248,7 +383,7 @@ class Schedule:
 
         filename, lineno = get_src_loc()
         loc = ast.Location(filename, lineno)
-        reuse_at_op = ast.ReuseAtOp(target, axis, loc)
+        reuse_at_op = ast.ReuseAtOp(self._resolve(target), axis, loc)
         self.ast.top_func.body.append(reuse_at_op)
         return reuse_at_op
 
@@ -259,7 +394,7 @@ class Schedule:
 
         filename, lineno = get_src_loc()
         loc = ast.Location(filename, lineno)
-        buffer_at_op = ast.BufferAtOp(target, axis, loc)
+        buffer_at_op = ast.BufferAtOp(self._resolve(target), axis, loc)
         self.ast.top_func.body.append(buffer_at_op)
         return buffer_at_op
 
@@ -276,14 +411,15 @@ class Schedule:
                 self._dfg.propagate_annotation(t, dst.types)
         # inter-stage data movement
         elif isinstance(dst, Stage):
+            dst = self._resolve(dst)
             filename, lineno = get_src_loc()
             loc = ast.Location(filename, lineno)
             inter_kernel_to_op = ast.InterKernelToOp(
-                tensor, dst.stage_handle, fifo_depth, loc
+                self._resolve(tensor), dst.stage_handle, fifo_depth, loc
             )
             self.ast.top_func.body.append(inter_kernel_to_op)
             # outline both stages
-            src = Stage.lookup(tensor.name)
+            src = self._lookup_stage(tensor.name)
             self.outline(src)
             self.outline(dst)
 
@@ -354,6 +490,13 @@ class Stage:
         self.axis = []
         # Associated AST Operation
         self._ast_op = None
+        # Schedule that the primitives of this stage apply to
+        self._schedule = None
+
+    def _get_schedule(self):
+        if self._schedule is None:
+            return Schedule._CurrentSchedule
+        return self._schedule
 
     @staticmethod
     def lookup(name):
@@ -364,7 +507,7 @@ class Stage:
 
     def reorder(self, *args):
         """reorder the arguments in the specified order."""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".reorder() must be called before lowering")
         args = list(args)
@@ -379,7 +522,7 @@ class Stage:
 
     def split(self, parent, factor=None, nparts=None, mode="transform"):
         """Split the stage either by factor providing outer scope, or both"""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".split() must be called before lowering")
         if nparts is not None or mode != "transform":
@@ -394,7 +537,7 @@ class Stage:
 
     def tile(self, x_parent, y_parent, x_factor, y_factor):
         """Perform tiling on two dimensions"""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".tile() must be called before lowering")
         filename, lineno = get_src_loc()
@@ -412,7 +555,7 @@ class Stage:
 
     def pipeline(self, var, initiation_interval=1):
         """Pipeline the iteration."""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".pipeline() must be called before lowering")
         if isinstance(var, int):
@@ -424,7 +567,7 @@ class Stage:
 
     def unroll(self, var, factor=0):
         """Unroll the iteration."""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".unroll() must be called before lowering")
         if isinstance(var, int):
@@ -436,7 +579,7 @@ class Stage:
 
     def parallel(self, var):
         """Parallelize the iteration."""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".parallel() must be called before lowering")
         if isinstance(var, int):
@@ -446,9 +589,25 @@ class Stage:
         parallel_op = ast.ParallelOp(var, loc)
         schedule.ast.top_func.body.append(parallel_op)
 
+    def vectorize(self, var, width):
+        """Vectorize the iteration with vectors of `width` elements.
+
+        The loop is split by `width`. When building for the llvm target,
+        the inner loop of the split is then vectorized if it is
+        unit-stride, the other loops are not.
+        """
+        schedule = self._get_schedule()
+        if schedule.is_lowered():
+            raise APIError(".vectorize() must be called before lowering")
+        if not isinstance(width, int) or width < 2:
+            raise HCLValueError(f"Invalid vector width: {width}")
+        outer, inner = self.split(var, factor=width)
+        schedule._vector_widths[(self.name, inner.name)] = width
+        return outer, inner
+
     def fuse(self, *args):
         """Fuse multiple consecutive iteration variables into a single iteration variable."""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".fuse() must be called before lowering")
         assert len(args) >= 1, "Length of the arguments must be >=1 for fuse."
@@ -465,7 +624,7 @@ class Stage:
 
     def compute_at(self, parent, axis):
         """Attach the stage at parent's scope"""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".compute_at() must be called before lowering")
         if isinstance(axis, int):
@@ -479,7 +638,7 @@ class Stage:
 
     def outline(self, axis=None, unify=None):
         """Outline a stage as a function"""
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         if schedule.is_lowered():
             raise APIError(".outline() must be called before lowering")
         filename, lineno = get_src_loc()
@@ -501,7 +660,7 @@ class Stage:
         filename, lineno = get_src_loc()
         loc = ast.Location(filename, lineno)
         systolic_op = ast.SystolicOp(self.tensor, loc)
-        schedule = Schedule._CurrentSchedule
+        schedule = self._get_schedule()
         schedule.ast.top_func.body.append(systolic_op)
 
     def __enter__(self):
@@ -530,12 +689,7 @@ class _CreateStagesFromAST:
         self.visit(top_func)
 
     def visit(self, op):
-        self.create_stage(op)
-        if hasattr(op, "body") and op.body is not None:
-            # pylint: disable=redefined-argument-from-local
-            for op in op.body:
-                # recursively visit the body
-                self.visit(op)
+        walk(op, op_body, lambda op, parent: self.create_stage(op))
 
     def create_stage(self, op):
         if isinstance(op, ast.ComputeOp):
@@ -567,6 +721,9 @@ class _CreateStagesFromAST:
         # create handles
         stage_hdl = ast.OpHandle(op.name, op.loc)
         stage.stage_handle = stage_hdl
+        # drop the handles of a previous run of this pass
+        # on the same AST, e.g., on a cloned AST
+        tensor.axis.clear()
         for iter_var in op.iter_vars + op.reduce_vars:
             loop_hdl = ast.LoopHandle(stage_hdl, iter_var.name, op.loc)
             tensor.axis.append(loop_hdl)
@@ -584,15 +741,14 @@ class _CreateStagesFromAST:
             setattr(top_func, op.tag, stage)
 
         # create handles
-        nested_for_loops = [op]
-
-        def get_nested_for_loops(op):
-            for body_op in op.body:
-                if isinstance(body_op, ast.ForOp):
-                    nested_for_loops.append(body_op)
-                    get_nested_for_loops(body_op)
-
-        get_nested_for_loops(op)
+        nested_for_loops = []
+        walk(
+            op,
+            lambda op: [
+                body_op for body_op in op.body if isinstance(body_op, ast.ForOp)
+            ],
+            lambda op, parent: nested_for_loops.append(op),
+        )
         stage_hdl = ast.OpHandle(op.tag, op.loc)
         stage.stage_handle = stage_hdl
         for loop in nested_for_loops:
@@ -612,11 +768,7 @@ class _CreateDFGFromAST:
         self.visit(top_func, self.create_edge)
 
     def visit(self, op, callback, *args, **kwargs):
-        callback(op, *args, **kwargs)
-        if hasattr(op, "body") and op.body is not None:
-            # pylint: disable=redefined-argument-from-local
-            for op in op.body:
-                self.visit(op, callback, *args, **kwargs)
+        walk(op, op_body, lambda op, parent: callback(op, *args, **kwargs))
 
     def create_edge(self, op):
         if isinstance(op, ast.ComputeOp):
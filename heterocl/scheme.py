@@ -51,6 +51,7 @@ class Scheme:
                 raise HCLValueError(
                     f"Unexpected op type: {type(tensor)}, input tensor is: {tensor}"
                 )
+        ast.invalidate_types()
 
     def quantize(self, inputs, dtype):
         """Quantize a (list of) tensor to the specified fixed-point type."""
@@ -70,3 +71,4 @@ class Scheme:
                 raise HCLValueError(
                     f"Unexpected op type: {type(tensor)}, input tensor is: {tensor.name}"
                 )
+        ast.invalidate_types()
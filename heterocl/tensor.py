@@ -1,11 +1,307 @@
 # Copyright HeteroCL authors. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+
 import numpy as np
-from hcl_mlir.exceptions import DTypeError
+from hcl_mlir.exceptions import APIError, DTypeError
 
 from .types import dtype_to_str, Int, UInt, Float, Fixed, UFixed
 
+# bitwidth of the words holding the values wider than 64 bits
+LIMB_BITS = 64
+
+
+def num_limbs(bits):
+    """The number of 64-bit words holding a value of `bits` bits"""
+    return -(-bits // LIMB_BITS)
+
+
+def limb_dtype(bits):
+    """The NumPy type of values wider than 64 bits.
+
+    The values are held in arrays of little-endian 64-bit words, the
+    least significant first, with the bits above the width sign-extended
+    for signed types. This is the layout of LLVM integers in memory, so
+    that these arrays are passed to the kernels as they are too.
+    """
+    return np.dtype([("limbs", "<u8", (num_limbs(bits),))])
+
+
+def storage_dtype(dtype):
+    """The NumPy type holding values of `dtype` in arrays.
+
+    Integers and fixed-point numbers are held in the smallest 8, 16, 32
+    or 64-bit container, in its low bits, the bits above the width being
+    zero. This is how LLVM stores integers of any width in memory, so
+    arrays are passed to the kernels as they are. Wider values are held
+    in words, see limb_dtype().
+    """
+    if isinstance(dtype, Float):
+        return np.dtype(dtype_to_str(dtype))
+    if not isinstance(dtype, (Int, UInt, Fixed, UFixed)):
+        raise DTypeError("Type error: unrecognized type: " + str(dtype))
+    if dtype.bits > 64:
+        return limb_dtype(dtype.bits)
+    bits = 8
+    while bits < min(dtype.bits, 64):
+        bits *= 2
+    signed = isinstance(dtype, (Int, Fixed))
+    return np.dtype(f"{'int' if signed else 'uint'}{bits}")
+
+
+def _to_storage(values, dtype):
+    """Converts the 64-bit two's complement of values to their container"""
+    container = storage_dtype(dtype)
+    if dtype.bits < container.itemsize * 8:
+        # LLVM loads assume the bits above the width are zero
+        values = values & np.uint64((1 << dtype.bits) - 1)
+    if container.itemsize == values.itemsize:
+        return values.view(container)
+    return values.astype(container)
+
+
+def _from_storage(np_array, dtype):
+    """The 64-bit two's complement of the values held in `np_array`,
+    sign-extended for signed types, see _to_storage()"""
+    signed = isinstance(dtype, (Int, Fixed))
+    if np_array.dtype == storage_dtype(dtype) and dtype.bits == np_array.itemsize * 8:
+        return np_array.astype(np.int64 if signed else np.uint64)
+    values = wrap_integers(np_array, dtype.bits, signed)
+    return values.view(np.int64) if signed else values
+
+
+def to_storage(np_array, dtype):
+    """Converts encoded values held in another container to the container
+    of `dtype`, e.g. for arrays whose memory was replaced"""
+    if isinstance(dtype, Float) or dtype.bits > 64:
+        return np_array.astype(storage_dtype(dtype))
+    signed = isinstance(dtype, (Int, Fixed))
+    return _to_storage(wrap_integers(np_array, dtype.bits, signed), dtype)
+
+
+def wrap_integers(values, bits, signed):
+    """Wrap integers around to `bits` bits.
+
+    Returns their two's complement in 64-bit containers, sign-extended
+    for signed types. Floating-point values are wrapped around before
+    being truncated towards zero.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        floor = np.floor(values)
+        # floor(x) modulo 2^64, exactly: fmod is exact, and so are the
+        # additions as the magnitudes are large
+        wrapped = np.fmod(floor, 2.0**64)
+        wrapped = np.where(wrapped >= 2.0**63, wrapped - 2.0**64, wrapped)
+        wrapped = np.where(wrapped < -(2.0**63), wrapped + 2.0**64, wrapped)
+        result = wrap_integers(wrapped.astype(np.int64), bits, signed)
+        if signed:
+            # the negative values are truncated towards zero
+            result += (result.view(np.int64) < 0) & (values != floor)
+        return result
+    if values.dtype == object:
+        # integers that do not fit in 64 bits
+        values = np.mod(values, 1 << 64)
+    # conversions between integer types wrap around modulo 2^64
+    values = values.astype(np.uint64)
+    if bits < 64:
+        values &= np.uint64((1 << bits) - 1)
+        if signed:
+            sign = np.uint64(1 << (bits - 1))
+            values = (values ^ sign) - sign
+    return values
+
+
+def encode_fixed(values, bits, fracs, signed):
+    """Fixed-point numbers scaled by 2^fracs, see wrap_integers()"""
+    values = np.asarray(values)
+    if values.dtype.kind in "biu" or values.dtype == object:
+        # exact modulo 2^64, which is a multiple of 2^bits
+        values = wrap_integers(values, 64, False)
+        values *= np.uint64((1 << fracs) & ((1 << 64) - 1))
+    else:
+        values = np.trunc(values * float(2**fracs))
+    return wrap_integers(values, bits, signed)
+
+
+def _negate_limbs(limbs):
+    """Two's complement of words along the last axis, in place"""
+    np.invert(limbs, out=limbs)
+    carry = np.ones(limbs.shape[:-1], dtype=bool)
+    for i in range(limbs.shape[-1]):
+        limbs[..., i] += carry
+        carry &= limbs[..., i] == 0
+
+
+def _shift_limbs(limbs, shift):
+    """Shift words along the last axis left by `shift` bits"""
+    words, shift = divmod(shift, LIMB_BITS)
+    result = np.zeros_like(limbs)
+    for i in range(words, limbs.shape[-1]):
+        result[..., i] = limbs[..., i - words] << np.uint64(shift)
+        if shift and i > words:
+            result[..., i] |= limbs[..., i - words - 1] >> np.uint64(LIMB_BITS - shift)
+    return result
+
+
+def wrap_limbs(limbs, bits, signed):
+    """Wrap words around to `bits` bits, in place, sign-extending the
+    most significant word for signed types.
+    """
+    top = bits - LIMB_BITS * (limbs.shape[-1] - 1)
+    if top < LIMB_BITS:
+        values = limbs[..., -1] & np.uint64((1 << top) - 1)
+        if signed:
+            sign = np.uint64(1 << (top - 1))
+            values = (values ^ sign) - sign
+        limbs[..., -1] = values
+    return limbs
+
+
+def encode_limbs(values, bits, fracs, signed):
+    """Integers or fixed-point numbers scaled by 2^fracs, wrapped around
+    to `bits` bits, as 64-bit words along a new last axis.
+
+    Integer inputs are scaled exactly. Floating-point inputs are
+    truncated towards zero after being scaled, and wrapped around.
+    """
+    values = np.asarray(values)
+    count = num_limbs(bits)
+    limbs = np.empty(values.shape + (count,), dtype=np.uint64)
+    if values.dtype == object:
+        # Python integers of any width
+        # int() truncates floating-point numbers towards zero
+        values = np.vectorize(int, otypes=[object])(values * (1 << fracs))
+        mask = (1 << LIMB_BITS) - 1
+        for i in range(count):
+            limbs[..., i] = (values >> (LIMB_BITS * i)) & mask
+    elif values.dtype.kind in "biu":
+        limbs[..., 0] = values.astype(np.uint64)
+        if values.dtype.kind == "i":
+            # sign-extend
+            limbs[..., 1:] = np.where(values < 0, ~np.uint64(0), np.uint64(0))[
+                ..., None
+            ]
+        else:
+            limbs[..., 1:] = 0
+        limbs = _shift_limbs(limbs, fracs)
+    else:
+        values = np.trunc(values * float(2**fracs))
+        magnitude = np.abs(values)
+        for i in range(count):
+            # exact, as float64 numbers have 53 significant bits
+            limb = np.fmod(magnitude, 2.0**LIMB_BITS)
+            limbs[..., i] = limb.astype(np.uint64)
+            magnitude = (magnitude - limb) / 2.0**LIMB_BITS
+        negative = limbs[values < 0]
+        _negate_limbs(negative)
+        limbs[values < 0] = negative
+    return wrap_limbs(limbs, bits, signed)
+
+
+def decode_limbs(limbs, bits, signed, fracs=None):
+    """The inverse of encode_limbs().
+
+    Integers are returned as Python integers in an object array, and
+    fixed-point numbers, when `fracs` is given, as float64 numbers.
+    """
+    limbs = wrap_limbs(limbs.copy(), bits, signed)
+    if fracs is not None:
+        # the magnitudes, to avoid cancellations between the words
+        negative = limbs[..., -1].view(np.int64) < 0 if signed else False
+        magnitudes = limbs[negative]
+        _negate_limbs(magnitudes)
+        limbs[negative] = magnitudes
+        values = np.zeros(limbs.shape[:-1])
+        for i in reversed(range(limbs.shape[-1])):
+            values = values * 2.0**LIMB_BITS + limbs[..., i]
+        values = np.where(negative, -values, values)
+        return values / 2.0**fracs
+    values = limbs[..., -1].astype(np.int64 if signed else np.uint64).astype(object)
+    for i in reversed(range(limbs.shape[-1] - 1)):
+        values = (values << LIMB_BITS) | limbs[..., i].astype(object)
+    return values
+
+
+def _from_limbs(limbs, dtype):
+    """Views words along the last axis as an array of `dtype`"""
+    return np.ascontiguousarray(limbs).view(storage_dtype(dtype))[..., 0]
+
+
+class _DLPackCapsule:
+    """Exposes a bare DLPack capsule to np.from_dlpack(), which checks
+    the device of the tensor itself.
+    """
+
+    def __init__(self, capsule):
+        self.capsule = capsule
+
+    def __dlpack__(self, **_kwargs):
+        return self.capsule
+
+    def __dlpack_device__(self):
+        # kDLCPU
+        return (1, 0)
+
+
+def as_ndarray(values):
+    """A NumPy view of `values`, without copying their memory.
+
+    Lists and scalars are converted to new arrays. Memory-mapped arrays
+    and objects supporting the buffer protocol are viewed as they are,
+    as well as DLPack tensors and capsules on the CPU.
+    """
+    if isinstance(values, np.ndarray):
+        # memory-mapped arrays are viewed as plain arrays
+        return np.asarray(values)
+    if hasattr(values, "__dlpack__") or type(values).__name__ == "PyCapsule":
+        if not hasattr(values, "__dlpack__"):
+            values = _DLPackCapsule(values)
+        # kDLCPU or kDLCUDAHost, which is pinned host memory
+        if values.__dlpack_device__()[0] not in {1, 3}:
+            raise APIError(
+                f"Unsupported DLPack device {values.__dlpack_device__()}, "
+                "only CPU tensors are supported"
+            )
+        try:
+            return np.from_dlpack(values)
+        except (BufferError, RuntimeError, TypeError) as error:
+            raise APIError(
+                f"Unsupported DLPack tensor, only CPU tensors are supported: {error}"
+            ) from error
+    if isinstance(values, (list, tuple, int, float)):
+        return np.array(values)
+    try:
+        return np.asarray(memoryview(values))
+    except TypeError:
+        return np.array(values)
+
+
+def _is_representable(np_array, dtype):
+    """Whether `np_array` holds the values of `dtype` as they are, so
+    that arrays of `dtype` can share its memory.
+    """
+    if np_array.dtype != storage_dtype(dtype):
+        return False
+    if isinstance(dtype, Float):
+        return True
+    if isinstance(dtype, (Fixed, UFixed)) and dtype.fracs != 0:
+        # the values are to be scaled
+        return False
+    if dtype.bits > 64:
+        # the bits above the width of the most significant words are
+        # sign-extended
+        return dtype.bits % LIMB_BITS == 0
+    if dtype.bits == np_array.itemsize * 8 or np_array.size == 0:
+        return True
+    # the negative values of signed types are held without their sign
+    # extension, see _to_storage()
+    if isinstance(dtype, (Int, Fixed)):
+        high = (1 << (dtype.bits - 1)) - 1
+    else:
+        high = (1 << dtype.bits) - 1
+    return np_array.min() >= 0 and np_array.max() <= high
+
 
 class Array:
     """A wrapper class for numpy array
@@ -13,51 +309,47 @@ class Array:
     tensor is only a placeholder while array holds actual values
     """
 
-    def __init__(self, np_array, dtype):
+    def __init__(self, np_array, dtype, copy=None):
+        """Wraps `np_array`, or any object as_ndarray() accepts.
+
+        The array shares the memory of `np_array` when it already holds
+        the values of `dtype` in their container, unless `copy` is True.
+        When `copy` is False, an APIError is raised instead of copying.
+        """
         self.dtype = dtype  # should specify the type of `dtype`
-        if isinstance(np_array, list):
-            np_array = np.array(np_array)
+        np_array = as_ndarray(np_array)
         if dtype is not None:
             # Data type check
-            if isinstance(dtype, Float):
+            if isinstance(dtype, (Int, UInt, Float, Fixed, UFixed)) and (
+                _is_representable(np_array, dtype)
+            ):
+                if copy:
+                    np_array = np_array.copy()
+            elif copy is False:
+                raise APIError(
+                    f"Cannot create an array of {dtype} from {np_array.dtype} values without a copy"
+                )
+            elif isinstance(dtype, Float):
                 hcl_dtype_str = dtype_to_str(dtype)
                 correct_dtype = np.dtype(hcl_dtype_str)
                 if np_array.dtype != correct_dtype:
                     np_array = np_array.astype(correct_dtype)
-            elif isinstance(dtype, Int):
+            elif isinstance(dtype, (Int, UInt, Fixed, UFixed)) and dtype.bits > 64:
+                # Handle overflow, into 64-bit words
+                np_array = encode_limbs(
+                    np_array, dtype.bits, dtype.fracs, isinstance(dtype, (Int, Fixed))
+                )
+                np_array = _from_limbs(np_array, dtype)
+            elif isinstance(dtype, (Int, UInt)):
                 # Handle overflow
-                sb = 1 << self.dtype.bits
-                sb_limit = 1 << (self.dtype.bits - 1)
-                np_array = np_array % sb
-
-                def cast_func(x):
-                    return x if x < sb_limit else x - sb
-
-                vec_np_array = np.vectorize(cast_func)(np_array)
-                np_array = vec_np_array.astype(np.uint64)
-            elif isinstance(dtype, UInt):
+                np_array = wrap_integers(np_array, dtype.bits, isinstance(dtype, Int))
+                np_array = _to_storage(np_array, dtype)
+            elif isinstance(dtype, (Fixed, UFixed)):
                 # Handle overflow
-                sb = 1 << self.dtype.bits
-                np_array = np_array % sb
-                np_array = np_array.astype(np.uint64)
-            elif isinstance(dtype, Fixed):
-                # Handle overflow
-                sb = 1 << self.dtype.bits
-                sb_limit = 1 << (self.dtype.bits - 1)
-                np_array = np_array * (2**dtype.fracs)
-                np_array = np.fix(np_array) % sb
-
-                def cast_func(x):
-                    return x if x < sb_limit else x - sb
-
-                vec_np_array = np.vectorize(cast_func)(np_array)
-                np_array = vec_np_array.astype(np.uint64)
-            elif isinstance(dtype, UFixed):
-                # Handle overflow
-                sb = 1 << self.dtype.bits
-                np_array = np_array * (2**dtype.fracs)
-                np_array = np.fix(np_array) % sb
-                np_array = np_array.astype(np.uint64)
+                np_array = encode_fixed(
+                    np_array, dtype.bits, dtype.fracs, isinstance(dtype, Fixed)
+                )
+                np_array = _to_storage(np_array, dtype)
             else:
                 raise DTypeError("Type error: unrecognized type: " + str(self.dtype))
         else:
@@ -65,20 +357,69 @@ class Array:
         self.np_array = np_array
 
     def asnumpy(self):
-        if isinstance(self.dtype, (Fixed, UFixed)):
-            if isinstance(self.dtype, Fixed):
-                res_array = self.np_array.astype(np.int64)
-            else:
-                res_array = self.np_array
-            res_array = res_array.astype(np.float64) / float(2 ** (self.dtype.fracs))
-            return res_array
-        if isinstance(self.dtype, Int):
-            res_array = self.np_array.astype(np.int64)
-            return res_array
+        if self.dtype.bits > 64 and not isinstance(self.dtype, Float):
+            return decode_limbs(
+                self.np_array["limbs"],
+                self.dtype.bits,
+                isinstance(self.dtype, (Int, Fixed)),
+                self.dtype.fracs if isinstance(self.dtype, (Fixed, UFixed)) else None,
+            )
         if isinstance(self.dtype, Float):
             res_array = self.np_array.astype(float)
             return res_array
-        return self.np_array
+        if isinstance(self.dtype, UInt) and self.np_array.dtype == np.uint64:
+            return self.np_array
+        # the bits above the width are zero in the containers
+        res_array = _from_storage(self.np_array, self.dtype)
+        if isinstance(self.dtype, (Fixed, UFixed)):
+            # the division converts to float64
+            return np.divide(res_array, float(2 ** (self.dtype.fracs)))
+        return res_array
+
+    def pack(self):
+        """Pack the values into a uint8 array, `bits` bits per value.
+
+        The values are concatenated in row-major order, each from its
+        least significant bit, and the last byte is padded with zeros.
+        This is the most compact representation of sub-byte types such
+        as UInt(4), to store or transfer arrays. Kernels are called with
+        unpacked arrays, see from_packed().
+        """
+        if not isinstance(self.dtype, (Int, UInt, Fixed, UFixed)):
+            raise DTypeError(f"Cannot pack an array of {self.dtype}")
+        if self.dtype.bits > 64:
+            words = self.np_array["limbs"].reshape(-1, num_limbs(self.dtype.bits))
+        else:
+            words = self.np_array.reshape(-1, 1)
+        words = np.ascontiguousarray(words, dtype="<u8")
+        bits = np.unpackbits(words.view(np.uint8), axis=1, bitorder="little")
+        return np.packbits(bits[:, : self.dtype.bits], bitorder="little")
+
+    @classmethod
+    def from_packed(cls, data, shape, dtype):
+        """Unpack an array packed with pack()"""
+        if not isinstance(dtype, (Int, UInt, Fixed, UFixed)):
+            raise DTypeError(f"Cannot unpack an array of {dtype}")
+        size = int(np.prod(shape))
+        count = num_limbs(dtype.bits)
+        bits = np.unpackbits(
+            np.asarray(data, dtype=np.uint8),
+            count=size * dtype.bits,
+            bitorder="little",
+        ).reshape(size, dtype.bits)
+        padded = np.zeros((size, LIMB_BITS * count), dtype=np.uint8)
+        padded[:, : dtype.bits] = bits
+        words = np.packbits(padded, axis=1, bitorder="little").view("<u8")
+        words = words.reshape(tuple(shape) + (count,))
+        signed = isinstance(dtype, (Int, Fixed))
+        array = cls.__new__(cls)
+        array.dtype = dtype
+        if dtype.bits > 64:
+            array.np_array = _from_limbs(wrap_limbs(words, dtype.bits, signed), dtype)
+        else:
+            values = wrap_integers(words[..., 0], dtype.bits, signed)
+            array.np_array = _to_storage(values, dtype)
+        return array
 
     def unwrap(self):
         return self.np_array
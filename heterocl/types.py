@@ -3,6 +3,7 @@
 """Define HeteroCL data types"""
 # pylint: disable=no-name-in-module
 
+import itertools
 import numbers
 import types as python_types
 from collections import OrderedDict
@@ -45,6 +46,10 @@ class Type:
             return False
         return other.bits == self.bits and other.fracs == self.fracs
 
+    def __deepcopy__(self, memo):
+        # data types are never mutated, so copies of an AST share them
+        return self
+
 
 class Int(Type):
     """Arbitrary-bit signed integers"""
@@ -324,6 +329,13 @@ class TypeRule:
                     )
                 # add the rule to the dictionary
                 self.inf_rules[itype] = inf_rule
+        # the rule of every order of the input types of commutative rules,
+        # so that the rule of a call is found by a single lookup
+        self._dispatch = dict(self.inf_rules)
+        if commutative:
+            for itype, inf_rule in self.inf_rules.items():
+                for perm in itertools.permutations(itype):
+                    self._dispatch.setdefault(perm, inf_rule)
 
     def __call__(self, *args):
         """Call the inference rule with the given input types.
@@ -340,16 +352,14 @@ class TypeRule:
         Type
             The inferred output type
         """
-        if self.commutative:
-            itype_classes = sort_type_classes([type(t) for t in args])
-        else:
-            itype_classes = [type(t) for t in args]
-        itype_classes = tuple(itype_classes)
-        if itype_classes not in self.inf_rules:
+        itype_classes = tuple(type(t) for t in args)
+        rule = self._dispatch.get(itype_classes)
+        if rule is None:
+            if self.commutative:
+                itype_classes = tuple(sort_type_classes(list(itype_classes)))
             raise APIError(
                 f"Typing rule is not defined with input types {itype_classes}"
             )
-        rule = self.inf_rules[itype_classes]
         res_type = rule(*args)
         return res_type
 
@@ -13,8 +13,10 @@ from hcl_mlir.dialects import hcl as hcl_d
 from hcl_mlir.ir import IntegerType, F16Type, F32Type, F64Type
 from hcl_mlir.exceptions import DTypeError
 
+from . import config
 from .config import init_dtype
 from .types import Fixed, Float, Int, Type, UFixed, UInt, Struct, Index, dtype_to_str
+from .tensor import Array, encode_fixed
 
 
 def get_func_obj(func_name):
@@ -126,6 +128,9 @@ def remove_moved_attr(module):
 
 
 def get_src_loc(frame=0):
+    if not config.track_locations:
+        # an unknown location, without inspecting the stack
+        return ("unknown", 0)
     fr = sys._getframe(frame + 1)  # +1 to ignore this function call
     return (os.path.basename(fr.f_code.co_filename), fr.f_lineno)
 
@@ -143,14 +148,9 @@ def make_const_tensor(val, dtype):
             np_dtype = np.int32
         elif dtype.bits <= 64:
             np_dtype = np.int64
-        elif dtype.bits <= 128:
-            np_dtype = np.int128
-        elif dtype.bits <= 256:
-            np_dtype = np.int256
         else:
-            raise DTypeError(
-                f"Integer width ({dtype}) too large, not supported by numpy"
-            )
+            # wider integers are held in 64-bit words
+            return Array(val, dtype).np_array
     elif isinstance(dtype, Float):
         if dtype.bits == 16:
             np_dtype = np.float16
@@ -160,21 +160,9 @@ def make_const_tensor(val, dtype):
             np_dtype = np.float64
         else:
             raise DTypeError("Unrecognized data type")
-    elif isinstance(dtype, Fixed):
-        sb = 1 << dtype.bits
-        sb_limit = 1 << (dtype.bits - 1)
-        val = val * (2**dtype.fracs)
-        val = np.fix(val) % sb
-
-        def cast_func(x):
-            return x if x < sb_limit else x - sb
-
-        val = np.vectorize(cast_func)(val)
-        np_dtype = np.int64
-    elif isinstance(dtype, UFixed):
-        sb = 1 << dtype.bits
-        val = val * (2**dtype.fracs)
-        val = np.fix(val) % sb
+    elif isinstance(dtype, (Fixed, UFixed)):
+        val = encode_fixed(val, dtype.bits, dtype.fracs, isinstance(dtype, Fixed))
+        val = val.view(np.int64)
         np_dtype = np.int64
     else:
         raise DTypeError(f"Unrecognized data type: {dtype}")
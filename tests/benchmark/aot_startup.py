@@ -0,0 +1,72 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Startup time of a JIT-compiled kernel vs. an exported one.
+
+Usage: python tests/benchmark/aot_startup.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import heterocl as hcl
+
+from common import print_table
+
+
+def gemm(N=256):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((N, N), "A")
+    B = hcl.placeholder((N, N), "B")
+
+    def kernel(A, B):
+        r = hcl.reduce_axis(0, N, "r")
+        return hcl.compute((N, N), lambda x, y: hcl.sum(A[x, r] * B[r, y], axis=r), "C")
+
+    return hcl.create_schedule([A, B], kernel)
+
+
+def _time_process(script):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", script], check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        f = hcl.build(gemm())
+        build_time = time.perf_counter() - start
+        path = os.path.join(tmp_dir, "gemm.so")
+        f.export_library(path)
+
+        aot_path = os.path.join(os.path.dirname(hcl.__file__), "aot.py")
+        jit_process = _time_process(
+            f"import sys; sys.path.insert(0, {os.path.dirname(__file__)!r})\n"
+            "import aot_startup, heterocl as hcl\n"
+            "hcl.build(aot_startup.gemm())\n"
+        )
+        aot_process = _time_process(
+            "import importlib.util\n"
+            f"spec = importlib.util.spec_from_file_location('aot', {aot_path!r})\n"
+            "aot = importlib.util.module_from_spec(spec)\n"
+            "spec.loader.exec_module(aot)\n"
+            f"aot.load_module({path!r})\n"
+        )
+        start = time.perf_counter()
+        hcl.load_module(path)
+        load_time = time.perf_counter() - start
+
+    print_table(
+        ["", "in process (ms)", "new process (ms)"],
+        [
+            ["hcl.build", f"{build_time * 1e3:.1f}", f"{jit_process * 1e3:.1f}"],
+            ["load_module", f"{load_time * 1e3:.1f}", f"{aot_process * 1e3:.1f}"],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
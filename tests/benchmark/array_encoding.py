@@ -0,0 +1,53 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Time to convert numpy arrays to HeteroCL arrays, with the NumPy
+encoding of tensor.Array versus the former per-element conversion.
+
+Usage: python tests/benchmark/array_encoding.py [size]
+"""
+
+import sys
+
+import heterocl as hcl
+import numpy as np
+
+from common import measure, print_table
+
+
+def legacy_encode(np_array, dtype):
+    """The conversion of tensor.Array before it was vectorized"""
+    sb = 1 << dtype.bits
+    sb_limit = 1 << (dtype.bits - 1)
+    if isinstance(dtype, (hcl.Fixed, hcl.UFixed)):
+        np_array = np.fix(np_array * (2**dtype.fracs))
+    np_array = np_array % sb
+    if isinstance(dtype, (hcl.Int, hcl.Fixed)):
+
+        def cast_func(x):
+            return x if x < sb_limit else x - sb
+
+        np_array = np.vectorize(cast_func)(np_array)
+    return np_array.astype(np.uint64)
+
+
+def main(size=1024):
+    values = np.random.uniform(-1000, 1000, size=(size, size))
+    rows = []
+    for dtype in [hcl.Int(32), hcl.UInt(16), hcl.Fixed(32, 12), hcl.UFixed(24, 8)]:
+        expected = legacy_encode(values, dtype)
+        assert np.array_equal(hcl.asarray(values, dtype).np_array, expected)
+        legacy_time = measure(lambda: legacy_encode(values, dtype), repeat=1)
+        new_time = measure(lambda: hcl.asarray(values, dtype), repeat=3)
+        rows.append(
+            [
+                str(dtype),
+                f"{legacy_time:.3f}",
+                f"{new_time:.3f}",
+                f"{legacy_time / new_time:.0f}x",
+            ]
+        )
+    print_table(["dtype", "per-element (s)", "numpy (s)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1024)
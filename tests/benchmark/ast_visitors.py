@@ -0,0 +1,86 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Time of the AST passes on programs of about 100k nodes: a wide one
+with many short statements, and a deep one with a single long chain of
+operations, which recursive visitors cannot walk.
+
+Usage: python tests/benchmark/ast_visitors.py [NODES]
+"""
+
+import sys
+
+import heterocl as hcl
+from heterocl.ast.build_cleaner import ASTCleaner
+from heterocl.passes.nest_if import NestElseIf
+from heterocl.passes.promote_func import PromoteFunc
+
+from common import measure, print_table
+
+
+def wide(nodes):
+    A = hcl.placeholder((64,), "A")
+
+    def kernel(A):
+        # about 16 nodes per statement
+        for k in range(nodes // 16):
+            with hcl.if_(A[k % 64] > k):
+                A[k % 64] = A[(k + 1) % 64] * 3 + k
+            with hcl.elif_(A[k % 64] < 0):
+                A[k % 64] = 0
+
+    return hcl.create_schedule([A], kernel)
+
+
+def deep(nodes):
+    A = hcl.placeholder((64,), "A")
+
+    def kernel(A):
+        def chain(i):
+            # two nodes per link of the chain
+            value = A[i]
+            for k in range(nodes // 2):
+                value = value + k
+            return value
+
+        return hcl.compute(A.shape, chain, "B")
+
+    return hcl.create_schedule([A], kernel)
+
+
+def run(func):
+    try:
+        return f"{measure(func, repeat=3) * 1e3:.0f}"
+    except RecursionError:
+        return "RecursionError"
+
+
+def main(nodes=100000):
+    # floats, whose sums do not widen along the chain
+    hcl.init(hcl.Float(32))
+    rows = []
+    for program in [wide, deep]:
+        s = program(nodes)
+        rows.append(
+            [
+                program.__name__,
+                # in the order of the build, which cleans nested if-else
+                run(lambda: NestElseIf().apply(s.ast)),
+                run(lambda: PromoteFunc().apply(s.ast)),
+                run(lambda: ASTCleaner().visit(s.ast)),
+                run(lambda: hcl.schedule._CreateStagesFromAST(s.ast).apply()),
+            ]
+        )
+    print_table(
+        [
+            "program",
+            "nest_else_if (ms)",
+            "promote_func (ms)",
+            "cleaner (ms)",
+            "stages (ms)",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
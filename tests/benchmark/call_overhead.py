@@ -0,0 +1,51 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Per-call overhead of HCLModule.__call__ on a tiny llvm kernel.
+
+Usage: python tests/benchmark/call_overhead.py [num_calls]
+"""
+
+import sys
+import time
+
+import heterocl as hcl
+import numpy as np
+
+from common import print_table
+
+
+def build():
+    hcl.init()
+    A = hcl.placeholder((4,), "A")
+    B = hcl.placeholder((4,), "B")
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda i: A[i] + B[i], "C")
+
+    return hcl.build(hcl.create_schedule([A, B], kernel))
+
+
+def _per_call(func, num_calls):
+    func()
+    start = time.perf_counter()
+    for _ in range(num_calls):
+        func()
+    return (time.perf_counter() - start) / num_calls
+
+
+def main(num_calls=100000):
+    f = build()
+    args = [hcl.asarray(np.arange(4)) for _ in range(3)]
+    fast = _per_call(lambda: f(*args), num_calls)
+    # arguments that do not match the call plan take the generic path
+    plan, f._call_plan = f._call_plan, None
+    generic = _per_call(lambda: f(*args), num_calls // 10)
+    f._call_plan = plan
+    print_table(
+        ["path", "us/call"],
+        [["generic", f"{generic * 1e6:.2f}"], ["fast", f"{fast * 1e6:.2f}"]],
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
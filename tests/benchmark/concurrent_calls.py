@@ -0,0 +1,69 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Calls/sec of one compiled module called from a thread pool.
+
+The kernel runs without holding the GIL, so the throughput scales with
+the number of threads until the cores are saturated.
+
+Usage: python tests/benchmark/concurrent_calls.py [num_calls]
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import heterocl as hcl
+import numpy as np
+
+from common import measure, print_table
+
+
+def build(size=128):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((size, size), "A")
+    B = hcl.placeholder((size, size), "B")
+
+    def kernel(A, B):
+        r = hcl.reduce_axis(0, size, "r")
+        return hcl.compute(
+            (size, size), lambda x, y: hcl.sum(A[x, r] * B[r, y], axis=r), "C"
+        )
+
+    s = hcl.create_schedule([A, B], kernel)
+    return hcl.build(s, num_threads=1)
+
+
+def main(num_calls=256, size=128):
+    f = build(size)
+    np_A = np.random.rand(size, size).astype(np.float32)
+    np_B = np.random.rand(size, size).astype(np.float32)
+    args = [
+        [
+            hcl.asarray(np_A),
+            hcl.asarray(np_B),
+            hcl.asarray(np.zeros((size, size), dtype=np.float32)),
+        ]
+        for _ in range(num_calls)
+    ]
+    rows = []
+    base = None
+    for num_threads in [1, 2, 4, 8]:
+        with ThreadPoolExecutor(num_threads) as executor:
+
+            def run(executor=executor):
+                futures = [
+                    f.submit(*call_args, executor=executor) for call_args in args
+                ]
+                for future in futures:
+                    future.result()
+
+            elapsed = measure(run, repeat=3)
+        throughput = num_calls / elapsed
+        base = base or throughput
+        rows.append([num_threads, f"{throughput:.0f}", f"{throughput / base:.2f}x"])
+    for call_args in args:
+        assert np.allclose(call_args[2].asnumpy(), np_A @ np_B, rtol=1e-3)
+    print_table(["threads", "calls/s", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 256)
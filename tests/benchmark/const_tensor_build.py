@@ -0,0 +1,60 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Build time of a kernel with a large constant tensor, embedded in the
+module or stored in a file.
+
+Usage: python tests/benchmark/const_tensor_build.py
+"""
+
+import time
+
+import heterocl as hcl
+import numpy as np
+
+from common import print_table
+
+
+def build(np_W, external_constants):
+    hcl.init(hcl.Float(32), external_constants=external_constants)
+    A = hcl.placeholder((np_W.shape[1],), "A")
+
+    def kernel(A):
+        W = hcl.const_tensor(np_W, "W")
+        r = hcl.reduce_axis(0, np_W.shape[1], "r")
+        return hcl.compute(
+            (np_W.shape[0],), lambda i: hcl.sum(W[i, r] * A[r], axis=r), "B"
+        )
+
+    start = time.perf_counter()
+    s = hcl.create_schedule([A], kernel)
+    f = hcl.build(s)
+    return f, time.perf_counter() - start
+
+
+def main():
+    rows = []
+    for megabytes in [1, 4, 16]:
+        np_W = np.random.rand(megabytes * 256, 1024).astype(np.float32)
+        np_A = np.random.rand(1024).astype(np.float32)
+        outputs = []
+        times = []
+        for external_constants in [None, 1 << 16]:
+            f, build_time = build(np_W, external_constants)
+            np_B = np.zeros(np_W.shape[0], dtype=np.float32)
+            f(np_A, np_B)
+            outputs.append(np_B)
+            times.append(build_time)
+        np.testing.assert_allclose(outputs[0], outputs[1], rtol=1e-5)
+        rows.append(
+            [
+                megabytes,
+                f"{times[0]:.2f}",
+                f"{times[1]:.2f}",
+                f"{times[0] / times[1]:.1f}x",
+            ]
+        )
+    print_table(["weights (MB)", "embedded (s)", "external (s)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
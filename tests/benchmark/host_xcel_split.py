@@ -0,0 +1,59 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Time of separating the host and device functions of a design with
+many tensors crossing the host/device boundary.
+
+Usage: python tests/benchmark/host_xcel_split.py
+"""
+
+import os
+import time
+
+import heterocl as hcl
+from heterocl.build_module import separate_host_xcel
+from heterocl.platforms import import_json_platform
+
+from common import print_table
+
+SPEC = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "..",
+    "test_platform_spec",
+    "xilinx_u280.json",
+)
+
+
+def split(target, tensors):
+    hcl.init()
+    A = hcl.placeholder((16, 16), "A")
+
+    def kernel(A):
+        # the B stages run on the device, the C stages on the host
+        Bs = [
+            hcl.compute(A.shape, lambda i, j: A[i, j] + k, f"B{k}")
+            for k in range(tensors)
+        ]
+        Cs = [
+            hcl.compute(A.shape, lambda i, j: B[i, j] * 2 + A[i, j], f"C{k}")
+            for k, B in enumerate(Bs)
+        ]
+        return Cs[-1]
+
+    s = hcl.create_schedule([A], kernel)
+    s.to(A, target.xcel)
+    s.to([getattr(kernel, f"B{k}") for k in range(tensors)], target.host)
+    start = time.perf_counter()
+    separate_host_xcel(s, s.ast)
+    return time.perf_counter() - start
+
+
+def main():
+    target = import_json_platform(SPEC)
+    rows = []
+    for tensors in [50, 100, 200, 400]:
+        rows.append([tensors, f"{split(target, tensors) * 1e3:.1f}"])
+    print_table(["boundary tensors", "separate (ms)"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Bytes copied and time per call for compatible and incompatible
+output buffers on the llvm target.
+
+Usage: python tests/benchmark/output_copies.py [size]
+"""
+
+import sys
+
+import heterocl as hcl
+import numpy as np
+
+from common import measure, print_table
+
+
+def build(size):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((size, size), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] * 2, "B")
+
+    return hcl.build(hcl.create_schedule([A], kernel))
+
+
+def main(size=2048):
+    f = build(size)
+    hcl_A = hcl.asarray(np.random.rand(size, size), hcl.Float(32))
+    contiguous = hcl.asarray(np.zeros((size, size)), hcl.Float(32))
+    strided = hcl.asarray(np.zeros((size, 2 * size)), hcl.Float(32))
+    strided.np_array = strided.np_array[:, ::2]
+
+    rows = []
+    for name, out, generic in [
+        ("contiguous (fast path)", contiguous, False),
+        ("contiguous (generic path)", contiguous, True),
+        ("strided", strided, True),
+    ]:
+        plan = f._call_plan
+        if generic:
+            f._call_plan = None
+        elapsed = measure(lambda: f(hcl_A, out))
+        f._call_plan = plan
+        rows.append([name, f.bytes_copied, f"{elapsed * 1e3:.2f}"])
+    print_table(["output buffer", "bytes copied/call", "time (ms)"], rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2048)
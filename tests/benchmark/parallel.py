@@ -0,0 +1,115 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Scaling of .parallel() loops with the number of threads on the llvm target.
+
+Usage: python tests/benchmark/parallel.py [max_threads]
+"""
+
+import os
+import sys
+
+import heterocl as hcl
+import numpy as np
+
+from common import measure, print_table
+
+
+def gemm(N=512):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((N, N), "A")
+    B = hcl.placeholder((N, N), "B")
+
+    def kernel(A, B):
+        r = hcl.reduce_axis(0, N, "r")
+        return hcl.compute((N, N), lambda x, y: hcl.sum(A[x, r] * B[r, y], axis=r), "C")
+
+    s = hcl.create_schedule([A, B], kernel)
+    s[kernel.C].parallel(kernel.C.axis[0])
+    shapes = [(N, N), (N, N), (N, N)]
+    return s, shapes
+
+
+def two_mm(N=384):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((N, N), "A")
+    B = hcl.placeholder((N, N), "B")
+    C = hcl.placeholder((N, N), "C")
+
+    def kernel(A, B, C):
+        r = hcl.reduce_axis(0, N, "r")
+        AB = hcl.compute((N, N), lambda x, y: hcl.sum(A[x, r] * B[r, y], axis=r), "AB")
+        k = hcl.reduce_axis(0, N, "k")
+        return hcl.compute(
+            (N, N), lambda x, y: hcl.sum(AB[x, k] * C[k, y], axis=k), "ABC"
+        )
+
+    s = hcl.create_schedule([A, B, C], kernel)
+    s[kernel.AB].parallel(kernel.AB.axis[0])
+    s[kernel.ABC].parallel(kernel.ABC.axis[0])
+    shapes = [(N, N), (N, N), (N, N), (N, N)]
+    return s, shapes
+
+
+def jacobi_2d(N=1024, TSTEPS=20):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((N, N), "A")
+    B = hcl.placeholder((N, N), "B")
+
+    def kernel(A, B):
+        def update(A, B):
+            with hcl.for_(1, N - 1, name="L1") as i:
+                with hcl.for_(1, N - 1, name="L2") as j:
+                    B[i][j] = 0.2 * (
+                        A[i][j] + A[i][j - 1] + A[i][j + 1] + A[i + 1][j] + A[i - 1][j]
+                    )
+            with hcl.for_(1, N - 1, name="L3") as i:
+                with hcl.for_(1, N - 1, name="L4") as j:
+                    A[i][j] = 0.2 * (
+                        B[i][j] + B[i][j - 1] + B[i][j + 1] + B[i + 1][j] + B[i - 1][j]
+                    )
+
+        hcl.mutate((TSTEPS,), lambda m: update(A, B), "main_loop")
+
+    s = hcl.create_schedule([A, B], kernel)
+    main_loop = kernel.main_loop
+    s[main_loop].parallel(main_loop.L1)
+    s[main_loop].parallel(main_loop.L3)
+    shapes = [(N, N), (N, N)]
+    return s, shapes
+
+
+def main(max_threads=None):
+    if max_threads is None:
+        max_threads = os.cpu_count() or 1
+    thread_counts = [1]
+    while thread_counts[-1] * 2 <= max_threads:
+        thread_counts.append(thread_counts[-1] * 2)
+    if thread_counts[-1] != max_threads:
+        thread_counts.append(max_threads)
+
+    rows = []
+    for name, workload in [("gemm", gemm), ("2mm", two_mm), ("jacobi_2d", jacobi_2d)]:
+        s, shapes = workload()
+        f = hcl.build(s, num_threads=1)
+        args = [
+            hcl.asarray(np.random.rand(*shape).astype(np.float32)) for shape in shapes
+        ]
+        baseline = None
+        for num_threads in thread_counts:
+            f.num_threads = num_threads
+            elapsed = measure(lambda: f(*args))
+            if baseline is None:
+                baseline = elapsed
+            rows.append(
+                [
+                    name,
+                    num_threads,
+                    f"{elapsed * 1e3:.2f}",
+                    f"{baseline / elapsed:.2f}x",
+                ]
+            )
+    print_table(["kernel", "threads", "time (ms)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,81 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Items/sec of HCLModule.run_batch versus looping over __call__.
+
+Usage: python tests/benchmark/run_batch.py [batch_size]
+"""
+
+import sys
+import time
+
+import heterocl as hcl
+import numpy as np
+
+from common import print_table
+
+
+def build():
+    # one digitrec-like step: hamming distances of a 64-bit test image
+    # to 10 training images
+    hcl.init(hcl.UInt(64))
+    test_image = hcl.placeholder((1,), "test_image")
+    train_images = hcl.placeholder((10,), "train_images")
+
+    def kernel(test_image, train_images):
+        def popcount(x):
+            count = hcl.scalar(0, "count", dtype=hcl.UInt(8))
+            with hcl.for_(0, 64) as i:
+                count.v += x[i]
+            return count.v
+
+        return hcl.compute(
+            (10,),
+            lambda i: popcount(test_image[0] ^ train_images[i]),
+            "dist",
+            dtype=hcl.UInt(8),
+        )
+
+    s = hcl.create_schedule([test_image, train_images], kernel)
+    return hcl.build(s)
+
+
+def main(batch_size=10000):
+    f = build()
+    test_images = np.random.randint(0, 1 << 62, size=(batch_size, 1))
+    train_images = np.random.randint(0, 1 << 62, size=(batch_size, 10))
+    batch = [
+        hcl.asarray(test_images, hcl.UInt(64)),
+        hcl.asarray(train_images, hcl.UInt(64)),
+        hcl.asarray(np.zeros((batch_size, 10)), hcl.UInt(8)),
+    ]
+    items = [
+        [
+            hcl.asarray(test_images[i], hcl.UInt(64)),
+            hcl.asarray(train_images[i], hcl.UInt(64)),
+            hcl.asarray(np.zeros(10), hcl.UInt(8)),
+        ]
+        for i in range(batch_size)
+    ]
+
+    start = time.perf_counter()
+    for args in items:
+        f(*args)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    f.run_batch(*batch)
+    batch_time = time.perf_counter() - start
+
+    for i in range(0, batch_size, max(batch_size // 100, 1)):
+        assert np.array_equal(items[i][2].asnumpy(), batch[2].asnumpy()[i])
+    print_table(
+        ["", "items/s"],
+        [
+            ["loop over __call__", f"{batch_size / loop_time:.0f}"],
+            ["run_batch", f"{batch_size / batch_time:.0f}"],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,61 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Time of simplifying the index and bound expressions of polybench
+kernels, such as the extents of the stencil windows and of the tiles.
+
+Usage: python tests/benchmark/simplify_index.py
+"""
+
+import heterocl as hcl
+from heterocl.ast import ast
+
+from common import measure, print_table
+
+
+def index_expressions(N=64, T=8):
+    hcl.init()
+    loc = ast.Location("simplify_index.py", 1)
+    t, i, j, k, ii, jj = [ast.IterVar(n, None, loc) for n in "t i j k ii jj".split()]
+    return {
+        # A[i][j + 1] - A[i][j - 1], the window of the 5-point stencil
+        "jacobi-2d": [(j + 1) - (j - 1) + 1, (i + 1) - (i - 1) + 1],
+        # the 9-point window of the Gauss-Seidel sweep
+        "seidel-2d": [(i + 1) * N + (j + 1) - ((i - 1) * N + (j - 1)) + 1],
+        # the time-skewed flattened index of fdtd-2d
+        "fdtd-2d": [(t * N + i) - t * N, (t + 1) * N + j - (t * N + j)],
+        # the row and column of the flattened index of gemm
+        "gemm": [(i * N + j) // N, (i * N + j) % N, (i * N + k) % N - k],
+        # the tile and the offset in the tile of a tiled 2mm
+        "2mm (tiled)": [
+            (i * T + ii) // T,
+            (i * T + ii) % T,
+            ((j * T + jj) * N + k) // N - j * T,
+        ],
+        # the bounds of the triangular loops of lu
+        "lu": [i - (j + 1) + 1 + j, (i + 1) - i],
+    }
+
+
+def main():
+    rows = []
+    for kernel, exprs in index_expressions().items():
+        for expr in exprs:
+            native = measure(lambda: ast.simplify(expr), repeat=5)
+            sympy = measure(lambda: ast._sympy_simplify(expr), repeat=5)
+            rows.append(
+                [
+                    kernel,
+                    str(ast.simplify(expr)),
+                    str(ast._sympy_simplify(expr)),
+                    f"{native * 1e6:.0f}",
+                    f"{sympy * 1e6:.0f}",
+                ]
+            )
+    print_table(
+        ["kernel", "native", "sympy", "native (us)", "sympy (us)"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Time of tracing and building the fully unrolled jacobi-2d kernel of
+polybench, with and without the source locations of the operations.
+
+Usage: python tests/benchmark/trace_locations.py [N] [TSTEPS]
+"""
+
+import sys
+import time
+
+import heterocl as hcl
+
+from common import print_table
+from trace_memory import trace_jacobi_2d
+
+
+def main(N=32, TSTEPS=2):
+    rows = []
+    times = {}
+    for track_locations in [True, False]:
+        start = time.perf_counter()
+        s = trace_jacobi_2d(N, TSTEPS, track_locations)
+        trace_time = time.perf_counter() - start
+        start = time.perf_counter()
+        hcl.build(s)
+        build_time = time.perf_counter() - start
+        times[track_locations] = (trace_time, build_time)
+        rows.append(
+            [str(track_locations), f"{trace_time:.2f}", f"{build_time:.2f}", ""]
+        )
+    rows[1][3] = (
+        f"{times[True][0] / times[False][0]:.2f}x / "
+        f"{times[True][1] / times[False][1]:.2f}x"
+    )
+    print_table(["locations", "trace (s)", "build (s)", "speedup"], rows)
+    hcl.init()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
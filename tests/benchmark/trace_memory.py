@@ -0,0 +1,64 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Memory and time of tracing the fully unrolled jacobi-2d kernel of
+polybench, whose AST has one node per operation of the kernel.
+
+Usage: python tests/benchmark/trace_memory.py [N] [TSTEPS]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+import heterocl as hcl
+
+from common import print_table
+
+
+def trace_jacobi_2d(N, TSTEPS, track_locations=True):
+    hcl.init(hcl.Float(32), track_locations=track_locations)
+    A = hcl.placeholder((N, N), "A")
+    B = hcl.placeholder((N, N), "B")
+
+    def kernel_jacobi_2d(A, B):
+        for _ in range(TSTEPS):
+            for src, dst in [(A, B), (B, A)]:
+                for i in range(1, N - 1):
+                    for j in range(1, N - 1):
+                        dst[i, j] = 0.2 * (
+                            src[i, j]
+                            + src[i, j - 1]
+                            + src[i, j + 1]
+                            + src[i + 1, j]
+                            + src[i - 1, j]
+                        )
+
+    return hcl.create_schedule([A, B], kernel_jacobi_2d)
+
+
+def main(N=48, TSTEPS=4):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    s = trace_jacobi_2d(N, TSTEPS)
+    trace_time = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    statements = len(s.ast.top_func.body)
+    print_table(
+        ["statements", "trace (s)", "AST (MiB)", "peak (MiB)", "bytes/statement"],
+        [
+            [
+                statements,
+                f"{trace_time:.2f}",
+                f"{current / 2**20:.1f}",
+                f"{peak / 2**20:.1f}",
+                current // max(1, statements),
+            ]
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,53 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Time of tracing and inferring the types of deep expression chains,
+such as the unrolled taps of a long filter.
+
+Usage: python tests/benchmark/type_inference.py
+"""
+
+import time
+
+import heterocl as hcl
+from heterocl.ast import ast
+
+from common import print_table
+
+
+def trace_fir(taps):
+    hcl.init(hcl.Int(16))
+    A = hcl.placeholder((taps,), "A")
+
+    def kernel(A):
+        def unrolled(*_):
+            value = A[0]
+            for k in range(1, taps):
+                value = value + A[k] * k
+            return value
+
+        return hcl.compute((1,), unrolled, "B", dtype=hcl.Float(32))
+
+    return hcl.create_schedule([A], kernel)
+
+
+def main():
+    rows = []
+    engine = ast.TypeInference()
+    for taps in [250, 500, 1000, 2000]:
+        start = time.perf_counter()
+        s = trace_fir(taps)
+        trace_time = time.perf_counter() - start
+        value = s.ast.top_func.body[0].body[-1].value
+        start = time.perf_counter()
+        # the builder infers the types of every node of the chain
+        node = value
+        while isinstance(node, ast.BinaryOp):
+            engine.infer(node)
+            node = node.lhs
+        infer_time = time.perf_counter() - start
+        rows.append([taps, f"{trace_time * 1e3:.1f}", f"{infer_time * 1e3:.1f}"])
+    print_table(["taps", "trace (ms)", "infer all nodes (ms)"], rows)
+
+
+if __name__ == "__main__":
+    main()
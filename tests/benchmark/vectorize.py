@@ -0,0 +1,75 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Scalar vs. vectorized float kernels on the llvm target.
+
+Usage: python tests/benchmark/vectorize.py [vector_width]
+"""
+
+import sys
+
+import heterocl as hcl
+import heterocl.op.nn as nn
+import numpy as np
+
+from common import measure, print_table
+
+
+def dense(batch=64, in_dim=1024, out_dim=512):
+    hcl.init(hcl.Float(32))
+    data = hcl.placeholder((batch, in_dim), "data")
+    weight = hcl.placeholder((out_dim, in_dim), "weight")
+    bias = hcl.placeholder((out_dim,), "bias")
+
+    def kernel(data, weight, bias):
+        return nn.dense(data, weight, bias)
+
+    s = hcl.create_schedule([data, weight, bias], kernel)
+    return s, [(batch, in_dim), (out_dim, in_dim), (out_dim,), (batch, out_dim)]
+
+
+def conv2d_nchw(batch=4, channel=32, size=56, num_filter=64, kernel_size=3):
+    hcl.init(hcl.Float(32))
+    out_size = size - kernel_size + 1
+    data = hcl.placeholder((batch, channel, size, size), "data")
+    weight = hcl.placeholder((num_filter, channel, kernel_size, kernel_size), "weight")
+
+    def kernel(data, weight):
+        return nn.conv2d_nchw(data, weight)
+
+    s = hcl.create_schedule([data, weight], kernel)
+    return s, [
+        (batch, channel, size, size),
+        (num_filter, channel, kernel_size, kernel_size),
+        (batch, num_filter, out_size, out_size),
+    ]
+
+
+def main(vector_width=8):
+    rows = []
+    for name, workload in [("dense", dense), ("conv2d_nchw", conv2d_nchw)]:
+        baseline = None
+        for vectorize in [None, vector_width]:
+            s, shapes = workload()
+            f = hcl.build(s, vectorize=vectorize)
+            args = [
+                hcl.asarray(np.random.rand(*shape).astype(np.float32))
+                for shape in shapes
+            ]
+            elapsed = measure(lambda: f(*args))
+            if baseline is None:
+                baseline = elapsed
+            loops = ", ".join(f"{stage}/{loop}" for stage, loop in f.vectorized_loops)
+            rows.append(
+                [
+                    name,
+                    vectorize or "-",
+                    f"{elapsed * 1e3:.2f}",
+                    f"{baseline / elapsed:.2f}x",
+                    loops or "-",
+                ]
+            )
+    print_table(["kernel", "width", "time (ms)", "speedup", "vectorized loops"], rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -0,0 +1,91 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import subprocess
+import sys
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+
+
+def _build(dtype=hcl.Int(32)):
+    hcl.init(dtype)
+    A = hcl.placeholder((10, 32), "A")
+    B = hcl.placeholder((10, 32), "B")
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] * 2 + B[i, j], "C")
+
+    s = hcl.create_schedule([A, B], kernel)
+    return hcl.build(s)
+
+
+@pytest.mark.parametrize(
+    "dtype", [hcl.Int(32), hcl.UInt(8), hcl.Float(32), hcl.Fixed(16, 4)]
+)
+def test_export_and_load(tmp_path, dtype):
+    f = _build(dtype)
+    path = str(tmp_path / "kernel.so")
+    header = f.export_library(path)
+    assert header == str(tmp_path / "kernel.h")
+    with open(header, "r", encoding="utf-8") as fp:
+        assert "_mlir_ciface_top(" in fp.read()
+
+    kernel = hcl.load_module(path)
+    assert [arg["name"] for arg in kernel.args] == ["A", "B", "C"]
+    np_A = np.random.randint(0, 10, size=(10, 32))
+    np_B = np.random.randint(0, 10, size=(10, 32))
+
+    # same results as the JIT-compiled module
+    hcl_A = hcl.asarray(np_A, dtype)
+    hcl_B = hcl.asarray(np_B, dtype)
+    hcl_C = hcl.asarray(np.zeros((10, 32)), dtype)
+    f(hcl_A, hcl_B, hcl_C)
+    expected = hcl_C.asnumpy()
+
+    np_C = np.zeros((10, 32), dtype=expected.dtype)
+    kernel(np_A, np_B, np_C)
+    assert np.array_equal(np_C, expected)
+
+    # HeteroCL arrays are accepted too
+    hcl_C = hcl.asarray(np.zeros((10, 32)), dtype)
+    kernel(hcl_A, hcl_B, hcl_C)
+    assert np.array_equal(hcl_C.asnumpy(), expected)
+
+    with pytest.raises(ValueError):
+        kernel(np_A, np_B, np.zeros((5, 32)))
+    with pytest.raises(TypeError):
+        kernel(np_A, np_B)
+
+
+def test_load_without_hcl_mlir(tmp_path):
+    f = _build()
+    path = str(tmp_path / "kernel.so")
+    f.export_library(path)
+    aot_path = os.path.join(os.path.dirname(hcl.__file__), "aot.py")
+    script = f"""
+import importlib.util, sys
+import numpy as np
+spec = importlib.util.spec_from_file_location("aot", {aot_path!r})
+aot = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(aot)
+kernel = aot.load_module({path!r})
+A = np.ones((10, 32), dtype=np.int64)
+C = np.zeros((10, 32), dtype=np.int64)
+kernel(A, A, C)
+assert (C == 3).all()
+assert "hcl_mlir" not in sys.modules
+"""
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def test_export_without_signature():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+    s = hcl.create_schedule([A], lambda A: hcl.compute(A.shape, lambda i: A[i] + 1))
+    f = hcl.build_module.build_llvm(str(hcl.lower(s)))
+    with pytest.raises(APIError):
+        f.export_library("kernel.so")
@@ -0,0 +1,74 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from heterocl.tensor import storage_dtype
+from heterocl.utils import make_const_tensor
+
+
+def _wrap(value, bits, signed):
+    """Reference encoding with Python integers"""
+    value = int(value) % (1 << bits)
+    if signed and value >= 1 << (bits - 1):
+        value -= 1 << bits
+    return value
+
+
+def _values():
+    rng = np.random.default_rng(0)
+    values = rng.integers(-(2**62), 2**62, size=100)
+    return np.concatenate([values, [0, 1, -1, 127, 128, -128, -129, 255, 256]])
+
+
+@pytest.mark.parametrize("bits", [1, 7, 8, 16, 31, 32, 33, 63, 64])
+@pytest.mark.parametrize("signed", [True, False])
+def test_wrap_integers(bits, signed):
+    dtype = hcl.Int(bits) if signed else hcl.UInt(bits)
+    values = _values()
+    array = hcl.asarray(values, dtype)
+    assert array.np_array.dtype == storage_dtype(dtype)
+    expected = [_wrap(v, bits, signed) for v in values]
+    # the bits above the width are cleared in the container
+    full = bits == storage_dtype(dtype).itemsize * 8
+    stored = [_wrap(v, bits, signed and full) for v in values]
+    assert array.np_array.tolist() == stored
+    assert array.asnumpy().tolist() == expected
+
+
+@pytest.mark.parametrize("signed", [True, False])
+def test_wrap_floats(signed):
+    dtype = hcl.Int(8) if signed else hcl.UInt(8)
+    values = np.array([0.0, 1.7, -1.7, 127.5, 128.0, -128.5, 300.25, -300.25])
+    wrapped = np.mod(values, 256)
+    if signed:
+        wrapped = np.where(wrapped >= 128, wrapped - 256, wrapped)
+    expected = np.trunc(wrapped).astype(np.int64)
+    array = hcl.asarray(values, dtype)
+    assert np.array_equal(array.np_array, expected)
+
+
+@pytest.mark.parametrize("bits, fracs", [(8, 4), (16, 0), (32, 12), (64, 20)])
+@pytest.mark.parametrize("signed", [True, False])
+def test_encode_fixed(bits, fracs, signed):
+    dtype = hcl.Fixed(bits, fracs) if signed else hcl.UFixed(bits, fracs)
+    values = np.array([0.0, 0.5, -0.5, 1.25, -3.75, 100.1, -100.1, 1e4])
+    array = hcl.asarray(values, dtype)
+    expected = [_wrap(np.trunc(v * 2**fracs), bits, signed) for v in values]
+    assert array.np_array.tolist() == expected
+    decoded = [e / 2**fracs for e in expected]
+    assert array.asnumpy().tolist() == decoded
+    # integer inputs are scaled exactly
+    ints = np.array([0, 1, -1, 5, -7])
+    expected = [_wrap(v * 2**fracs, bits, signed) for v in ints]
+    assert hcl.asarray(ints, dtype).np_array.tolist() == expected
+
+
+def test_const_tensor_fixed():
+    values = np.array([[0.5, -0.25], [7.75, -8.0]])
+    tensor = make_const_tensor(values, hcl.Fixed(6, 2))
+    assert tensor.dtype == np.int64
+    assert tensor.tolist() == [[2, -1], [31, -32]]
+    tensor = make_const_tensor(values, hcl.UFixed(6, 2))
+    assert tensor.tolist() == [[2, 63], [31, 32]]
@@ -0,0 +1,125 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import array
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+
+
+def test_shared_memory():
+    np_A = np.arange(10, dtype=np.int8)
+    assert hcl.asarray(np_A, hcl.Int(8)).np_array is np_A
+    # the values fit in 5 bits
+    hcl_A = hcl.asarray(np_A, hcl.Int(5), copy=False)
+    assert np.shares_memory(hcl_A.np_array, np_A)
+    hcl_A = hcl.asarray(np_A, hcl.Int(8), copy=True)
+    assert not np.shares_memory(hcl_A.np_array, np_A)
+    np_B = np.linspace(0, 1, 10, dtype=np.float32)
+    assert hcl.asarray(np_B, hcl.Float(32), copy=False).np_array is np_B
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    [
+        (np.arange(10, dtype=np.int8) * 10, hcl.Int(5)),
+        (np.arange(10, dtype=np.int32), hcl.Int(8)),
+        (np.arange(10, dtype=np.int32), hcl.UInt(32)),
+        (np.arange(10, dtype=np.float64), hcl.Float(32)),
+        (np.arange(10, dtype=np.int16), hcl.Fixed(16, 4)),
+    ],
+)
+def test_no_copy(values, dtype):
+    with pytest.raises(APIError):
+        hcl.asarray(values, dtype, copy=False)
+    # copied otherwise
+    hcl_A = hcl.asarray(values, dtype)
+    assert not np.shares_memory(hcl_A.np_array, values)
+
+
+def test_memmap(tmp_path):
+    path = tmp_path / "data.bin"
+    np.arange(12, dtype=np.int32).tofile(path)
+    data = np.memmap(path, dtype=np.int32, mode="r+", shape=(3, 4))
+    hcl_A = hcl.asarray(data, hcl.Int(32), copy=False)
+    assert type(hcl_A.np_array) is np.ndarray
+    assert np.shares_memory(hcl_A.np_array, data)
+    hcl_A.np_array[0, 0] = 42
+    data.flush()
+    assert np.fromfile(path, dtype=np.int32)[0] == 42
+
+
+def test_buffer_protocol():
+    values = array.array("i", [1, 2, 3])
+    hcl_A = hcl.asarray(values, hcl.Int(32), copy=False)
+    hcl_A.np_array[0] = 9
+    assert values[0] == 9
+    hcl_B = hcl.asarray(b"\x01\x02\xff", hcl.UInt(8), copy=False)
+    assert hcl_B.asnumpy().tolist() == [1, 2, 255]
+    assert not hcl_B.np_array.flags.writeable
+    hcl_C = hcl.asarray(bytearray(b"\x01\x02\xff"), hcl.Int(8))
+    assert hcl_C.asnumpy().tolist() == [1, 2, -1]
+
+
+def test_dlpack():
+    values = np.arange(4, dtype=np.float32)
+    hcl_A = hcl.asarray(values, hcl.Float(32))
+    for tensor in [values.__dlpack__(), hcl_A.np_array[::-1][::-1]]:
+        hcl_B = hcl.asarray(tensor, hcl.Float(32), copy=False)
+        assert np.shares_memory(hcl_B.np_array, values)
+
+    class DeviceTensor:
+        def __dlpack__(self, **kwargs):
+            return values.__dlpack__(**kwargs)
+
+        def __dlpack_device__(self):
+            # kDLCUDA
+            return (2, 0)
+
+    with pytest.raises(APIError):
+        hcl.asarray(DeviceTensor(), hcl.Float(32))
+
+
+def _build():
+    hcl.init(hcl.Int(32))
+    A = hcl.placeholder((3, 4), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] * 3, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    return hcl.build(s)
+
+
+def test_call_memmap(tmp_path):
+    f = _build()
+    np.arange(12, dtype=np.int32).tofile(tmp_path / "A.bin")
+    np_A = np.memmap(tmp_path / "A.bin", dtype=np.int32, mode="r", shape=(3, 4))
+    np_B = np.memmap(tmp_path / "B.bin", dtype=np.int32, mode="w+", shape=(3, 4))
+    f(np_A, np_B)
+    # the kernel reads and writes the mapped files
+    assert f.bytes_copied == 0
+    np_B.flush()
+    assert np.array_equal(
+        np.fromfile(tmp_path / "B.bin", dtype=np.int32), np.arange(12) * 3
+    )
+
+
+def test_call_converted():
+    f = _build()
+    np_A = np.arange(12).reshape(3, 4)
+    np_B = np.zeros((3, 4))
+    f(np_A, np_B)
+    assert f.bytes_copied > 0
+    assert np.array_equal(np_B, np_A * 3)
+
+
+def test_call_read_only_output():
+    f = _build()
+    np_A = np.arange(12, dtype=np.int32).reshape(3, 4)
+    np_B = np.zeros((3, 4), dtype=np.int32)
+    np_B.flags.writeable = False
+    with pytest.raises(APIError):
+        f(np_A, hcl.asarray(np_B, hcl.Int(32)))
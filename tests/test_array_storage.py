@@ -0,0 +1,112 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from heterocl.tensor import Array, storage_dtype
+
+
+@pytest.mark.parametrize(
+    "dtype, expected",
+    [
+        (hcl.Int(1), np.int8),
+        (hcl.UInt(4), np.uint8),
+        (hcl.Int(8), np.int8),
+        (hcl.Int(12), np.int16),
+        (hcl.UInt(24), np.uint32),
+        (hcl.Fixed(40, 10), np.int64),
+        (hcl.UFixed(16, 8), np.uint16),
+        (hcl.Float(32), np.float32),
+    ],
+)
+def test_storage_dtype(dtype, expected):
+    assert storage_dtype(dtype) == expected
+    np_A = np.random.randint(-8, 8, size=(4, 16))
+    array = hcl.asarray(np_A, dtype)
+    assert array.np_array.dtype == expected
+    assert array.np_array.nbytes == np_A.size * np.dtype(expected).itemsize
+    assert np.array_equal(array.asnumpy(), hcl.cast_np(np_A, dtype))
+
+
+def test_values():
+    np_A = np.array([-129, -128, -1, 0, 127, 128, 255])
+    assert hcl.asarray(np_A, hcl.Int(8)).asnumpy().tolist() == [
+        127,
+        -128,
+        -1,
+        0,
+        127,
+        -128,
+        -1,
+    ]
+    assert hcl.asarray(np_A, hcl.UInt(4)).asnumpy().tolist() == [
+        15,
+        0,
+        15,
+        0,
+        15,
+        0,
+        15,
+    ]
+    np_B = np.array([-2.5, 0.25, 7.75])
+    assert hcl.asarray(np_B, hcl.Fixed(8, 2)).asnumpy().tolist() == [-2.5, 0.25, 7.75]
+
+
+@pytest.mark.parametrize(
+    "dtype", [hcl.Int(1), hcl.UInt(4), hcl.Int(3), hcl.UInt(12), hcl.Fixed(12, 4)]
+)
+def test_pack(dtype):
+    np_A = np.random.randint(-100, 100, size=(5, 7))
+    array = hcl.asarray(np_A, dtype)
+    packed = array.pack()
+    assert packed.dtype == np.uint8
+    assert packed.size == (np_A.size * dtype.bits + 7) // 8
+    unpacked = Array.from_packed(packed, (5, 7), dtype)
+    assert unpacked.np_array.dtype == array.np_array.dtype
+    assert np.array_equal(unpacked.np_array, array.np_array)
+
+
+def test_pack_nibbles():
+    array = hcl.asarray(np.array([1, 2, 3, 15]), hcl.UInt(4))
+    assert array.pack().tolist() == [0x21, 0xF3]
+
+
+def _build(dtype):
+    hcl.init(dtype)
+    A = hcl.placeholder((16, 16), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+
+    return hcl.build(hcl.create_schedule([A], kernel))
+
+
+@pytest.mark.parametrize(
+    "dtype", [hcl.Int(8), hcl.UInt(4), hcl.Int(12), hcl.UInt(32), hcl.Fixed(12, 4)]
+)
+def test_kernel_on_compact_arrays(dtype):
+    f = _build(dtype)
+    np_A = np.random.randint(-10, 10, size=(16, 16))
+    hcl_A = hcl.asarray(np_A, dtype)
+    hcl_B = hcl.asarray(np.zeros((16, 16)), dtype)
+    out_buffer = hcl_B.np_array
+    f(hcl_A, hcl_B)
+    # passed to the kernel without widening copies
+    assert f.bytes_copied == 0
+    assert hcl_B.np_array is out_buffer
+    assert np.array_equal(hcl_B.asnumpy(), hcl.cast_np(np_A + 1, dtype))
+
+
+def test_kernel_on_wide_arrays():
+    f = _build(hcl.Int(8))
+    np_A = np.random.randint(-10, 10, size=(16, 16))
+    hcl_A = hcl.asarray(np_A, hcl.Int(8))
+    hcl_B = hcl.asarray(np.zeros((16, 16)), hcl.Int(8))
+    # arrays holding 64-bit values are converted for the call
+    hcl_A.np_array = hcl_A.np_array.astype(np.int64)
+    hcl_B.np_array = hcl_B.np_array.astype(np.int64)
+    f(hcl_A, hcl_B)
+    assert f.bytes_copied > 0
+    assert hcl_B.np_array.dtype == np.int64
+    assert np.array_equal(hcl_B.asnumpy(), np_A + 1)
@@ -0,0 +1,50 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import copy
+
+import heterocl as hcl
+from heterocl.ast import ast
+
+
+def _trace():
+    hcl.init()
+    A = hcl.placeholder((4, 4), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+        return B
+
+    return hcl.create_schedule([A], kernel)
+
+
+def test_shared_constants():
+    loc = ast.Location("kernel.py", 1)
+    assert ast.Location("kernel.py", 1) is loc
+    one = ast.immediate_to_constant(1, loc)
+    assert ast.immediate_to_constant(1, loc) is one
+    assert ast.immediate_to_constant(True, loc) is not one
+    assert ast.immediate_to_constant(1, ast.Location("kernel.py", 2)) is not one
+    zero = ast.immediate_to_constant(0.0, loc)
+    assert ast.immediate_to_constant(-0.0, loc) is not zero
+
+
+def test_compact_nodes():
+    s = _trace()
+    store = s.ast.top_func.body[0].body[-1]
+    assert isinstance(store, ast.StoreOp)
+    assert isinstance(store.value, ast.Add)
+    assert not hasattr(store.value, "__weakref__")
+    # all the expressions share the type inference engine
+    assert store.value.tinf_engine is store.value.lhs.tinf_engine
+    assert store.value.ir_op is None
+
+
+def test_copy_compact_nodes():
+    s = _trace()
+    _ast = copy.deepcopy(s.ast)
+    store = _ast.top_func.body[0].body[-1]
+    assert store is not s.ast.top_func.body[0].body[-1]
+    assert store.value.rhs.value == 1
+    assert store.value.lhs.tensor.name == "A"
+    assert store.loc is s.ast.top_func.body[0].body[-1].loc
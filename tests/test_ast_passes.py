@@ -142,3 +142,102 @@ def test_nested_if_elif_else():
             f(hcl_x, hcl_y, hcl_z)
             golden = x_v * 10 + y_v
             assert hcl_z.asnumpy()[0] == golden
+
+
+def test_walk():
+    from heterocl.ast.ast_visitor import walk
+
+    tree = {"a": ["b", "e"], "b": ["c", "d"], "c": [], "d": [], "e": []}
+    events = []
+
+    def pre(node, parent):
+        events.append(("pre", node, parent))
+        # skip the children of b
+        return node != "b"
+
+    walk("a", tree.get, pre, lambda node, parent: events.append(("post", node)))
+    assert events == [
+        ("pre", "a", None),
+        ("pre", "b", "a"),
+        ("pre", "e", "a"),
+        ("post", "e"),
+        ("post", "a"),
+    ]
+
+
+def test_visitor_leave():
+    from heterocl.ast import ast
+    from heterocl.ast.ast_visitor import ASTVisitor
+
+    class Visitor(ASTVisitor):
+        def __init__(self):
+            super().__init__("test")
+            self.left = []
+
+        def children(self, op):
+            return op.body if isinstance(op, ast.ComputeOp) else ()
+
+        def leave(self, op, parent, *args, **kwargs):
+            self.left.append((op, parent))
+
+    hcl.init()
+    A = hcl.placeholder((4,), "A")
+    s = hcl.create_schedule([A], lambda A: hcl.compute(A.shape, lambda i: A[i], "B"))
+    compute = s.ast.top_func.body[0]
+    visitor = Visitor()
+    visitor.visit(compute)
+    assert visitor.left == [(compute.body[0], compute), (compute, None)]
+
+
+def test_clean_deep_expression():
+    from heterocl.ast import ast
+    from heterocl.ast.build_cleaner import ASTCleaner
+
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((4,), "A")
+
+    def kernel(A):
+        def chain(i):
+            value = A[i]
+            for k in range(5000):
+                value = value + k
+            return value
+
+        return hcl.compute(A.shape, chain, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    store = s.ast.top_func.body[0].body[-1]
+    node = store.value
+    while isinstance(node, ast.Add):
+        node.result = "built"
+        node = node.lhs
+    node.result = "built"
+    # deeper than the recursion limit
+    ASTCleaner().visit(s.ast)
+    node = store.value
+    while isinstance(node, ast.Add):
+        assert node.result is None
+        node = node.lhs
+    assert node.result is None
+
+
+def test_use_index():
+    from heterocl.ast import ast
+
+    hcl.init()
+    A = hcl.placeholder((4, 4), "A")
+    s = hcl.create_schedule(
+        [A], lambda A: hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+    )
+    top_func = s.ast.top_func
+    store = top_func.body[0].body[-1]
+    uses = ast.UseIndex(top_func)
+    A, B = store.value.lhs.tensor, store.tensor
+    assert [op is store.value.lhs for op in uses.get(A)] == [True]
+    # the compute holding B, and the store into B
+    assert [op is store for op in uses.get(B)] == [False, True]
+    new_B = ast.AllocOp("B_host", B.shape, B.dtype, B.loc)
+    uses.replace(B, new_B)
+    assert store.tensor is new_B and top_func.body[0].tensor is new_B
+    assert not uses.get(B) and len(uses.get(new_B)) == 2
+    assert [t.name for t in top_func.return_tensors] == ["B_host"]
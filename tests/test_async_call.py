@@ -0,0 +1,71 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import heterocl as hcl
+import numpy as np
+
+
+def _build():
+    hcl.init(hcl.Int(32))
+    A = hcl.placeholder((16, 8), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] * 2 + 1, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    return hcl.build(s)
+
+
+def _args():
+    np_A = np.random.randint(-100, 100, size=(16, 8))
+    return np_A, hcl.asarray(np_A), hcl.asarray(np.zeros((16, 8)))
+
+
+def test_submit():
+    f = _build()
+    np_A, hcl_A, hcl_B = _args()
+    future = f.submit(hcl_A, hcl_B)
+    assert isinstance(future, Future)
+    assert future.result() is None
+    assert np.array_equal(hcl_B.asnumpy(), np_A * 2 + 1)
+
+    # padded outputs are sliced back as with __call__
+    hcl_B = hcl.asarray(np.zeros((16, 4)))
+    with ThreadPoolExecutor(2) as executor:
+        f.submit(hcl_A, hcl_B, executor=executor).result()
+    assert np.array_equal(hcl_B.asnumpy(), np_A[:, :4] * 2 + 1)
+
+
+def test_acall():
+    f = _build()
+
+    async def run():
+        calls = [_args() for _ in range(8)]
+        await asyncio.gather(*[f.acall(hcl_A, hcl_B) for _, hcl_A, hcl_B in calls])
+        return calls
+
+    for np_A, _, hcl_B in asyncio.run(run()):
+        assert np.array_equal(hcl_B.asnumpy(), np_A * 2 + 1)
+
+
+def test_concurrent_calls():
+    f = _build()
+    calls = [_args() for _ in range(64)]
+    barrier = threading.Barrier(8)
+
+    def run(thread):
+        barrier.wait()
+        for _, hcl_A, hcl_B in calls[thread::8]:
+            f(hcl_A, hcl_B)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for np_A, _, hcl_B in calls:
+        assert np.array_equal(hcl_B.asnumpy(), np_A * 2 + 1)
@@ -0,0 +1,90 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import HCLError
+
+
+def _schedule(factor):
+    hcl.init()
+    A = hcl.placeholder((10, 32), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] * factor, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    s[kernel.B].split(kernel.B.axis[1], factor)
+    return s
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_build_many_llvm(workers):
+    schedules = [_schedule(factor) for factor in range(1, 5)]
+    modules = hcl.build_many(schedules, workers=workers)
+    # serial or not, the given schedules are left as they are
+    assert not any(s.is_lowered() for s in schedules)
+    np_A = np.random.randint(0, 10, size=(10, 32))
+    for factor, f in zip(range(1, 5), modules):
+        hcl_A = hcl.asarray(np_A)
+        hcl_B = hcl.asarray(np.zeros((10, 32)))
+        f(hcl_A, hcl_B)
+        assert np.array_equal(hcl_B.asnumpy(), np_A * factor)
+
+
+def test_build_many_cache_counters(tmp_path):
+    # the lookups made by the workers are counted in the calling process
+    hcl.cache.enable(str(tmp_path))
+    hcl.cache.clear()
+    try:
+        schedules = [_schedule(factor) for factor in range(1, 3)]
+        hcl.build_many(schedules, workers=2)
+        assert hcl.cache.info()["misses"] == 2
+    finally:
+        hcl.cache.clear()
+        hcl.cache.disable()
+
+
+def test_build_many_threads():
+    # nothing is forked while another thread runs
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        schedules = [_schedule(factor) for factor in range(1, 3)]
+        modules = hcl.build_many(schedules, workers=2)
+        assert not any(s.is_lowered() for s in schedules)
+    finally:
+        stop.set()
+        thread.join()
+    np_A = np.random.randint(0, 10, size=(10, 32))
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np.zeros((10, 32)))
+    modules[1](hcl_A, hcl_B)
+    assert np.array_equal(hcl_B.asnumpy(), np_A * 2)
+    # the schedules can still be built
+    hcl.build(schedules[1])(hcl_A, hcl_B)
+    assert np.array_equal(hcl_B.asnumpy(), np_A * 2)
+
+
+def test_build_many_vhls():
+    schedules = [_schedule(factor) for factor in range(1, 3)]
+    codes = hcl.build_many(schedules, target="vhls", workers=2)
+    for code in codes:
+        assert "void top" in code
+
+
+def test_build_many_error():
+    # a failed job does not affect the other ones
+    schedules = [_schedule(2), "not a schedule", _schedule(2)]
+    results = hcl.build_many(
+        schedules, target="vhls", workers=2, return_exceptions=True
+    )
+    assert "void top" in results[0]
+    assert isinstance(results[1], HCLError)
+    assert "void top" in results[2]
+    with pytest.raises(HCLError):
+        hcl.build_many(schedules, target="vhls", workers=2)
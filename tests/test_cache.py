@@ -0,0 +1,113 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from heterocl.build_module import _get_shared_libs
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    hcl.cache.enable(str(tmp_path))
+    hcl.cache.clear()
+    yield tmp_path
+    hcl.cache.clear()
+    hcl.cache.disable()
+
+
+def _build_add_one():
+    hcl.init()
+    A = hcl.placeholder((10, 32), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+        return B
+
+    s = hcl.create_schedule([A], kernel)
+    return hcl.build(s)
+
+
+def test_cache_hit(cache_dir):
+    np_A = np.random.randint(0, 10, size=(10, 32))
+    for i in range(2):
+        f = _build_add_one()
+        hcl_A = hcl.asarray(np_A)
+        hcl_B = hcl.asarray(np.zeros((10, 32)))
+        f(hcl_A, hcl_B)
+        assert np.array_equal(hcl_B.asnumpy(), np_A + 1)
+        info = hcl.cache.info()
+        assert info["hits"] == i
+        assert info["misses"] == 1
+        assert info["entries"] == 1
+
+
+def test_cache_eviction(cache_dir):
+    hcl.cache.enable(str(cache_dir), max_size=100)
+    for i in range(4):
+        key = hcl.cache.make_key(f"module {i}", 3, [])
+        hcl.cache.store(key, "x" * 40)
+        # set the mtimes explicitly, their granularity depends on the
+        # filesystem
+        os.utime(os.path.join(str(cache_dir), key + ".mlir"), (i, i))
+    info = hcl.cache.info()
+    assert info["entries"] == 2
+    assert info["evictions"] == 2
+    # the oldest entries are evicted first
+    assert hcl.cache.lookup(hcl.cache.make_key("module 0", 3, [])) is None
+    assert hcl.cache.lookup(hcl.cache.make_key("module 3", 3, [])) is not None
+
+
+def test_cache_clear(cache_dir):
+    _build_add_one()
+    assert hcl.cache.info()["entries"] == 1
+    hcl.cache.clear()
+    info = hcl.cache.info()
+    assert info["entries"] == 0
+    assert info["hits"] == 0 and info["misses"] == 0
+
+
+def test_cache_constants_bounded(cache_dir):
+    # the constants count towards the size of the cache, and the least
+    # recently used entries are evicted to make room for them
+    hcl.cache.enable(str(cache_dir), max_size=110)
+    for i in range(2):
+        key = hcl.cache.make_key(f"module {i}", 3, [])
+        hcl.cache.store(key, "x" * 40)
+        os.utime(os.path.join(str(cache_dir), key + ".mlir"), (i, i))
+    path = hcl.cache.store_constant(np.zeros(8, dtype=np.int64))
+    assert os.path.dirname(path) == os.path.join(str(cache_dir), "constants")
+    info = hcl.cache.info()
+    assert info["entries"] == 2
+    assert info["size"] == 40 + 64
+    assert info["evictions"] == 1
+    assert hcl.cache.lookup(hcl.cache.make_key("module 0", 3, [])) is None
+
+
+def test_cache_size_from_env(monkeypatch):
+    max_size = hcl.cache.info()["max_size"]
+    try:
+        monkeypatch.setenv("HCL_CACHE_SIZE", "1MB")
+        with pytest.warns(Warning, match="HCL_CACHE_SIZE"):
+            hcl.cache._init_from_env()
+        assert hcl.cache.info()["max_size"] == max_size
+        monkeypatch.setenv("HCL_CACHE_SIZE", "4096")
+        hcl.cache._init_from_env()
+        assert hcl.cache.info()["max_size"] == 4096
+    finally:
+        hcl.cache._CacheState.max_size = max_size
+
+
+def test_shared_libs_looked_up_once(cache_dir, monkeypatch):
+    commands = []
+    popen = os.popen
+    monkeypatch.setattr(
+        os, "popen", lambda command: commands.append(command) or popen(command)
+    )
+    _get_shared_libs.cache_clear()
+    for _ in range(2):
+        _build_add_one()
+    # llvm-config is not run again on the cache hit
+    assert commands == ["llvm-config --libdir"]
@@ -0,0 +1,72 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+
+
+def _build(dtype=hcl.Int(32)):
+    hcl.init(dtype)
+    A = hcl.placeholder((10, 32), "A")
+    B = hcl.placeholder((10, 32), "B")
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + B[i, j], "C")
+
+    s = hcl.create_schedule([A, B], kernel)
+    return hcl.build(s)
+
+
+def _packed_call(f):
+    # the packed call of the calling thread, created by the fast path
+    return getattr(f._packed_calls, "call", None)
+
+
+def test_fast_path():
+    f = _build()
+    for _ in range(3):
+        np_A = np.random.randint(0, 10, size=(10, 32))
+        np_B = np.random.randint(0, 10, size=(10, 32))
+        hcl_A = hcl.asarray(np_A)
+        hcl_B = hcl.asarray(np_B)
+        hcl_C = hcl.asarray(np.zeros((10, 32)))
+        f(hcl_A, hcl_B, hcl_C)
+        assert _packed_call(f) is f._get_packed_call()
+        assert np.array_equal(hcl_C.asnumpy(), np_A + np_B)
+
+
+def test_fast_path_float():
+    f = _build(hcl.Float(32))
+    np_A = np.random.rand(10, 32).astype(np.float32)
+    np_B = np.random.rand(10, 32).astype(np.float32)
+    hcl_C = hcl.asarray(np.zeros((10, 32)), hcl.Float(32))
+    f(hcl.asarray(np_A, hcl.Float(32)), hcl.asarray(np_B, hcl.Float(32)), hcl_C)
+    assert _packed_call(f) is f._get_packed_call()
+    assert np.allclose(hcl_C.asnumpy(), np_A + np_B)
+
+
+def test_slow_path_fallback():
+    f = _build()
+    np_A = np.random.randint(0, 10, size=(10, 30))
+    np_B = np.random.randint(0, 10, size=(10, 32))
+    # a smaller input is padded by the generic path
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np_B)
+    hcl_C = hcl.asarray(np.zeros((10, 32)))
+    f(hcl_A, hcl_B, hcl_C)
+    assert _packed_call(f) is None
+    assert np.array_equal(hcl_C.asnumpy(), np.pad(np_A, ((0, 0), (0, 2))) + np_B)
+    # and the fast path is used once the arguments match
+    np_A = np.random.randint(0, 10, size=(10, 32))
+    f(hcl.asarray(np_A), hcl_B, hcl_C)
+    assert _packed_call(f) is f._get_packed_call()
+    assert np.array_equal(hcl_C.asnumpy(), np_A + np_B)
+
+
+def test_dtype_mismatch():
+    f = _build()
+    hcl_A = hcl.asarray(np.zeros((10, 32)), hcl.Float(32))
+    hcl_B = hcl.asarray(np.zeros((10, 32)))
+    hcl_C = hcl.asarray(np.zeros((10, 32)))
+    assert not f._call_plan.matches([hcl_A, hcl_B, hcl_C])
+    assert f._call_plan.matches([hcl_B, hcl_B, hcl_C])
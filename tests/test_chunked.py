@@ -0,0 +1,154 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+from heterocl.passes.halo import HaloAnalysis
+
+
+def _memmap(path, values, mode="r"):
+    values.tofile(path)
+    return np.memmap(path, dtype=values.dtype, mode=mode, shape=values.shape)
+
+
+def stencil(A, W):
+    B = hcl.compute(
+        (A.shape[0] - 1, A.shape[1]), lambda i, j: A[i, j] + A[i + 1, j] * W[j], "B"
+    )
+    return hcl.compute(
+        (B.shape[0] - 1, B.shape[1]), lambda i, j: B[i + 1, j] - B[i, j], "C"
+    )
+
+
+def test_halo_analysis():
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((10, 4), "A")
+    W = hcl.placeholder((4,), "W")
+    s = hcl.create_schedule([A, W], stencil)
+    analysis = HaloAnalysis()
+    analysis.apply(s.ast)
+    assert analysis.extents == {"A": 10, "B": 9, "C": 8}
+    assert analysis.resident == {"W"}
+    assert analysis.halos == {"A": (0, 2)}
+
+
+def test_halo_analysis_position_dependent():
+    hcl.init()
+    A = hcl.placeholder((10, 4), "A")
+
+    def kernel(A):
+        return hcl.compute((10, 4), lambda i, j: hcl.select(i > 0, A[i, j], 0), "B")
+
+    s = hcl.create_schedule([A], kernel)
+    with pytest.raises(APIError):
+        HaloAnalysis().apply(s.ast)
+
+
+def test_halo_analysis_update():
+    hcl.init()
+    A = hcl.placeholder((10, 4), "A")
+
+    def kernel(A):
+        hcl.update(A, lambda i, j: A[i, j] + 1, "U")
+        return hcl.compute(A.shape, lambda i, j: A[i, j], "B")
+
+    s = hcl.create_schedule([A], kernel)
+    with pytest.raises(APIError):
+        HaloAnalysis().apply(s.ast)
+
+
+def test_chunked_elementwise(tmp_path):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((1000, 16), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] * 2 + 1, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    mod = hcl.build(s)
+    np_A = np.random.rand(1000, 16).astype(np.float32)
+    data = _memmap(tmp_path / "A.bin", np_A)
+    out = np.memmap(tmp_path / "B.bin", dtype=np.float32, mode="w+", shape=(1000, 16))
+    mod.run_chunked(data, out, rows=64)
+    np_B = np.zeros((1000, 16), dtype=np.float32)
+    mod(np_A, np_B)
+    np.testing.assert_allclose(out, np_B)
+
+
+@pytest.mark.parametrize("rows", [1, 7, 100, None])
+def test_chunked_stencil(tmp_path, rows):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((103, 4), "A")
+    W = hcl.placeholder((4,), "W")
+    s = hcl.create_schedule([A, W], stencil)
+    mod = hcl.build(s)
+    np_A = np.random.rand(103, 4).astype(np.float32)
+    np_W = np.random.rand(4).astype(np.float32)
+    data = _memmap(tmp_path / "A.bin", np_A)
+    out = np.zeros((101, 4), dtype=np.float32)
+    mod.run_chunked(data, np_W, out, rows=rows)
+    np_B = np_A[:-1] + np_A[1:] * np_W
+    np.testing.assert_allclose(out, np_B[1:] - np_B[:-1], rtol=1e-5)
+
+
+def test_chunked_integers(tmp_path):
+    hcl.init(hcl.Int(8))
+    A = hcl.placeholder((50, 3), "A")
+
+    def kernel(A):
+        return hcl.compute((49, 3), lambda i, j: A[i, j] + A[i + 1, j], "B")
+
+    s = hcl.create_schedule([A], kernel)
+    mod = hcl.build(s)
+    np_A = np.random.randint(-100, 100, size=(50, 3)).astype(np.int64)
+    out = np.zeros((49, 3), dtype=np.int64)
+    mod.run_chunked(np_A, out, rows=8)
+    expected = np_A[:-1] + np_A[1:]
+    # wraps around 8 bits
+    expected = (expected + 128) % 256 - 128
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_chunked_position_dependent():
+    hcl.init()
+    A = hcl.placeholder((10, 4), "A")
+
+    def kernel(A):
+        return hcl.compute((10, 4), lambda i, j: A[i, j] + i, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    mod = hcl.build(s)
+    with pytest.raises(APIError):
+        mod.run_chunked(np.zeros((10, 4)), np.zeros((10, 4)), rows=2)
+
+
+def test_chunked_read_only_output():
+    hcl.init()
+    A = hcl.placeholder((10, 4), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    mod = hcl.build(s)
+    out = np.zeros((10, 4), dtype=np.int32)
+    out.flags.writeable = False
+    with pytest.raises(APIError):
+        mod.run_chunked(np.zeros((10, 4), dtype=np.int32), out, rows=2)
+
+
+def test_chunked_schedule_primitives():
+    hcl.init()
+    A = hcl.placeholder((10, 4), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    s[kernel.B].reorder(kernel.B.axis[1], kernel.B.axis[0])
+    mod = hcl.build(s)
+    # the kernel of the chunks would be built without the primitives
+    with pytest.raises(APIError):
+        mod.run_chunked(np.zeros((10, 4)), np.zeros((10, 4)), rows=2)
@@ -0,0 +1,68 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.dialects import memref as memref_d
+from hcl_mlir.exceptions import APIError
+
+
+@pytest.fixture(autouse=True)
+def reset_config():
+    yield
+    hcl.init()
+
+
+def _build(np_W, dtype, external_constants):
+    hcl.init(dtype, external_constants=external_constants)
+    A = hcl.placeholder(np_W.shape, "A")
+
+    def kernel(A):
+        W = hcl.const_tensor(np_W, "W", dtype)
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + W[i, j], "B")
+
+    s = hcl.create_schedule([A], kernel)
+    return s, hcl.build(s)
+
+
+def _external_globals(s):
+    return [
+        op.sym_name.value
+        for op in s.module.body.operations
+        if isinstance(op, memref_d.GlobalOp) and "external_data" in op.attributes
+    ]
+
+
+@pytest.mark.parametrize(
+    "dtype", [hcl.Int(32), hcl.Int(12), hcl.UInt(8), hcl.Float(32), hcl.Fixed(16, 4)]
+)
+def test_external_constant(dtype):
+    np_W = np.random.randint(0, 100, size=(64, 32))
+    if not isinstance(dtype, hcl.Int):
+        np_W = np_W / 4
+    np_A = np.random.randint(0, 100, size=(64, 32))
+    results = []
+    for external_constants in [None, 1024]:
+        s, f = _build(np_W, dtype, external_constants)
+        assert _external_globals(s) == ([] if external_constants is None else ["W"])
+        hcl_A = hcl.asarray(np_A, dtype)
+        hcl_B = hcl.asarray(np.zeros((64, 32)), dtype)
+        f(hcl_A, hcl_B)
+        results.append(hcl_B.asnumpy())
+    np.testing.assert_array_equal(results[0], results[1])
+
+
+def test_external_constant_threshold():
+    np_W = np.ones((4, 4), dtype=np.int32)
+    s, _ = _build(np_W, hcl.Int(32), np_W.nbytes + 1)
+    assert _external_globals(s) == []
+    s, _ = _build(np_W, hcl.Int(32), np_W.nbytes)
+    assert _external_globals(s) == ["W"]
+
+
+def test_external_constant_export(tmp_path):
+    np_W = np.ones((4, 4), dtype=np.int32)
+    _, f = _build(np_W, hcl.Int(32), 1)
+    with pytest.raises(APIError):
+        f.export_library(str(tmp_path / "kernel.so"))
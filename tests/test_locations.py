@@ -0,0 +1,28 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+
+
+def test_untracked_locations():
+    hcl.init(track_locations=False)
+    try:
+        A = hcl.placeholder((4, 4), "A")
+
+        def kernel(A):
+            return hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+
+        s = hcl.create_schedule([A], kernel)
+        store = s.ast.top_func.body[0].body[-1]
+        assert str(store.loc) == "unknown:0"
+        assert store.value.loc is store.loc
+        f = hcl.build(s)
+        np_A = np.random.randint(0, 10, size=(4, 4))
+        np_B = np.zeros((4, 4), dtype=np.int32)
+        f(np_A, np_B)
+        np.testing.assert_array_equal(np_B, np_A + 1)
+    finally:
+        hcl.init()
+    s = hcl.create_schedule([A], kernel)
+    assert s.ast.top_func.body[0].body[-1].loc.lineno != 0
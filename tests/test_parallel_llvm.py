@@ -0,0 +1,81 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+
+
+def _gemm_schedule(parallel=True):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((64, 32), "A")
+    B = hcl.placeholder((32, 48), "B")
+
+    def kernel(A, B):
+        r = hcl.reduce_axis(0, 32, "r")
+        return hcl.compute(
+            (64, 48), lambda x, y: hcl.sum(A[x, r] * B[r, y], axis=r), "C"
+        )
+
+    s = hcl.create_schedule([A, B], kernel)
+    if parallel:
+        s[kernel.C].parallel(kernel.C.axis[0])
+    return s
+
+
+def _run(f):
+    np_A = np.random.rand(64, 32).astype(np.float32)
+    np_B = np.random.rand(32, 48).astype(np.float32)
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np_B)
+    hcl_C = hcl.asarray(np.zeros((64, 48), dtype=np.float32))
+    f(hcl_A, hcl_B, hcl_C)
+    assert np.allclose(hcl_C.asnumpy(), np_A @ np_B, rtol=1e-4)
+
+
+@pytest.mark.parametrize("num_threads", [1, 2, 4])
+def test_parallel(num_threads):
+    f = hcl.build(_gemm_schedule(), num_threads=num_threads)
+    assert f.num_threads == num_threads
+    assert f.parallel_loops == ([("C", "x")] if num_threads > 1 else [])
+    _run(f)
+
+
+def test_parallel_unmarked_nest():
+    # affine-parallelize also picks the nests without a marked loop,
+    # which is reported
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((64, 32), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda x, y: A[x, y] + 1, "B")
+        return hcl.compute(A.shape, lambda x, y: B[x, y] * 2, "C")
+
+    s = hcl.create_schedule([A], kernel)
+    s[kernel.C].parallel(kernel.C.axis[0])
+    with pytest.warns(Warning, match="not marked with .parallel()"):
+        f = hcl.build(s, num_threads=2)
+    assert ("C", "x") in f.parallel_loops
+    assert ("B", "x") in f.parallel_loops
+
+
+def test_parallel_default_threads():
+    f = hcl.build(_gemm_schedule())
+    assert f.num_threads >= 1
+    _run(f)
+    # there is nothing to run in parallel without .parallel()
+    f = hcl.build(_gemm_schedule(parallel=False), num_threads=4)
+    assert f.num_threads == 1
+    _run(f)
+
+
+def test_set_num_threads():
+    f = hcl.build(_gemm_schedule(), num_threads=1)
+    assert f.parallel_loops == []
+    f.num_threads = 3
+    assert f.num_threads == 3
+    assert f.parallel_loops == [("C", "x")]
+    _run(f)
+    with pytest.raises(APIError):
+        f.num_threads = 0
@@ -0,0 +1,72 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+
+import heterocl as hcl
+import numpy as np
+
+
+def _schedule():
+    hcl.init()
+    A = hcl.placeholder((10, 32), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+        return B
+
+    return hcl.create_schedule([A], kernel)
+
+
+def test_profile_report():
+    f = hcl.build(_schedule(), profile=True)
+    report = f.profile
+    assert report is hcl.profiler.last_report()
+    names = [phase["name"] for phase in report["phases"]]
+    for name in [
+        "ast.nest_else_if",
+        "ir_builder",
+        "mlir.lower_pipeline",
+        "llvm.lower_hcl_to_llvm",
+        "llvm.jit",
+    ]:
+        assert name in names
+    assert names.index("ir_builder") < names.index("llvm.jit")
+    for phase in report["phases"]:
+        assert phase["time"] >= 0
+        assert phase["rss"] > 0
+    phases = {phase["name"]: phase for phase in report["phases"]}
+    assert phases["ir_builder"]["ops"] > 0
+    assert phases["llvm.jit"]["ops"] is None
+    assert report["total_time"] >= sum(p["time"] for p in report["phases"])
+
+    # profiling does not change the result
+    np_A = np.random.randint(0, 10, size=(10, 32))
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np.zeros((10, 32)))
+    f(hcl_A, hcl_B)
+    assert np.array_equal(hcl_B.asnumpy(), np_A + 1)
+
+
+def test_profile_dump(tmp_path):
+    path = tmp_path / "profile.json"
+    hcl.build(_schedule(), profile=str(path))
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    assert report == json.loads(json.dumps(hcl.profiler.last_report()))
+
+
+def test_profile_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("HCL_PROFILE", "1")
+    f = hcl.build(_schedule())
+    assert len(f.profile["phases"]) > 0
+    monkeypatch.setenv("HCL_PROFILE", "0")
+    f = hcl.build(_schedule())
+    assert f.profile is None
+
+
+def test_profile_vhls():
+    code = hcl.build(_schedule(), target="vhls", profile=True)
+    assert isinstance(code, str)
+    names = [phase["name"] for phase in hcl.profiler.last_report()["phases"]]
+    assert "codegen" in names
@@ -0,0 +1,58 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+
+
+def _build(dtype=hcl.Int(32)):
+    hcl.init(dtype)
+    A = hcl.placeholder((8, 4), "A")
+    B = hcl.placeholder((4,), "B")
+
+    def kernel(A, B):
+        return hcl.compute((8, 4), lambda i, j: A[i, j] * B[j] + 1, "C")
+
+    s = hcl.create_schedule([A, B], kernel)
+    return hcl.build(s)
+
+
+def test_run_batch_hcl_arrays():
+    f = _build()
+    np_A = np.random.randint(0, 10, size=(16, 8, 4))
+    np_B = np.random.randint(0, 10, size=(16, 4))
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np_B)
+    hcl_C = hcl.asarray(np.zeros((16, 8, 4)))
+    f.run_batch(hcl_A, hcl_B, hcl_C)
+    assert np.array_equal(hcl_C.asnumpy(), np_A * np_B[:, None, :] + 1)
+    assert f.bytes_copied == 0
+
+
+@pytest.mark.parametrize("dtype", [hcl.Int(8), hcl.Float(32), hcl.Fixed(16, 4)])
+def test_map_numpy(dtype):
+    f = _build(dtype)
+    np_A = np.random.randint(0, 10, size=(5, 8, 4))
+    np_B = np.random.randint(0, 10, size=(5, 4))
+    np_C = np.zeros((5, 8, 4))
+    f.map([np_A, np_B], [np_C])
+    # same results as calling the module on each item
+    for i in range(5):
+        hcl_C = hcl.asarray(np.zeros((8, 4)), dtype)
+        f(hcl.asarray(np_A[i], dtype), hcl.asarray(np_B[i], dtype), hcl_C)
+        assert np.array_equal(np_C[i], hcl_C.asnumpy())
+
+
+def test_run_batch_errors():
+    f = _build()
+    hcl_A = hcl.asarray(np.zeros((4, 8, 4)))
+    hcl_B = hcl.asarray(np.zeros((3, 4)))
+    hcl_C = hcl.asarray(np.zeros((4, 8, 4)))
+    with pytest.raises(APIError):
+        f.run_batch(hcl_A, hcl_B, hcl_C)
+    with pytest.raises(APIError):
+        f.run_batch(hcl_A, hcl_C)
+    with pytest.raises(APIError):
+        f.run_batch(hcl_A, hcl.asarray(np.zeros((4, 4)), hcl.Float(32)), hcl_C)
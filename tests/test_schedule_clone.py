@@ -0,0 +1,64 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+
+
+def _kernel(A):
+    B = hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+    C = hcl.compute(A.shape, lambda i, j: B[i, j] * 2, "C")
+    return C
+
+
+def test_clone_variants():
+    hcl.init()
+    A = hcl.placeholder((16, 32), "A")
+    s = hcl.create_schedule([A], _kernel)
+    # common prefix
+    s[_kernel.C].split(_kernel.C.axis[1], 4)
+
+    s1 = s.clone()
+    s1[_kernel.B].compute_at(s1[_kernel.C], _kernel.C.axis[0])
+    s2 = s.clone()
+    s2.partition(_kernel.B, dim=2)
+    s2[_kernel.B].unroll(_kernel.B.axis[1])
+
+    assert "split" in str(s1.ast) and "split" in str(s2.ast)
+    assert "compute_at" in str(s1.ast) and "compute_at" not in str(s2.ast)
+    assert "partition" in str(s2.ast) and "partition" not in str(s1.ast)
+    assert "compute_at" not in str(s.ast) and "partition" not in str(s.ast)
+
+    np_A = np.random.randint(0, 10, size=(16, 32))
+    for sch in [s, s1, s2]:
+        f = hcl.build(sch)
+        hcl_A = hcl.asarray(np_A)
+        hcl_C = hcl.asarray(np.zeros((16, 32)))
+        f(hcl_A, hcl_C)
+        assert np.array_equal(hcl_C.asnumpy(), (np_A + 1) * 2)
+
+
+def test_clone_stages():
+    hcl.init()
+    A = hcl.placeholder((16, 32), "A")
+    s = hcl.create_schedule([A], _kernel)
+    s_B = s[_kernel.B]
+    s1 = s.clone()
+    # stages of the copy are distinct from the original ones
+    assert s1[_kernel.B] is not s_B
+    assert s1[s_B] is s1[_kernel.B]
+    # a stage keeps applying primitives to its own schedule
+    s_B.pipeline(_kernel.B.axis[1])
+    assert "pipeline" in str(s.ast)
+    assert "pipeline" not in str(s1.ast)
+
+
+def test_clone_after_lowering():
+    hcl.init()
+    A = hcl.placeholder((16, 32), "A")
+    s = hcl.create_schedule([A], _kernel)
+    hcl.lower(s)
+    with pytest.raises(APIError):
+        s.clone()
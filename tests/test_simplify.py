@@ -1,10 +1,13 @@
 # Copyright HeteroCL authors. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import fractions
+
 import heterocl as hcl
 import pytest
 import numpy as np
 from hcl_mlir.exceptions import APIError
+from heterocl.ast import ast
 
 
 def test_remove_single_loop():
@@ -16,6 +19,56 @@ def test_remove_single_loop():
     assert "0 to 1" not in str(ir)
 
 
+def test_affine_simplify():
+    hcl.init()
+    loc = ast.Location("test_simplify.py", 1)
+    i, j, ii = [ast.IterVar(name, None, loc) for name in ["i", "j", "ii"]]
+    assert ast.simplify((j + 1) - (j - 1) + 1) == 3
+    assert ast.simplify((i + 1) * 4 + j - (i * 4 + j)) == 4
+    assert ast.simplify(i * 4 / 2 - 2 * i) == 0
+    assert ast.simplify(ast.immediate_to_constant(5, loc) / 2) == fractions.Fraction(
+        5, 2
+    )
+    assert ast.simplify((i * 8 + 3) // 8) == ast.simplify(i)
+    assert ast.simplify((i * 8 + 11) % 8) == 3
+    assert ast.simplify((i * 8 + ii) // 8 - i) == ast.simplify(ii // 8)
+    assert ast.simplify((i * 8 + ii + 8) % 8) == ast.simplify(ii % 8)
+    assert ast.simplify(i + 1 > i) == 1
+    assert ast.simplify(hcl.select(i < i - 1, j, ii)) == ast.simplify(ii)
+    assert isinstance(ast.simplify(i * 8 + j), ast.AffineExpr)
+
+
+def test_simplify_fallback():
+    pytest.importorskip("sympy")
+    hcl.init()
+    loc = ast.Location("test_simplify.py", 1)
+    i, j = [ast.IterVar(name, None, loc) for name in ["i", "j"]]
+    # not affine, simplified with sympy
+    assert ast.simplify(i * j - j * i) == 0
+
+
+def test_simplify_without_sympy(monkeypatch):
+    monkeypatch.setattr(ast, "sp", None)
+    hcl.init()
+    loc = ast.Location("test_simplify.py", 1)
+    i, j = [ast.IterVar(name, None, loc) for name in ["i", "j"]]
+    expr = i * j
+    assert ast.simplify(expr) is expr
+    # the bitwidth of the slice is then unknown
+    A = hcl.placeholder((4, 4), "A")
+    slices = []
+
+    def kernel(A):
+        def fcompute(i, j):
+            slices.append(A[i, j][i * j : 0])
+            return slices[-1]
+
+        return hcl.compute(A.shape, fcompute, "B")
+
+    hcl.create_schedule([A], kernel)
+    assert slices[0].dtype is None
+
+
 def test_simplify_slice():
     with pytest.raises(APIError):
         hcl.init()
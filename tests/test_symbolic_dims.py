@@ -0,0 +1,146 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import warnings
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+
+
+def _add_schedule():
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder(("N", 32), "A")
+    B = hcl.placeholder(("N", 32), "B")
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + B[i, j], "C")
+
+    return hcl.create_schedule([A, B], kernel)
+
+
+def test_dynamic_memref():
+    mod = hcl.lower(_add_schedule())
+    assert "memref<?x32xf32>" in str(mod)
+
+
+@pytest.mark.parametrize("size", [1, 7, 64])
+def test_any_size(size):
+    f = hcl.build(_add_schedule())
+    np_A = np.random.rand(size, 32).astype(np.float32)
+    np_B = np.random.rand(size, 32).astype(np.float32)
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np_B)
+    hcl_C = hcl.asarray(np.zeros((size, 32), dtype=np.float32))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        f(hcl_A, hcl_B, hcl_C)
+    assert f.bytes_copied == 0
+    assert np.allclose(hcl_C.asnumpy(), np_A + np_B)
+
+
+def test_one_module_many_sizes(monkeypatch):
+    f = hcl.build(_add_schedule())
+    for size in [3, 10, 5]:
+        np_A = np.random.rand(size, 32).astype(np.float32)
+        hcl_A = hcl.asarray(np_A)
+        hcl_C = hcl.asarray(np.zeros((size, 32), dtype=np.float32))
+        f(hcl_A, hcl_A, hcl_C)
+        assert np.allclose(hcl_C.asnumpy(), 2 * np_A)
+
+    # the generic path does not pad the arguments either
+    monkeypatch.setattr(f._call_plan, "matches", lambda argv: False)
+    hcl_C = hcl.asarray(np.zeros((3, 32), dtype=np.float32))
+    f(hcl.asarray(np_A[:3]), hcl.asarray(np_A[:3]), hcl_C)
+    assert f.bytes_copied == 0
+    assert np.allclose(hcl_C.asnumpy(), 2 * np_A[:3])
+
+
+def test_reduction():
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder(("N", "M"), "A")
+
+    def kernel(A):
+        r = hcl.reduce_axis(0, A.shape[0], "r")
+        return hcl.compute(
+            (A.shape[1],), lambda j: hcl.sum(A[r, j], axis=r, dtype=hcl.Float(32)), "B"
+        )
+
+    f = hcl.build(hcl.create_schedule([A], kernel))
+    for shape in [(5, 3), (2, 17)]:
+        np_A = np.random.rand(*shape).astype(np.float32)
+        hcl_B = hcl.asarray(np.zeros(shape[1], dtype=np.float32))
+        f(hcl.asarray(np_A), hcl_B)
+        assert np.allclose(hcl_B.asnumpy(), np_A.sum(axis=0), rtol=1e-5)
+
+
+def test_size_mismatch():
+    f = hcl.build(_add_schedule())
+    hcl_A = hcl.asarray(np.zeros((4, 32), dtype=np.float32))
+    hcl_B = hcl.asarray(np.zeros((5, 32), dtype=np.float32))
+    hcl_C = hcl.asarray(np.zeros((4, 32), dtype=np.float32))
+    with pytest.raises(APIError):
+        f(hcl_A, hcl_B, hcl_C)
+
+
+def test_run_batch():
+    f = hcl.build(_add_schedule())
+    np_A = np.random.rand(3, 6, 32).astype(np.float32)
+    hcl_C = hcl.asarray(np.zeros((3, 6, 32), dtype=np.float32))
+    f.run_batch(hcl.asarray(np_A), hcl.asarray(np_A), hcl_C)
+    assert np.allclose(hcl_C.asnumpy(), 2 * np_A)
+
+
+def test_unbound_dim():
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((8,), "A")
+
+    def kernel(A):
+        return hcl.compute((hcl.placeholder(("K",)).shape[0],), lambda i: A[0], "B")
+
+    with pytest.raises(APIError):
+        hcl.lower(hcl.create_schedule([A], kernel))
+
+
+def test_clone_shares_dims():
+    s = _add_schedule()
+    A = s._ast.top_func.args[0]
+    s1 = s.clone()
+    assert s1._ast.top_func.body[0].shape[0] is A.shape[0]
+    f = hcl.build(s1)
+    np_A = np.random.rand(5, 32).astype(np.float32)
+    hcl_C = hcl.asarray(np.zeros((5, 32), dtype=np.float32))
+    f(hcl.asarray(np_A), hcl.asarray(np_A), hcl_C)
+    assert np.allclose(hcl_C.asnumpy(), 2 * np_A)
+
+
+def test_cached_trace():
+    hcl.init(hcl.Float(32), trace_cache=True)
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+
+    try:
+        for size in [4, 9]:
+            A = hcl.placeholder(("N", 32), "A")
+            s = hcl.create_schedule([A], kernel)
+            assert s._ast.top_func.body[0].shape[0] is A.shape[0]
+            f = hcl.build(s)
+            np_A = np.random.rand(size, 32).astype(np.float32)
+            hcl_B = hcl.asarray(np.zeros((size, 32), dtype=np.float32))
+            f(hcl.asarray(np_A), hcl_B)
+            assert np.allclose(hcl_B.asnumpy(), np_A + 1)
+    finally:
+        hcl.init()
+
+
+def test_dims_reset():
+    s = _add_schedule()
+    A = s._ast.top_func.args[0]
+    # the kernels traced next do not share the dimensions of this one
+    assert hcl.placeholder(("N",)).shape[0] is not A.shape[0]
+    hcl.init()
+    B = hcl.placeholder(("M",))
+    hcl.init()
+    assert hcl.placeholder(("M",)).shape[0] is not B.shape[0]
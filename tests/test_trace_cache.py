@@ -0,0 +1,62 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+
+
+def test_trace_once():
+    hcl.init(trace_cache=True)
+    num_traces = [0]
+    A = hcl.placeholder((10, 32), "A")
+
+    def kernel(A):
+        num_traces[0] += 1
+        B = hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+        C = hcl.compute(A.shape, lambda i, j: B[i, j] * 2, "C")
+        return C
+
+    s1 = hcl.create_schedule([A], kernel)
+    s2 = hcl.create_schedule([A], kernel)
+    assert num_traces[0] == 1
+    assert s1.ast.top_func is not s2.ast.top_func
+
+    # the second schedule is independent of the first one
+    s2[kernel.B].compute_at(s2[kernel.C], kernel.C.axis[1])
+    assert "compute_at" not in str(s1.ast)
+    assert "compute_at" in str(s2.ast)
+
+    np_A = np.random.randint(0, 10, size=(10, 32))
+    for s in [s1, s2]:
+        f = hcl.build(s)
+        hcl_A = hcl.asarray(np_A)
+        hcl_C = hcl.asarray(np.zeros((10, 32)))
+        f(hcl_A, hcl_C)
+        assert np.array_equal(hcl_C.asnumpy(), (np_A + 1) * 2)
+    hcl.init()
+
+
+def test_trace_cache_key():
+    hcl.init(trace_cache=True)
+    num_traces = [0]
+
+    def kernel(A):
+        num_traces[0] += 1
+        return hcl.compute(A.shape, lambda i: A[i] + 1, "B")
+
+    hcl.create_schedule([hcl.placeholder((10,), "A")], kernel)
+    # same signature: hit
+    hcl.create_schedule([hcl.placeholder((10,), "A")], kernel)
+    assert num_traces[0] == 1
+    # different shape or dtype: miss
+    hcl.create_schedule([hcl.placeholder((12,), "A")], kernel)
+    hcl.create_schedule([hcl.placeholder((10,), "A", hcl.Float())], kernel)
+    assert num_traces[0] == 3
+    # without locations: miss, the cached AST has them
+    hcl.init(trace_cache=True, track_locations=False)
+    hcl.create_schedule([hcl.placeholder((10,), "A")], kernel)
+    assert num_traces[0] == 4
+    # the cache is opt-in
+    hcl.init()
+    hcl.create_schedule([hcl.placeholder((10,), "A")], kernel)
+    assert num_traces[0] == 5
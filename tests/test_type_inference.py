@@ -0,0 +1,24 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+from heterocl.ast import ast
+
+
+def test_cached_types():
+    hcl.init()
+    A = hcl.placeholder((4,), "A", hcl.Int(8))
+    B = hcl.placeholder((4,), "B", hcl.Float(32))
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda i: A[i] * 2 + (B[i] + A[i]), "C")
+
+    scheme = hcl.create_scheme([A, B], kernel)
+    store = scheme._ast.top_func.body[0].body[-1]
+    engine = ast.TypeInference()
+    # commutative rules are found for both orders of the operand types
+    assert isinstance(engine.infer(store.value.rhs), hcl.Float)
+    assert engine.infer(store.value.rhs) is store.value.rhs.inferred_type
+    assert engine.infer(store.value.lhs).bits > 8
+    scheme.quantize(A, hcl.Fixed(8, 4))
+    assert isinstance(engine.infer(store.value.lhs), hcl.Fixed)
@@ -0,0 +1,96 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import HCLValueError
+
+
+def _add_schedule(N=64):
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((16, N), "A")
+    B = hcl.placeholder((16, N), "B")
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] + B[i, j], "C")
+
+    return hcl.create_schedule([A, B], kernel), kernel
+
+
+def _run(f, N=64):
+    np_A = np.random.rand(16, N).astype(np.float32)
+    np_B = np.random.rand(16, N).astype(np.float32)
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np_B)
+    hcl_C = hcl.asarray(np.zeros((16, N), dtype=np.float32))
+    f(hcl_A, hcl_B, hcl_C)
+    assert np.allclose(hcl_C.asnumpy(), np_A + np_B)
+
+
+@pytest.mark.parametrize("width", [4, 8, True])
+def test_vectorize_option(width):
+    s, _ = _add_schedule()
+    f = hcl.build(s, vectorize=width)
+    assert f.vectorized_loops == [("C", "j")]
+    _run(f)
+
+
+def test_vectorize_not_unit_stride():
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((32, 32), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[j, i] * 2, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    f = hcl.build(s, vectorize=8)
+    assert ("B", "i") not in f.vectorized_loops
+    np_A = np.random.rand(32, 32).astype(np.float32)
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np.zeros((32, 32), dtype=np.float32))
+    f(hcl_A, hcl_B)
+    assert np.allclose(hcl_B.asnumpy(), np_A.T * 2)
+
+
+def test_vectorize_disabled():
+    s, _ = _add_schedule()
+    f = hcl.build(s)
+    assert f.vectorized_loops == []
+    _run(f)
+
+
+def test_stage_vectorize():
+    s, kernel = _add_schedule(N=60)
+    outer, inner = s[kernel.C].vectorize(kernel.C.axis[1], 4)
+    assert inner.name == "j.inner"
+    f = hcl.build(s)
+    assert ("C", "j.inner") in f.vectorized_loops
+    _run(f, N=60)
+    with pytest.raises(HCLValueError):
+        s2, kernel = _add_schedule()
+        s2[kernel.C].vectorize(kernel.C.axis[1], 0)
+
+
+def test_stage_vectorize_per_loop():
+    # each loop is vectorized with its own width, the others are not
+    hcl.init(hcl.Float(32))
+    A = hcl.placeholder((16, 64), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda i, j: A[i, j] + 1, "B")
+        C = hcl.compute(A.shape, lambda i, j: B[i, j] * 2, "C")
+        return hcl.compute(A.shape, lambda i, j: C[i, j] - 3, "D")
+
+    s = hcl.create_schedule([A], kernel)
+    s[kernel.B].vectorize(kernel.B.axis[1], 4)
+    s[kernel.C].vectorize(kernel.C.axis[1], 8)
+    f = hcl.build(s)
+    assert ("B", "j.inner") in f.vectorized_loops
+    assert ("C", "j.inner") in f.vectorized_loops
+    assert not any(stage == "D" for stage, _ in f.vectorized_loops)
+    np_A = np.random.rand(16, 64).astype(np.float32)
+    hcl_A = hcl.asarray(np_A)
+    hcl_D = hcl.asarray(np.zeros((16, 64), dtype=np.float32))
+    f(hcl_A, hcl_D)
+    assert np.allclose(hcl_D.asnumpy(), (np_A + 1) * 2 - 3)
@@ -0,0 +1,117 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import random
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from hcl_mlir.exceptions import APIError
+from heterocl.tensor import Array, limb_dtype
+from heterocl.utils import make_const_tensor
+
+
+def _wrap(value, bits, signed):
+    """Reference encoding with Python integers"""
+    value = int(value) % (1 << bits)
+    if signed and value >= 1 << (bits - 1):
+        value -= 1 << bits
+    return value
+
+
+def _values(bits):
+    rng = random.Random(bits)
+    values = [rng.randint(-(1 << (bits + 2)), 1 << (bits + 2)) for _ in range(50)]
+    return values + [0, 1, -1, (1 << (bits - 1)) - 1, 1 << (bits - 1), 1 << bits]
+
+
+@pytest.mark.parametrize("bits", [65, 96, 128, 200, 512])
+@pytest.mark.parametrize("signed", [True, False])
+def test_integers(bits, signed):
+    dtype = hcl.Int(bits) if signed else hcl.UInt(bits)
+    values = _values(bits)
+    array = hcl.asarray(values, dtype)
+    assert array.np_array.dtype == limb_dtype(bits)
+    assert array.np_array.shape == (len(values),)
+    assert array.np_array.nbytes == len(values) * 8 * ((bits + 63) // 64)
+    assert array.asnumpy().tolist() == [_wrap(v, bits, signed) for v in values]
+    # words of the two's complement, least significant first
+    expected = _wrap(values[0], bits, False)
+    words = array.np_array["limbs"][0].tolist()
+    assert (
+        sum(word << (64 * i) for i, word in enumerate(words)) % (1 << bits) == expected
+    )
+
+
+@pytest.mark.parametrize("signed", [True, False])
+def test_numpy_inputs(signed):
+    dtype = hcl.Int(128) if signed else hcl.UInt(128)
+    ints = np.array([[-5, 7], [-(2**63), 2**63 - 1]])
+    array = hcl.asarray(ints, dtype)
+    assert array.np_array.shape == (2, 2)
+    assert array.asnumpy().tolist() == [
+        [_wrap(v, 128, signed) for v in row] for row in ints.tolist()
+    ]
+    floats = np.array([-3.7, 2.5, -(2.0**100), 2.0**70 + 2**20, 1e40])
+    assert hcl.asarray(floats, dtype).asnumpy().tolist() == [
+        _wrap(int(v), 128, signed) for v in floats
+    ]
+
+
+@pytest.mark.parametrize("bits", [72, 128, 256])
+def test_fixed(bits):
+    values = np.array([1.5, -2.25, 1e10, -1e10, 3.0])
+    array = hcl.asarray(values, hcl.Fixed(bits, 20))
+    assert np.array_equal(array.asnumpy(), values)
+    assert array.np_array["limbs"][1, 0] == _wrap(-2.25 * 2**20, 64, False)
+    array = hcl.asarray(np.array([3, -4]), hcl.Fixed(bits, 66))
+    assert np.array_equal(array.asnumpy(), [3, -4])
+    array = hcl.asarray(values, hcl.UFixed(bits, 20))
+    assert np.allclose(
+        array.asnumpy(), [_wrap(v * 2**20, bits, False) / 2**20 for v in values]
+    )
+
+
+@pytest.mark.parametrize("dtype", [hcl.Int(65), hcl.UInt(128), hcl.Int(300)])
+def test_pack(dtype):
+    values = _values(dtype.bits)
+    array = hcl.asarray(values, dtype)
+    packed = array.pack()
+    assert packed.size == (len(values) * dtype.bits + 7) // 8
+    unpacked = Array.from_packed(packed, (len(values),), dtype)
+    assert np.array_equal(unpacked.np_array, array.np_array)
+
+
+def test_const_tensor():
+    tensor = make_const_tensor(np.array([[1, -1], [2, 3]]), hcl.Int(128))
+    assert tensor.shape == (2, 2)
+    assert tensor["limbs"].tolist() == [
+        [[1, 0], [2**64 - 1, 2**64 - 1]],
+        [[2, 0], [3, 0]],
+    ]
+
+
+@pytest.mark.parametrize("dtype", [hcl.Int(128), hcl.UInt(256), hcl.Int(96)])
+def test_kernel(dtype):
+    hcl.init(dtype)
+    A = hcl.placeholder((10,), "A")
+    B = hcl.placeholder((10,), "B")
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda x: A[x] + B[x], "C")
+
+    # the CPU kernels do not take arrays of words
+    with pytest.raises(APIError):
+        hcl.build(hcl.create_schedule([A, B], kernel))
+
+
+def test_const_tensor_kernel():
+    hcl.init(hcl.UInt(128))
+    values = np.array([1 << 100, (1 << 127) + 5, 7], dtype=object)
+
+    def kernel():
+        table = hcl.const_tensor(values, "table", hcl.UInt(128))
+        return hcl.compute((3,), lambda x: table[x] + 1, "B")
+
+    with pytest.raises(APIError):
+        hcl.build(hcl.create_schedule([], kernel))
@@ -0,0 +1,52 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+
+
+def _build():
+    hcl.init()
+    A = hcl.placeholder((64, 64), "A")
+
+    def kernel(A):
+        return hcl.compute(A.shape, lambda i, j: A[i, j] * 3, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    return hcl.build(s)
+
+
+def test_outputs_in_place():
+    f = _build()
+    np_A = np.random.randint(0, 10, size=(64, 64))
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np.zeros((64, 64)))
+    out_buffer = hcl_B.np_array
+    f(hcl_A, hcl_B)
+    assert hcl_B.np_array is out_buffer
+    assert f.bytes_copied == 0
+    assert np.array_equal(hcl_B.asnumpy(), np_A * 3)
+
+
+def test_generic_path_in_place():
+    f = _build()
+    f._call_plan = None
+    np_A = np.random.randint(0, 10, size=(64, 64))
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np.zeros((64, 64)))
+    f(hcl_A, hcl_B)
+    assert f.bytes_copied == 0
+    assert np.array_equal(hcl_B.asnumpy(), np_A * 3)
+
+
+def test_incompatible_layout():
+    f = _build()
+    np_A = np.random.randint(0, 10, size=(64, 64))
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np.zeros((64, 128)))
+    # a strided view of a larger buffer has to be staged
+    hcl_B.np_array = hcl_B.np_array[:, ::2]
+    f(hcl_A, hcl_B)
+    # copied in and back
+    assert f.bytes_copied == 2 * hcl_B.np_array.nbytes
+    assert np.array_equal(hcl_B.asnumpy(), np_A * 3)